@@ -0,0 +1,27 @@
+# demo/checks.py
+"""
+系统检查：报表页的 echarts 脚本只从本站静态文件或 ECHARTS_JS_HOST 指定的目录加载，不使用外部 CDN，
+两者都没有时 runserver / migrate / check 等命令直接报错，而不是等到页面打开才发现图表加载不出来。
+这里不导入 pyecharts（见 ImportTimeTests）
+"""
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.checks import Error, Tags, register
+
+# 本站静态文件里的 echarts 脚本，需自行放到 demo/static/echarts/v6/ 下（见 README）
+ECHARTS_STATIC_PATH = 'echarts/v6/echarts.min.js'
+
+
+@register(Tags.staticfiles)
+def check_echarts_script(app_configs, **kwargs):
+    """
+    没有设置 ECHARTS_JS_HOST 时，静态文件里必须有 ECHARTS_STATIC_PATH
+    """
+    if getattr(settings, 'ECHARTS_JS_HOST', '') or finders.find(ECHARTS_STATIC_PATH):
+        return []
+    return [Error(
+        f"静态文件里找不到 {ECHARTS_STATIC_PATH}，报表页的图表无法加载",
+        hint="把与 pyecharts 配套的 echarts.min.js（v6）放到 demo/static/echarts/v6/ 下，"
+             "或用环境变量 ECHARTS_JS_HOST 指向内网镜像目录（以 / 结尾）",
+        id='demo.E001',
+    )]
@@ -0,0 +1,19 @@
+# demo/converters.py
+"""
+URL 路径转换器
+"""
+from typing import List
+
+
+class YearListConverter:
+    """
+    逗号分隔的年份列表，如 2019,2021,2023 → [2019, 2021, 2023]；至少两个年份，
+    单个年份和 2019-2023 形式的连续区间由其他路由处理
+    """
+    regex = r'\d{4}(?:,\d{4})+'
+
+    def to_python(self, value: str) -> List[int]:
+        return [int(year) for year in value.split(',')]
+
+    def to_url(self, value: List[int]) -> str:
+        return ','.join(str(year) for year in value)
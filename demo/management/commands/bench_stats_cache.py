@@ -0,0 +1,73 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from demo.models import SchoolYearlyCache
+from demo.services.aggregate import derive_rates
+from demo.services.statistics import COUNT_FIELDS, _fetch_cached_stats
+
+
+def _fetch_cached_stats_by_instances(year: int, area: str) -> dict | None:
+    """
+    旧的读取方式：先 exists() 再逐个构造模型实例，用于对比
+    """
+    qs = SchoolYearlyCache.objects.filter(year=str(year), area=area)
+    if not qs.exists():
+        return None
+    return {
+        c.school: derive_rates({field: getattr(c, field) for field in COUNT_FIELDS})
+        for c in qs
+    }
+
+
+class Command(BaseCommand):
+    help = "对比 SchoolYearlyCache 两种读取方式的单次请求耗时和查询次数"
+
+    def add_arguments(self, parser):
+        parser.add_argument('year', type=int, help='年份')
+        parser.add_argument('area', type=str, help='赛区名称')
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=50,
+            help='每种方式重复读取的次数，默认 50'
+        )
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=0,
+            help='临时写入的模拟学校数量；大于 0 时在事务内造数据，测完回滚'
+        )
+
+    def handle(self, *args, **options):
+        year = options['year']
+        area = options['area']
+        repeat = options['repeat']
+        rows = options['rows']
+
+        with transaction.atomic():
+            if rows > 0:
+                SchoolYearlyCache.objects.filter(year=str(year), area=area).delete()
+                SchoolYearlyCache.objects.bulk_create([
+                    SchoolYearlyCache(year=str(year), area=area, school=f"模拟学校{i}", team_count=i)
+                    for i in range(rows)
+                ])
+                self.stdout.write(f"🛠 已临时写入 {rows} 条模拟缓存")
+
+            for label, func in (
+                ('模型实例', _fetch_cached_stats_by_instances),
+                ('values_list', _fetch_cached_stats),
+            ):
+                with CaptureQueriesContext(connection) as ctx:
+                    start = time.perf_counter()
+                    for _ in range(repeat):
+                        result = func(year, area)
+                    elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f"{label:<12} 每次 {elapsed / repeat * 1000:.3f} ms，"
+                    f"查询 {len(ctx.captured_queries) // repeat} 次，"
+                    f"学校 {len(result or {})} 所"
+                )
+
+            # 模拟数据不落库
+            transaction.set_rollback(True)
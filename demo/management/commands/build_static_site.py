@@ -0,0 +1,73 @@
+"""
+自定义Django管理命令：生成静态报表站点
+把导航页、各年各赛区详情页、子项目页、多年度赛区页和全国汇总页渲染成静态 HTML（附 .gz / .br），
+只重新生成数据指纹变化的页面。建议在 update_stats_cache 之后执行，生成的目录交给 nginx 直接提供。
+"""
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from demo.management.commands.update_stats_cache import _parse_range
+from demo.services.metadata import invalidate_competition_metadata
+from demo.services.static_site import build_site, get_compressors
+
+
+class Command(BaseCommand):
+    help = '把报表页面渲染成静态 HTML 及 gzip/brotli 压缩版本，只重新生成数据有变化的页面'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output',
+            nargs='?',
+            type=str,
+            help='输出目录，默认为 settings.STATIC_SITE_ROOT'
+        )
+        parser.add_argument(
+            '--ranges',
+            nargs='+',
+            type=str,
+            help='要生成的多年度页年份区间，如 2019-2024；默认为全部年份的首尾区间'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='并行渲染的进程数，默认为 CPU 核数'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='忽略数据指纹，全部重新生成'
+        )
+
+    def handle(self, *args, **options):
+        output_dir = options['output'] or str(settings.STATIC_SITE_ROOT)
+        ranges = [_parse_range(value) for value in options['ranges'] or []] or None
+        if '.br' not in get_compressors():
+            self.stdout.write(self.style.WARNING("未安装 brotli，只生成 .gz 压缩版本"))
+
+        invalidate_competition_metadata()
+        summary = build_site(
+            output_dir,
+            ranges=ranges,
+            workers=max(1, options['workers']),
+            force=options['force'],
+            on_page=lambda path, size, elapsed: self.stdout.write(
+                f"{path}：{size / 1024:.1f} KB，{elapsed * 1000:.0f} ms"
+            ),
+            on_error=lambda path, error: self.stderr.write(
+                self.style.ERROR(f"生成 {path} 时出错: {error}")
+            ),
+        )
+
+        rate = summary['rendered'] / summary['seconds'] if summary['seconds'] else 0
+        self.stdout.write(
+            f"共 {summary['total']} 个页面：生成 {summary['rendered']}，未变化跳过 {summary['skipped']}，"
+            f"删除 {summary['removed']}，失败 {summary['failed']}；"
+            f"{summary['bytes'] / 1024 / 1024:.1f} MB，{summary['seconds']:.1f} 秒（{rate:.1f} 页/秒）"
+        )
+        if summary['failed']:
+            self.stderr.write(self.style.ERROR(f"共 {summary['failed']} 个页面生成失败"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"静态站点已生成：{output_dir}"))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from demo.services.export import EXPORT_FORMATS, get_dataset, write_dataset
+
+
+class Command(BaseCommand):
+    help = "把统计缓存导出为 CSV / XLSX / Parquet，按块流式读写，导出大量数据时内存占用恒定"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'dataset',
+            choices=['yearly', 'range', 'national'],
+            help='yearly: 各年各赛区学校统计；range: 多年度汇总；national: 全国按学校汇总'
+        )
+        parser.add_argument('output', type=str, help='输出文件路径')
+        parser.add_argument(
+            '--format',
+            choices=EXPORT_FORMATS,
+            help='导出格式，默认按输出文件扩展名判断'
+        )
+        parser.add_argument('--years', nargs='+', type=int, help='只导出这些年份')
+        parser.add_argument('--areas', nargs='+', type=str, help='只导出这些赛区')
+        parser.add_argument('--range', type=str, help='多年度汇总的年份区间，如 2019-2024')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        fmt = options['format'] or output.rsplit('.', 1)[-1].lower()
+        if fmt not in EXPORT_FORMATS:
+            raise CommandError(f"无法判断导出格式：{output}，请用 --format 指定")
+
+        start_year = end_year = None
+        if options['range']:
+            try:
+                start_year, end_year = (int(part) for part in options['range'].split('-'))
+            except ValueError:
+                raise CommandError(f"年份区间格式错误：{options['range']}，应为 2019-2024 形式")
+
+        try:
+            fields, headers, rows = get_dataset(
+                options['dataset'],
+                years=options['years'],
+                areas=options['areas'],
+                start_year=start_year,
+                end_year=end_year,
+            )
+            count = write_dataset(output, fmt, fields, headers, rows)
+        except (ValueError, ImportError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f"✅ 导出完成：{count} 行 → {output}"))
@@ -0,0 +1,92 @@
+"""
+自定义Django管理命令：生成合成数据
+在本地 SQLite / MySQL 里造出可复现的 team / team_member / team_achievement，作为压测（loadtest）和
+性能对比用的替身库，见 demo/services/synthetic.py。生成后执行 update_stats_cache 预热统计缓存。
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from demo.management.commands.update_stats_cache import _parse_range
+from demo.services import synthetic
+from demo.services.invalidation import bump_source_version
+
+
+class Command(BaseCommand):
+    help = '在本地替身库里生成可复现的合成参赛数据（队伍、成员、成绩），用于压测和性能对比'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--years',
+            type=str,
+            default='2019-2023',
+            help='年份区间，如 2019-2023，默认 2019-2023'
+        )
+        parser.add_argument(
+            '--areas',
+            nargs='+',
+            type=str,
+            default=synthetic.DEFAULT_AREAS,
+            help='赛区名称，默认为八个常规赛区'
+        )
+        parser.add_argument(
+            '--teams',
+            type=int,
+            default=200,
+            help='每年每个赛区的平均队伍数，默认 200'
+        )
+        parser.add_argument(
+            '--schools',
+            type=int,
+            default=300,
+            help='学校数，默认 300'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1,
+            help='随机种子，相同种子生成的数据完全一致，默认 1'
+        )
+        parser.add_argument(
+            '--database',
+            type=str,
+            help='写入的数据库别名，默认为源数据表所在的库'
+        )
+        parser.add_argument(
+            '--create-tables',
+            action='store_true',
+            help='源数据表不存在时先建表（源数据表不受迁移管理）'
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='先删除之前生成的合成数据（只删除代码以 SYN 开头的行）'
+        )
+
+    def handle(self, *args, **options):
+        if options['teams'] < 1 or options['schools'] < 1:
+            raise CommandError("--teams 和 --schools 都应大于 0")
+        start_year, end_year = _parse_range(options['years'])
+        using = options['database'] or synthetic.source_alias()
+
+        if options['create_tables']:
+            for table in synthetic.ensure_source_tables(using):
+                self.stdout.write(f"🛠 已创建表 {table}")
+        if options['clear']:
+            deleted = synthetic.clear_synthetic(using)
+            self.stdout.write(f"🗑 已删除 {deleted} 支合成队伍")
+
+        summary = synthetic.generate(
+            range(start_year, end_year + 1),
+            options['areas'],
+            teams_per_area=options['teams'],
+            school_count=options['schools'],
+            seed=options['seed'],
+            using=using,
+        )
+        # 正在运行的服务里的奖项分类表、赛事元数据、学校索引随之失效
+        bump_source_version()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"已写入 {summary['teams']} 支队伍、{summary['members']} 条成员记录、"
+            f"{summary['schools']} 所学校，用时 {summary['seconds']:.1f} 秒"
+        ))
+        self.stdout.write("接下来执行 python manage.py update_stats_cache 预热统计缓存")
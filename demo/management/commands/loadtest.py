@@ -0,0 +1,146 @@
+"""
+自定义Django管理命令：压测报表页面
+用纯 Python 的 asyncio 客户端模拟并发用户，按场景（导航页 → 赛区详情页 → 多年度赛区页）访问正在运行的服务，
+输出每一步的吞吐量、延迟百分位和数据库查询次数，见 demo/services/loadtest.py。
+目标页由本地数据库的赛事元数据生成，服务端应连接同一个库（可先用 generate_synthetic_data 造数据）；
+服务端设置 QUERY_COUNT_HEADERS=True 时报告里才有查询次数。
+"""
+import json
+import unicodedata
+
+from django.core.management.base import BaseCommand, CommandError
+
+from demo.management.commands.update_stats_cache import _parse_range
+from demo.services import loadtest
+from demo.services.metadata import invalidate_competition_metadata
+
+
+def _fmt(value, digits: int = 1) -> str:
+    return '-' if value is None else f"{value:.{digits}f}"
+
+
+def _rjust(text: str, width: int) -> str:
+    """按显示宽度右对齐，中文字符占两列"""
+    wide = sum(unicodedata.east_asian_width(char) in 'WF' for char in text)
+    return text.rjust(width - wide)
+
+
+def _fmt_change(value) -> str:
+    return '' if value is None else f"（{value:+.0%}）"
+
+
+class Command(BaseCommand):
+    help = '并发访问报表页面，统计各步骤的吞吐量、延迟百分位和数据库查询次数，用于对比缓存模式和 worker 配置'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'base_url',
+            nargs='?',
+            default='http://127.0.0.1:8000',
+            help='服务地址，默认 http://127.0.0.1:8000'
+        )
+        parser.add_argument(
+            '--scenario',
+            choices=sorted(loadtest.SCENARIOS),
+            default='journey',
+            help='journey 依次访问导航页、赛区详情页、多年度赛区页；其余场景只访问一种页面，默认 journey'
+        )
+        parser.add_argument('--users', type=int, default=10, help='并发用户数，默认 10')
+        parser.add_argument('--duration', type=float, default=30, help='压测时长（秒），默认 30')
+        parser.add_argument('--ramp-up', type=float, default=0, help='用户在这么多秒内陆续加入，默认 0')
+        parser.add_argument('--think', type=float, default=0, help='两次请求之间的平均停顿（秒），默认 0')
+        parser.add_argument('--timeout', type=float, default=30, help='单个请求的超时（秒），默认 30')
+        parser.add_argument('--seed', type=int, default=1, help='随机种子，默认 1')
+        parser.add_argument(
+            '--ranges',
+            nargs='+',
+            type=str,
+            help='多年度页的年份区间，如 2019-2023；默认为全部年份的首尾区间'
+        )
+        parser.add_argument(
+            '--accept-encoding',
+            default=loadtest.DEFAULT_ACCEPT_ENCODING,
+            help=f"请求头 Accept-Encoding，默认 '{loadtest.DEFAULT_ACCEPT_ENCODING}'，传空串表示不压缩"
+        )
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='不预先访问目标页，包含缓存未命中的请求'
+        )
+        parser.add_argument('--label', default='', help='报告标签，如 swr-off-4workers')
+        parser.add_argument('--output', help='把报告保存为 JSON 文件')
+        parser.add_argument('--baseline', help='之前保存的报告，和本次结果对比')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline'], encoding='utf-8') as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"无法读取基线报告 {options['baseline']}: {e}")
+
+        invalidate_competition_metadata()
+        ranges = [_parse_range(value) for value in options['ranges'] or []] or None
+        targets = loadtest.plan_targets(ranges)
+        if not targets:
+            raise CommandError("数据库里没有参赛数据，可先执行 generate_synthetic_data")
+
+        steps = loadtest.SCENARIOS[options['scenario']]
+        self.stdout.write(
+            f"压测 {options['base_url']}：场景 {options['scenario']}（{' → '.join(steps)}），"
+            f"{options['users']} 个用户，{options['duration']:g} 秒，"
+            f"目标页 {sum(len(targets[step]) for step in steps)} 个"
+        )
+        try:
+            report = loadtest.run_load_test(
+                options['base_url'],
+                scenario=options['scenario'],
+                targets=targets,
+                users=options['users'],
+                duration=options['duration'],
+                ramp_up=options['ramp_up'],
+                think_time=options['think'],
+                timeout=options['timeout'],
+                seed=options['seed'],
+                accept_encoding=options['accept_encoding'],
+                warmup=not options['cold'],
+                label=options['label'],
+            )
+        except (OSError, ValueError) as e:
+            raise CommandError(f"压测失败: {e}")
+
+        self._print_report(report)
+        if report['total']['queries'] is None:
+            self.stdout.write(self.style.WARNING("响应里没有 X-DB-Queries 头，服务端设置 QUERY_COUNT_HEADERS=True 后可统计查询次数"))
+        if baseline is not None:
+            self._print_comparison(report, baseline)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"报告已保存：{options['output']}"))
+
+    def _print_report(self, report: dict):
+        columns = [('请求', 8), ('错误', 8), ('次/秒', 10), ('平均', 10)]
+        columns += [(f'p{p}', 8) for p in loadtest.PERCENTILES]
+        columns += [('最大', 10), ('KB', 8), ('查询', 8), ('查询ms', 10)]
+        self.stdout.write('步骤'.ljust(14) + ''.join(_rjust(title, width) for title, width in columns))
+        for step, row in [*report['steps'].items(), ('total', report['total'])]:
+            self.stdout.write(
+                f"{step:<16}{row['requests']:>8}{row['errors']:>8}{_fmt(row['rps']):>10}"
+                f"{_fmt(row['mean_ms']):>10}"
+                + ''.join(f"{_fmt(row[f'p{p}_ms']):>8}" for p in loadtest.PERCENTILES)
+                + f"{_fmt(row['max_ms']):>10}"
+                f"{_fmt(row['avg_bytes'] and row['avg_bytes'] / 1024):>8}"
+                f"{_fmt(row['queries']):>8}{_fmt(row['db_ms']):>10}"
+            )
+            for message, count in row.get('error_samples', {}).items():
+                self.stderr.write(self.style.ERROR(f"  {step} 错误 {count} 次：{message}"))
+
+    def _print_comparison(self, report: dict, baseline: dict):
+        self.stdout.write(f"与基线 {baseline.get('label') or baseline.get('started_at')} 对比（单位同上，括号内为变化）：")
+        for step, metrics in loadtest.compare_reports(report, baseline).items():
+            self.stdout.write(f"{step:<16}" + '，'.join(
+                f"{metric} {_fmt(current)} / {_fmt(base)}{_fmt_change(change)}"
+                for metric, (current, base, change) in metrics.items()
+            ))
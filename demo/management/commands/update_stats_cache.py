@@ -1,36 +1,156 @@
-# """
-# 自定义Django管理命令：自动统计各赛区和学校数据并缓存到JSON文件
-# 用于周期性（如定时任务）自动维护统计缓存，提升系统自动化水平。
-# """
-# from django.core.management.base import BaseCommand
-# from demo.views import get_area_stats, get_northwest_schools_stats, get_school_yearly_stats
-
-# class Command(BaseCommand):
-#     help = '自动统计各赛区和学校数据并缓存到JSON文件，可用于定时任务或手动执行'
-
-#     def handle(self, *args, **kwargs):
-#         updated_files = []
-#         errors = []
-#         for year in range(2019, 2024):
-#             try:
-#                 self.stdout.write(self.style.NOTICE(f"正在更新 {year} 年的数据..."))
-#                 # 调用views中的统计与缓存函数
-#                 get_area_stats(year)
-#                 updated_files.append(f'area_stats_{year}.json')
-#                 get_northwest_schools_stats(year)
-#                 updated_files.append(f'northwest_schools_{year}.json')
-#                 get_school_yearly_stats(year)
-#                 updated_files.append(f'school_yearly_stats_{year}.json')
-#                 self.stdout.write(self.style.SUCCESS(f"{year} 年数据更新完成."))
-#             except Exception as e:
-#                 error_msg = f"更新 {year} 年数据时出错: {e}"
-#                 self.stderr.write(self.style.ERROR(error_msg))
-#                 errors.append(error_msg)
-#         # 输出汇总信息
-#         if errors:
-#             self.stderr.write(self.style.ERROR("部分年份数据更新失败:"))
-#             for err in errors:
-#                 self.stderr.write(self.style.ERROR(err))
-#         else:
-#             self.stdout.write(self.style.SUCCESS("所有年份 (2019-2023) 的JSON数据文件已成功更新！"))
-#         self.stdout.write("成功更新的文件:\n" + "\n".join(updated_files))
\ No newline at end of file
+"""
+自定义Django管理命令：预热统计缓存
+按 年份 × 赛区 重新计算 SchoolYearlyCache，再基于年度缓存汇总常用年份区间的 SchoolRangeCache。
+用于周期性（如定时任务）或导入数据后执行，页面请求只读取预先算好的结果。
+工作项记录在 CacheWarmupItem 表里，可用 --workers 在本机多进程执行、用 --shard 分到多台主机，
+中途崩溃后用同一个 --run 重新运行即可从断点继续，见 demo/services/warmup.py。
+"""
+from django.core.management.base import BaseCommand, CommandError
+from demo.models import CacheWarmupItem
+from demo.services import warmup
+from demo.services.invalidation import bump_source_version
+from demo.services.metadata import get_competition_metadata
+from demo.services.statistics import mark_yearly_cache_stale
+
+
+def _parse_range(value: str) -> tuple[int, int]:
+    """解析 2019-2024 形式的年份区间"""
+    try:
+        start_year, end_year = (int(part) for part in value.split('-'))
+    except ValueError:
+        raise CommandError(f"年份区间格式错误：{value}，应为 2019-2024 形式")
+    if start_year > end_year:
+        raise CommandError(f"起始年份大于结束年份：{value}")
+    return start_year, end_year
+
+
+def _parse_shard(value: str) -> tuple[int, int]:
+    """解析 1/4 形式的分片，返回从 0 开始的 (序号, 总数)"""
+    try:
+        index, shards = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise CommandError(f"分片格式错误：{value}，应为 1/4 形式")
+    if not 1 <= index <= shards:
+        raise CommandError(f"分片序号应在 1 到 {shards} 之间：{value}")
+    return index - 1, shards
+
+
+class Command(BaseCommand):
+    help = '预热各年份、各赛区的学校统计缓存以及常用年份区间的多年度汇总，可用于定时任务或手动执行'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--years',
+            nargs='+',
+            type=int,
+            help='要更新的年份，默认全部年份'
+        )
+        parser.add_argument(
+            '--areas',
+            nargs='+',
+            type=str,
+            help='要更新的赛区，默认全部赛区'
+        )
+        parser.add_argument(
+            '--ranges',
+            nargs='+',
+            type=str,
+            help='要汇总的年份区间，如 2019-2024；默认为全部年份的首尾区间'
+        )
+        parser.add_argument(
+            '--mark-stale',
+            action='store_true',
+            help='不重新计算，只把年度缓存标记为过期，由之后的页面请求在后台刷新（包含该年的多年度汇总随之重新汇总）'
+        )
+        parser.add_argument(
+            '--run',
+            type=str,
+            help='预热批次号；多台主机协作或崩溃后续跑时使用同一个批次号，默认按当前时间新建批次'
+        )
+        parser.add_argument(
+            '--shard',
+            type=str,
+            help='只处理其中一个分片，如 1/4；各主机使用相同的 --run 和分片总数'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='本机并行的进程数，默认为 1'
+        )
+        parser.add_argument(
+            '--lease',
+            type=int,
+            default=warmup.DEFAULT_LEASE_SECONDS,
+            help='工作项认领后超过这么多秒未完成即可被其他进程重新认领，默认 1800'
+        )
+        parser.add_argument(
+            '--max-wait',
+            type=int,
+            default=warmup.DEFAULT_MAX_WAIT_SECONDS,
+            help='连续等待其他分片完成依赖的年度工作项超过这么多秒即放弃并以非零状态退出，0 表示一直等，默认 3600'
+        )
+
+    def handle(self, *args, **options):
+        # 导入数据后可能出现新的奖项写法、新的年份和赛区：递增源数据版本号，
+        # 本进程和 web 进程的奖项分类表、赛事元数据、学校索引都随之重新读取
+        bump_source_version()
+        metadata = get_competition_metadata()
+        years = options['years'] or metadata.years
+        areas = options['areas'] or metadata.areas
+        if not years:
+            raise CommandError("team 表中没有任何年份数据")
+        ranges = [_parse_range(value) for value in options['ranges'] or []] or [(min(years), max(years))]
+
+        if options['mark_stale']:
+            count = mark_yearly_cache_stale(options['years'], options['areas'])
+            self.stdout.write(self.style.SUCCESS(f"已将 {count} 条年度缓存标记为过期"))
+            return
+
+        run_id = options['run'] or warmup.new_run_id()
+        shard = _parse_shard(options['shard']) if options['shard'] else None
+        total = warmup.prepare_run(run_id, warmup.plan_units(years, areas, ranges))
+        self.stdout.write(f"预热批次 {run_id}：共 {total} 个工作项")
+
+        def on_item(item, error):
+            if item.kind == CacheWarmupItem.YEARLY:
+                label = f"{item.start_year} 年 {item.area}"
+            else:
+                label = f"{item.start_year}-{item.end_year} 年 {item.area}"
+            if error is None:
+                self.stdout.write(f"{label}：{item.school_count} 所学校，{item.elapsed:.1f} 秒")
+            else:
+                self.stderr.write(self.style.ERROR(f"更新 {label} 数据时出错: {error}"))
+
+        results = warmup.run_workers(
+            run_id,
+            workers=max(1, options['workers']),
+            shard=shard,
+            lease_seconds=options['lease'],
+            on_item=on_item,
+            max_wait=options['max_wait'] or None,
+        )
+
+        # 汇总信息包含同一批次里其他主机、其他进程的工作量
+        summary = warmup.run_summary(run_id)
+        for row in summary['workers']:
+            rate = f"{row['rate']:.2f} 项/秒" if row['rate'] else '-'
+            self.stdout.write(
+                f"{row['worker']}：完成 {row['done']}，失败 {row['failed']}，{row['schools']} 所学校，"
+                f"计算 {row['busy']:.1f} 秒，{rate}"
+            )
+        failed = summary['status'].get(CacheWarmupItem.FAILED, 0)
+        remaining = warmup.pending_count(summary) - failed
+        if failed:
+            self.stderr.write(self.style.ERROR(
+                f"共 {failed} 项更新失败，错误信息见批次 {run_id} 的 CacheWarmupItem 记录"
+            ))
+        elif remaining:
+            self.stdout.write(f"其他分片或进程还有 {remaining} 项未完成")
+        else:
+            self.stdout.write(self.style.SUCCESS("统计缓存预热完成！"))
+        if any(result['timed_out'] for result in results):
+            raise CommandError(
+                f"等待依赖的年度工作项超过 {options['max_wait']} 秒，仍有 {remaining} 项未完成；"
+                f"确认其他分片的主机在运行后用 --run {run_id} 重新执行"
+            )
@@ -0,0 +1,135 @@
+# demo/middleware.py
+"""
+  - CompressionMiddleware / compress_page：报表页响应压缩，客户端支持且安装了 brotli 时用 br，
+    否则退回 Django 自带的 gzip。报表页主要是内联的图表配置 JSON，压缩后通常只剩十分之一左右。
+  - StatsMemoMiddleware：为每个请求开启统计函数的请求级记忆化，见 demo/services/memo.py
+  - QueryCountMiddleware：统计每个请求的数据库查询次数和耗时，放在 X-DB-Queries / X-DB-Time 响应头里，
+    供压测（loadtest）按场景汇总；只在 QUERY_COUNT_HEADERS 开启时加入 MIDDLEWARE
+"""
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import decorator_from_middleware
+from django.utils.regex_helper import _lazy_re_compile
+
+from demo.services.memo import request_scope
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 动态响应用中等压缩级别，压缩率和耗时比较均衡
+BROTLI_QUALITY = 5
+
+_accepts_br = _lazy_re_compile(r'\bbr\b')
+
+logger = logging.getLogger(__name__)
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    在 GZipMiddleware 的基础上优先使用 brotli
+    """
+
+    def process_response(self, request, response):
+        if (
+            brotli is None
+            or response.streaming
+            or len(response.content) < 200
+            or response.has_header('Content-Encoding')
+            or not _accepts_br.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        ):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed = brotli.compress(response.content, quality=BROTLI_QUALITY)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+
+        # 和 GZipMiddleware 一样把强 ETag 改成弱 ETag
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+
+# 给单个视图开启压缩，用法同 django.views.decorators.gzip.gzip_page
+compress_page = decorator_from_middleware(CompressionMiddleware)
+
+
+class StatsMemoMiddleware:
+    """
+    整个请求处在同一个记忆化作用域里，同一页面里重复的统计调用只执行一次。
+    命中/未命中次数写到 debug 日志；DEBUG 模式下同时放在 X-Stats-Memo 响应头里
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _report(self, request, response, scope):
+        if scope.hits or scope.misses:
+            logger.debug("%s 统计调用：命中 %d，未命中 %d", request.path, scope.hits, scope.misses)
+            if settings.DEBUG:
+                response['X-Stats-Memo'] = f"hits={scope.hits}, misses={scope.misses}"
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with request_scope() as scope:
+            response = self.get_response(request)
+        return self._report(request, response, scope)
+
+    async def __acall__(self, request):
+        with request_scope() as scope:
+            response = await self.get_response(request)
+        return self._report(request, response, scope)
+
+
+class _QueryCounter:
+    """connection.execute_wrapper 的回调，累计查询次数和耗时"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+class QueryCountMiddleware:
+    """
+    统计本请求在所有数据库别名上执行的查询。后台线程（如年度缓存的异步刷新）里的查询不计入
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = _QueryCounter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(counter))
+            response = self.get_response(request)
+        response['X-DB-Queries'] = str(counter.count)
+        response['X-DB-Time'] = f"{counter.seconds * 1000:.1f}"
+        return response
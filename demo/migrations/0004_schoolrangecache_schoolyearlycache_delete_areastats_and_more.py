@@ -0,0 +1,102 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:30
+
+from django.db import migrations, models
+
+
+def create_yearly_cache_table(apps, schema_editor):
+    model = apps.get_model('demo', 'SchoolYearlyCache')
+    if model._meta.db_table not in schema_editor.connection.introspection.table_names():
+        schema_editor.create_model(model)
+
+
+def drop_yearly_cache_table(apps, schema_editor):
+    schema_editor.delete_model(apps.get_model('demo', 'SchoolYearlyCache'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('demo', '0003_areastats_subproject'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchoolRangeCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('participant_count', models.IntegerField(db_comment='参赛人数', default=0)),
+                ('team_count', models.IntegerField(db_comment='参赛队伍数量', default=0)),
+                ('award_count', models.IntegerField(db_comment='获奖数量', default=0)),
+                ('first_prize_count', models.IntegerField(db_comment='一等奖数量', default=0)),
+                ('second_prize_count', models.IntegerField(db_comment='二等奖数量', default=0)),
+                ('third_prize_count', models.IntegerField(db_comment='三等奖数量', default=0)),
+                ('qualification_count', models.IntegerField(db_comment='晋级决赛数量', default=0)),
+                ('final_first_prize_count', models.IntegerField(db_comment='决赛一等奖数量', default=0)),
+                ('no_award_team_count', models.IntegerField(db_comment='失败的队伍数量', default=0)),
+                ('no_award_rate', models.FloatField(db_comment='未获奖率', default=0.0)),
+                ('award_rate', models.FloatField(db_comment='获奖率', default=0.0)),
+                ('first_prize_rate', models.FloatField(db_comment='一等奖率', default=0.0)),
+                ('second_prize_rate', models.FloatField(db_comment='二等奖率', default=0.0)),
+                ('third_prize_rate', models.FloatField(db_comment='三等奖率', default=0.0)),
+                ('qualification_rate', models.FloatField(db_comment='晋级决赛率', default=0.0)),
+                ('final_first_prize_rate', models.FloatField(db_comment='决赛一等奖率', default=0.0)),
+                ('area', models.CharField(db_comment='赛区', max_length=50)),
+                ('start_year', models.CharField(db_comment='起始年份', max_length=4)),
+                ('end_year', models.CharField(db_comment='结束年份', max_length=4)),
+                ('school', models.CharField(db_comment='学校名称', max_length=100)),
+                ('rank', models.IntegerField(db_comment='按参赛队伍总数的排名', default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_comment='最后更新时间')),
+            ],
+            options={
+                'verbose_name': '学校多年度统计汇总',
+                'verbose_name_plural': '学校多年度统计汇总',
+            },
+        ),
+        # school_yearly_cache 在引入迁移之前已经手工建过表：这里只登记模型状态，
+        # 建表交给下面的 create_yearly_cache_table，表已存在时跳过
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='SchoolYearlyCache',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('participant_count', models.IntegerField(db_comment='参赛人数', default=0)),
+                        ('team_count', models.IntegerField(db_comment='参赛队伍数量', default=0)),
+                        ('award_count', models.IntegerField(db_comment='获奖数量', default=0)),
+                        ('first_prize_count', models.IntegerField(db_comment='一等奖数量', default=0)),
+                        ('second_prize_count', models.IntegerField(db_comment='二等奖数量', default=0)),
+                        ('third_prize_count', models.IntegerField(db_comment='三等奖数量', default=0)),
+                        ('qualification_count', models.IntegerField(db_comment='晋级决赛数量', default=0)),
+                        ('final_first_prize_count', models.IntegerField(db_comment='决赛一等奖数量', default=0)),
+                        ('no_award_team_count', models.IntegerField(db_comment='失败的队伍数量', default=0)),
+                        ('no_award_rate', models.FloatField(db_comment='未获奖率', default=0.0)),
+                        ('award_rate', models.FloatField(db_comment='获奖率', default=0.0)),
+                        ('first_prize_rate', models.FloatField(db_comment='一等奖率', default=0.0)),
+                        ('second_prize_rate', models.FloatField(db_comment='二等奖率', default=0.0)),
+                        ('third_prize_rate', models.FloatField(db_comment='三等奖率', default=0.0)),
+                        ('qualification_rate', models.FloatField(db_comment='晋级决赛率', default=0.0)),
+                        ('final_first_prize_rate', models.FloatField(db_comment='决赛一等奖率', default=0.0)),
+                        ('year', models.CharField(db_comment='年份', max_length=4)),
+                        ('area', models.CharField(db_comment='赛区', max_length=50)),
+                        ('school', models.CharField(db_comment='学校名称', max_length=100)),
+                        ('updated_at', models.DateTimeField(auto_now=True, db_comment='最后更新时间')),
+                    ],
+                    options={
+                        'verbose_name': '学校年度统计缓存',
+                        'verbose_name_plural': '学校年度统计缓存',
+                        'indexes': [models.Index(fields=['year', 'area'], name='demo_school_year_4899a7_idx')],
+                        'unique_together': {('year', 'area', 'school')},
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_yearly_cache_table, drop_yearly_cache_table),
+        migrations.AddIndex(
+            model_name='schoolrangecache',
+            index=models.Index(fields=['area', 'start_year', 'end_year', 'rank'], name='demo_school_area_59de25_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='schoolrangecache',
+            unique_together={('area', 'start_year', 'end_year', 'school')},
+        ),
+    ]
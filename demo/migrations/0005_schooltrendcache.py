@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('demo', '0004_schoolrangecache_schoolyearlycache_delete_areastats_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchoolTrendCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('area', models.CharField(db_comment='赛区', max_length=50)),
+                ('start_year', models.CharField(db_comment='起始年份', max_length=4)),
+                ('end_year', models.CharField(db_comment='结束年份', max_length=4)),
+                ('school', models.CharField(blank=True, db_comment='学校名称', max_length=100)),
+                ('year', models.CharField(db_comment='年份', max_length=4)),
+                ('team_count', models.IntegerField(db_comment='参赛队伍数量', default=0)),
+                ('team_count_growth', models.FloatField(db_comment='队伍数同比增长率', null=True)),
+                ('team_count_avg', models.FloatField(db_comment='队伍数滑动平均', default=0.0)),
+                ('participant_count', models.IntegerField(db_comment='参赛人数', default=0)),
+                ('participant_count_growth', models.FloatField(db_comment='参赛人数同比增长率', null=True)),
+                ('rank', models.IntegerField(db_comment='当年按队伍数的排名', null=True)),
+                ('rank_change', models.IntegerField(db_comment='排名变化（正数为上升）', null=True)),
+                ('award_rate', models.FloatField(db_comment='获奖率', default=0.0)),
+                ('award_rate_change', models.FloatField(db_comment='获奖率同比变化', null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_comment='最后更新时间')),
+            ],
+            options={
+                'verbose_name': '学校多年度趋势',
+                'verbose_name_plural': '学校多年度趋势',
+                'indexes': [models.Index(fields=['area', 'start_year', 'end_year'], name='demo_school_area_377714_idx')],
+                'unique_together': {('area', 'start_year', 'end_year', 'school', 'year')},
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('demo', '0005_schooltrendcache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SchoolSubprojectCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('participant_count', models.IntegerField(db_comment='参赛人数', default=0)),
+                ('team_count', models.IntegerField(db_comment='参赛队伍数量', default=0)),
+                ('award_count', models.IntegerField(db_comment='获奖数量', default=0)),
+                ('first_prize_count', models.IntegerField(db_comment='一等奖数量', default=0)),
+                ('second_prize_count', models.IntegerField(db_comment='二等奖数量', default=0)),
+                ('third_prize_count', models.IntegerField(db_comment='三等奖数量', default=0)),
+                ('qualification_count', models.IntegerField(db_comment='晋级决赛数量', default=0)),
+                ('final_first_prize_count', models.IntegerField(db_comment='决赛一等奖数量', default=0)),
+                ('no_award_team_count', models.IntegerField(db_comment='失败的队伍数量', default=0)),
+                ('no_award_rate', models.FloatField(db_comment='未获奖率', default=0.0)),
+                ('award_rate', models.FloatField(db_comment='获奖率', default=0.0)),
+                ('first_prize_rate', models.FloatField(db_comment='一等奖率', default=0.0)),
+                ('second_prize_rate', models.FloatField(db_comment='二等奖率', default=0.0)),
+                ('third_prize_rate', models.FloatField(db_comment='三等奖率', default=0.0)),
+                ('qualification_rate', models.FloatField(db_comment='晋级决赛率', default=0.0)),
+                ('final_first_prize_rate', models.FloatField(db_comment='决赛一等奖率', default=0.0)),
+                ('year', models.CharField(db_comment='年份', max_length=4)),
+                ('area', models.CharField(db_comment='赛区', max_length=50)),
+                ('subproject', models.CharField(db_comment='子项目（企业命题或赛题）', max_length=255)),
+                ('school', models.CharField(db_comment='学校名称', max_length=100)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_comment='最后更新时间')),
+            ],
+            options={
+                'verbose_name': '学校子项目年度统计缓存',
+                'verbose_name_plural': '学校子项目年度统计缓存',
+                'indexes': [models.Index(fields=['year', 'area', 'subproject'], name='demo_school_year_ca63f4_idx')],
+                'unique_together': {('year', 'area', 'subproject', 'school')},
+            },
+        ),
+    ]
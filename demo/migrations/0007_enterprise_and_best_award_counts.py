@@ -0,0 +1,85 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:50
+
+from datetime import datetime, timezone
+
+from django.db import migrations, models
+
+
+def mark_caches_stale(apps, schema_editor):
+    """
+    已有的缓存行新增的计数列都是 0，把它们标记为过期（同 update_stats_cache --mark-stale），
+    之后由后台刷新或重新预热补上
+    """
+    for name in ('SchoolYearlyCache', 'SchoolSubprojectCache', 'SchoolRangeCache'):
+        apps.get_model('demo', name).objects.update(updated_at=datetime(1970, 1, 1, tzinfo=timezone.utc))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('demo', '0006_schoolsubprojectcache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schoolrangecache',
+            name='best_investment_pitch_count',
+            field=models.IntegerField(db_comment='最具投资/最佳路演数量', default=0),
+        ),
+        migrations.AddField(
+            model_name='schoolrangecache',
+            name='best_paper_count',
+            field=models.IntegerField(db_comment='最佳论文数量', default=0),
+        ),
+        migrations.AddField(
+            model_name='schoolrangecache',
+            name='enterprise_advancement_count',
+            field=models.IntegerField(db_comment='企业命题晋级数量', default=0),
+        ),
+        migrations.AddField(
+            model_name='schoolrangecache',
+            name='enterprise_award_count',
+            field=models.IntegerField(db_comment='企业奖项数量', default=0),
+        ),
+        migrations.AddField(
+            model_name='schoolsubprojectcache',
+            name='best_investment_pitch_count',
+            field=models.IntegerField(db_comment='最具投资/最佳路演数量', default=0),
+        ),
+        migrations.AddField(
+            model_name='schoolsubprojectcache',
+            name='best_paper_count',
+            field=models.IntegerField(db_comment='最佳论文数量', default=0),
+        ),
+        migrations.AddField(
+            model_name='schoolsubprojectcache',
+            name='enterprise_advancement_count',
+            field=models.IntegerField(db_comment='企业命题晋级数量', default=0),
+        ),
+        migrations.AddField(
+            model_name='schoolsubprojectcache',
+            name='enterprise_award_count',
+            field=models.IntegerField(db_comment='企业奖项数量', default=0),
+        ),
+        migrations.AddField(
+            model_name='schoolyearlycache',
+            name='best_investment_pitch_count',
+            field=models.IntegerField(db_comment='最具投资/最佳路演数量', default=0),
+        ),
+        migrations.AddField(
+            model_name='schoolyearlycache',
+            name='best_paper_count',
+            field=models.IntegerField(db_comment='最佳论文数量', default=0),
+        ),
+        migrations.AddField(
+            model_name='schoolyearlycache',
+            name='enterprise_advancement_count',
+            field=models.IntegerField(db_comment='企业命题晋级数量', default=0),
+        ),
+        migrations.AddField(
+            model_name='schoolyearlycache',
+            name='enterprise_award_count',
+            field=models.IntegerField(db_comment='企业奖项数量', default=0),
+        ),
+        migrations.RunPython(mark_caches_stale, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('demo', '0007_enterprise_and_best_award_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheWarmupItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run_id', models.CharField(db_comment='预热批次', max_length=64)),
+                ('kind', models.CharField(choices=[('yearly', '年度缓存'), ('range', '多年度汇总')], db_comment='工作项类型', max_length=10)),
+                ('start_year', models.CharField(db_comment='年份（区间为起始年份）', max_length=4)),
+                ('end_year', models.CharField(db_comment='结束年份（年度缓存与起始年份相同）', max_length=4)),
+                ('area', models.CharField(db_comment='赛区', max_length=50)),
+                ('status', models.CharField(choices=[('pending', '待处理'), ('claimed', '处理中'), ('done', '已完成'), ('failed', '失败')], db_comment='状态', default='pending', max_length=10)),
+                ('worker', models.CharField(blank=True, db_comment='认领的工作进程', max_length=100)),
+                ('attempts', models.IntegerField(db_comment='已尝试次数', default=0)),
+                ('claimed_at', models.DateTimeField(db_comment='认领时间', null=True)),
+                ('finished_at', models.DateTimeField(db_comment='完成时间', null=True)),
+                ('elapsed', models.FloatField(db_comment='耗时（秒）', default=0.0)),
+                ('school_count', models.IntegerField(db_comment='写入的学校数', default=0)),
+                ('error', models.TextField(blank=True, db_comment='最后一次的错误信息')),
+            ],
+            options={
+                'verbose_name': '缓存预热工作项',
+                'verbose_name_plural': '缓存预热工作项',
+                'indexes': [models.Index(fields=['run_id', 'kind', 'status'], name='demo_cachew_run_id_d8f1b0_idx')],
+                'unique_together': {('run_id', 'kind', 'start_year', 'end_year', 'area')},
+            },
+        ),
+    ]
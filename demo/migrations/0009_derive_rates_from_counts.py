@@ -0,0 +1,97 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('demo', '0008_cachewarmupitem'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='schoolrangecache',
+            name='award_rate',
+        ),
+        migrations.RemoveField(
+            model_name='schoolrangecache',
+            name='final_first_prize_rate',
+        ),
+        migrations.RemoveField(
+            model_name='schoolrangecache',
+            name='first_prize_rate',
+        ),
+        migrations.RemoveField(
+            model_name='schoolrangecache',
+            name='no_award_rate',
+        ),
+        migrations.RemoveField(
+            model_name='schoolrangecache',
+            name='qualification_rate',
+        ),
+        migrations.RemoveField(
+            model_name='schoolrangecache',
+            name='second_prize_rate',
+        ),
+        migrations.RemoveField(
+            model_name='schoolrangecache',
+            name='third_prize_rate',
+        ),
+        migrations.RemoveField(
+            model_name='schoolsubprojectcache',
+            name='award_rate',
+        ),
+        migrations.RemoveField(
+            model_name='schoolsubprojectcache',
+            name='final_first_prize_rate',
+        ),
+        migrations.RemoveField(
+            model_name='schoolsubprojectcache',
+            name='first_prize_rate',
+        ),
+        migrations.RemoveField(
+            model_name='schoolsubprojectcache',
+            name='no_award_rate',
+        ),
+        migrations.RemoveField(
+            model_name='schoolsubprojectcache',
+            name='qualification_rate',
+        ),
+        migrations.RemoveField(
+            model_name='schoolsubprojectcache',
+            name='second_prize_rate',
+        ),
+        migrations.RemoveField(
+            model_name='schoolsubprojectcache',
+            name='third_prize_rate',
+        ),
+        migrations.RemoveField(
+            model_name='schoolyearlycache',
+            name='award_rate',
+        ),
+        migrations.RemoveField(
+            model_name='schoolyearlycache',
+            name='final_first_prize_rate',
+        ),
+        migrations.RemoveField(
+            model_name='schoolyearlycache',
+            name='first_prize_rate',
+        ),
+        migrations.RemoveField(
+            model_name='schoolyearlycache',
+            name='no_award_rate',
+        ),
+        migrations.RemoveField(
+            model_name='schoolyearlycache',
+            name='qualification_rate',
+        ),
+        migrations.RemoveField(
+            model_name='schoolyearlycache',
+            name='second_prize_rate',
+        ),
+        migrations.RemoveField(
+            model_name='schoolyearlycache',
+            name='third_prize_rate',
+        ),
+    ]
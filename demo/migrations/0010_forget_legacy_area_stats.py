@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    AreaStats / NorthwestSchoolStats 已不再使用，这里只从模型状态中移除，
+    旧表 area_stats / northwest_school_stats 保留在库里，确认无用后由 DBA 手工删除
+    """
+
+    dependencies = [
+        ('demo', '0009_derive_rates_from_counts'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.DeleteModel(
+                    name='AreaStats',
+                ),
+                migrations.DeleteModel(
+                    name='NorthwestSchoolStats',
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('demo', '0010_forget_legacy_area_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schoolrangecache',
+            name='source_updated_at',
+            field=models.DateTimeField(db_comment='汇总时所用年度缓存的最后更新时间', null=True),
+        ),
+    ]
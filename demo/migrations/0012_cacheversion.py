@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('demo', '0011_schoolrangecache_source_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheVersion',
+            fields=[
+                ('name', models.CharField(db_comment='版本名称', max_length=64, primary_key=True, serialize=False)),
+                ('version', models.BigIntegerField(db_comment='版本号', default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_comment='最后更新时间')),
+            ],
+            options={
+                'verbose_name': '缓存版本',
+                'verbose_name_plural': '缓存版本',
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('demo', '0012_cacheversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AwardClass',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.CharField(db_comment='奖项取值', max_length=50, unique=True)),
+                ('preliminary_flags', models.IntegerField(db_comment='作为初赛奖项时的位标志', default=0)),
+                ('final_flags', models.IntegerField(db_comment='作为决赛（技术/商业）奖项时的位标志', default=0)),
+                ('enterprise_flags', models.IntegerField(db_comment='作为企业奖项时的位标志', default=0)),
+            ],
+            options={
+                'verbose_name': '奖项分类',
+                'verbose_name_plural': '奖项分类',
+            },
+        ),
+    ]
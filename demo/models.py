@@ -49,6 +49,23 @@ class TeamAchievement(models.Model):
     best_paper = models.IntegerField(blank=True, null=True, db_comment='最佳论文')
     best_investment_pitch = models.IntegerField(blank=True, null=True, db_comment='最具投资/最佳路演')
     year = models.CharField(max_length=4, blank=True, null=True)
+    # 奖项字符串 → 位标志的分类表，只声明关联关系（没有对应的列），统计时按取值 LEFT JOIN AwardClass 表
+    preliminary_class = models.ForeignObject(
+        'AwardClass', on_delete=models.DO_NOTHING, from_fields=['preliminary_award'], to_fields=['value'],
+        null=True, related_name='+',
+    )
+    final_technology_class = models.ForeignObject(
+        'AwardClass', on_delete=models.DO_NOTHING, from_fields=['final_technology'], to_fields=['value'],
+        null=True, related_name='+',
+    )
+    final_business_class = models.ForeignObject(
+        'AwardClass', on_delete=models.DO_NOTHING, from_fields=['final_business'], to_fields=['value'],
+        null=True, related_name='+',
+    )
+    enterprise_class = models.ForeignObject(
+        'AwardClass', on_delete=models.DO_NOTHING, from_fields=['enterprise_award'], to_fields=['value'],
+        null=True, related_name='+',
+    )
 
     class Meta:
         managed = False
@@ -83,6 +100,11 @@ class TeamMember(models.Model):
     create_year = models.CharField(max_length=4, blank=True, null=True, db_comment='创建年份')
     is_current = models.IntegerField(blank=True, null=True, db_comment='是否当前')
     previous_version_id = models.IntegerField(blank=True, null=True, db_comment='前一版本ID')
+    # team_code 在库里不是外键，这里只声明关联关系（没有对应的列），查询时可以直接 JOIN team 表
+    team = models.ForeignObject(
+        Team, on_delete=models.DO_NOTHING, from_fields=['team_code'], to_fields=['team_code'],
+        related_name='members',
+    )
 
     class Meta:
         managed = False
@@ -92,14 +114,11 @@ class TeamMember(models.Model):
         db_tablespace = 'yyds_mysql'
 
 
-class SchoolYearlyCache(models.Model):
+class SchoolStatsBase(models.Model):
     """
-    缓存按 年+赛区+学校 汇总的统计数据
+    学校统计字段，年度缓存和多年度汇总共用。只保存计数，比率在读取时由计数算出（RATE_COUNT_FIELDS），
+    任意粒度的汇总都可以由更细粒度的计数直接相加得到，见 services/aggregate.py
     """
-    # 基本属性字段
-    year                    = models.CharField(max_length=4, db_comment='年份')
-    area                    = models.CharField(max_length=50, db_comment='赛区')
-    school                  = models.CharField(max_length=100, db_comment='学校名称')
     # 基本统计字段
     participant_count       = models.IntegerField(default=0, db_comment='参赛人数')
     team_count              = models.IntegerField(default=0, db_comment='参赛队伍数量')
@@ -110,14 +129,24 @@ class SchoolYearlyCache(models.Model):
     qualification_count     = models.IntegerField(default=0, db_comment='晋级决赛数量')
     final_first_prize_count = models.IntegerField(default=0, db_comment='决赛一等奖数量')
     no_award_team_count     = models.IntegerField(default=0, db_comment='失败的队伍数量')
-    # 初级计算字段
-    no_award_rate           = models.FloatField(default=0.0, db_comment='未获奖率')
-    award_rate              = models.FloatField(default=0.0, db_comment='获奖率')
-    first_prize_rate        = models.FloatField(default=0.0, db_comment='一等奖率')
-    second_prize_rate       = models.FloatField(default=0.0, db_comment='二等奖率')
-    third_prize_rate        = models.FloatField(default=0.0, db_comment='三等奖率')
-    qualification_rate      = models.FloatField(default=0.0, db_comment='晋级决赛率')
-    final_first_prize_rate  = models.FloatField(default=0.0, db_comment='决赛一等奖率')
+    # 企业命题及单项奖
+    enterprise_award_count       = models.IntegerField(default=0, db_comment='企业奖项数量')
+    enterprise_advancement_count = models.IntegerField(default=0, db_comment='企业命题晋级数量')
+    best_paper_count             = models.IntegerField(default=0, db_comment='最佳论文数量')
+    best_investment_pitch_count  = models.IntegerField(default=0, db_comment='最具投资/最佳路演数量')
+
+    class Meta:
+        abstract = True
+
+
+class SchoolYearlyCache(SchoolStatsBase):
+    """
+    缓存按 年+赛区+学校 汇总的统计数据
+    """
+    # 基本属性字段
+    year                    = models.CharField(max_length=4, db_comment='年份')
+    area                    = models.CharField(max_length=50, db_comment='赛区')
+    school                  = models.CharField(max_length=100, db_comment='学校名称')
     # 数据记录字段
     updated_at              = models.DateTimeField(auto_now=True, db_comment='最后更新时间')
     class Meta:
@@ -126,4 +155,178 @@ class SchoolYearlyCache(models.Model):
             models.Index(fields=["year", "area"]),
         ]
         verbose_name = "学校年度统计缓存"
-        verbose_name_plural = verbose_name
\ No newline at end of file
+        verbose_name_plural = verbose_name
+
+
+class SchoolSubprojectCache(SchoolStatsBase):
+    """
+    缓存按 年+赛区+子项目+学校 汇总的统计数据，子项目见 statistics._subproject_expr
+    """
+    # 基本属性字段
+    year                    = models.CharField(max_length=4, db_comment='年份')
+    area                    = models.CharField(max_length=50, db_comment='赛区')
+    subproject              = models.CharField(max_length=255, db_comment='子项目（企业命题或赛题）')
+    school                  = models.CharField(max_length=100, db_comment='学校名称')
+    # 数据记录字段
+    updated_at              = models.DateTimeField(auto_now=True, db_comment='最后更新时间')
+    class Meta:
+        unique_together = (("year", "area", "subproject", "school"),)
+        indexes = [
+            models.Index(fields=["year", "area", "subproject"]),
+        ]
+        verbose_name = "学校子项目年度统计缓存"
+        verbose_name_plural = verbose_name
+
+
+class SchoolRangeCache(SchoolStatsBase):
+    """
+    按 赛区+起止年份+学校 预先汇总的多年度统计数据，计数字段为各年之和。
+    区间内任一年度缓存在 source_updated_at 之后重新计算过，这份汇总即视为过期
+    """
+    # 基本属性字段
+    area                    = models.CharField(max_length=50, db_comment='赛区')
+    start_year              = models.CharField(max_length=4, db_comment='起始年份')
+    end_year                = models.CharField(max_length=4, db_comment='结束年份')
+    school                  = models.CharField(max_length=100, db_comment='学校名称')
+    rank                    = models.IntegerField(default=0, db_comment='按参赛队伍总数的排名')
+    # 数据记录字段
+    updated_at              = models.DateTimeField(auto_now=True, db_comment='最后更新时间')
+    source_updated_at       = models.DateTimeField(null=True, db_comment='汇总时所用年度缓存的最后更新时间')
+    class Meta:
+        unique_together = (("area", "start_year", "end_year", "school"),)
+        indexes = [
+            models.Index(fields=["area", "start_year", "end_year", "rank"]),
+        ]
+        verbose_name = "学校多年度统计汇总"
+        verbose_name_plural = verbose_name
+
+
+
+class SchoolTrendCache(models.Model):
+    """
+    与 SchoolRangeCache 一起生成的逐年趋势：每个 赛区+起止年份+学校 在区间内每年一行，
+    school 为空字符串的行是整个赛区的合计
+    """
+    area                     = models.CharField(max_length=50, db_comment='赛区')
+    start_year               = models.CharField(max_length=4, db_comment='起始年份')
+    end_year                 = models.CharField(max_length=4, db_comment='结束年份')
+    school                   = models.CharField(max_length=100, blank=True, db_comment='学校名称')
+    year                     = models.CharField(max_length=4, db_comment='年份')
+    # 趋势字段
+    team_count               = models.IntegerField(default=0, db_comment='参赛队伍数量')
+    team_count_growth        = models.FloatField(null=True, db_comment='队伍数同比增长率')
+    team_count_avg           = models.FloatField(default=0.0, db_comment='队伍数滑动平均')
+    participant_count        = models.IntegerField(default=0, db_comment='参赛人数')
+    participant_count_growth = models.FloatField(null=True, db_comment='参赛人数同比增长率')
+    rank                     = models.IntegerField(null=True, db_comment='当年按队伍数的排名')
+    rank_change              = models.IntegerField(null=True, db_comment='排名变化（正数为上升）')
+    award_rate               = models.FloatField(default=0.0, db_comment='获奖率')
+    award_rate_change        = models.FloatField(null=True, db_comment='获奖率同比变化')
+    # 数据记录字段
+    updated_at               = models.DateTimeField(auto_now=True, db_comment='最后更新时间')
+    class Meta:
+        unique_together = (("area", "start_year", "end_year", "school", "year"),)
+        indexes = [
+            models.Index(fields=["area", "start_year", "end_year"]),
+        ]
+        verbose_name = "学校多年度趋势"
+        verbose_name_plural = verbose_name
+
+class CacheWarmupItem(models.Model):
+    """
+    缓存预热的工作项认领表：每次预热（run_id）按 年份+赛区 或 区间+赛区 拆成工作项，
+    多个进程/主机通过条件更新认领工作项，崩溃后用同一个 run_id 重新运行即可从断点继续
+    """
+    PENDING = 'pending'
+    CLAIMED = 'claimed'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, '待处理'), (CLAIMED, '处理中'), (DONE, '已完成'), (FAILED, '失败')]
+
+    YEARLY = 'yearly'
+    RANGE = 'range'
+    KIND_CHOICES = [(YEARLY, '年度缓存'), (RANGE, '多年度汇总')]
+
+    run_id                  = models.CharField(max_length=64, db_comment='预热批次')
+    kind                    = models.CharField(max_length=10, choices=KIND_CHOICES, db_comment='工作项类型')
+    start_year              = models.CharField(max_length=4, db_comment='年份（区间为起始年份）')
+    end_year                = models.CharField(max_length=4, db_comment='结束年份（年度缓存与起始年份相同）')
+    area                    = models.CharField(max_length=50, db_comment='赛区')
+    status                  = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING, db_comment='状态')
+    worker                  = models.CharField(max_length=100, blank=True, db_comment='认领的工作进程')
+    attempts                = models.IntegerField(default=0, db_comment='已尝试次数')
+    claimed_at              = models.DateTimeField(null=True, db_comment='认领时间')
+    finished_at             = models.DateTimeField(null=True, db_comment='完成时间')
+    elapsed                 = models.FloatField(default=0.0, db_comment='耗时（秒）')
+    school_count            = models.IntegerField(default=0, db_comment='写入的学校数')
+    error                   = models.TextField(blank=True, db_comment='最后一次的错误信息')
+    class Meta:
+        unique_together = (("run_id", "kind", "start_year", "end_year", "area"),)
+        indexes = [
+            models.Index(fields=["run_id", "kind", "status"]),
+        ]
+        verbose_name = "缓存预热工作项"
+        verbose_name_plural = verbose_name
+
+class CacheVersion(models.Model):
+    """
+    进程内缓存的共享版本号：导入数据后递增，各进程读到新版本时丢弃自己的进程内缓存，
+    见 demo/services/invalidation.py
+    """
+    name                    = models.CharField(max_length=64, primary_key=True, db_comment='版本名称')
+    version                 = models.BigIntegerField(default=0, db_comment='版本号')
+    updated_at              = models.DateTimeField(auto_now=True, db_comment='最后更新时间')
+    class Meta:
+        verbose_name = "缓存版本"
+        verbose_name_plural = verbose_name
+
+class AwardClass(models.Model):
+    """
+    奖项字符串的分类结果：每个不同的取值一行，按它出现在哪一列分别记下位标志（见 demo/services/awards.py）。
+    由 awards.sync_award_classes 根据分类规则写入，统计查询把奖项列 JOIN 到本表后对位标志求和
+    """
+    value                   = models.CharField(max_length=50, unique=True, db_comment='奖项取值')
+    preliminary_flags       = models.IntegerField(default=0, db_comment='作为初赛奖项时的位标志')
+    final_flags             = models.IntegerField(default=0, db_comment='作为决赛（技术/商业）奖项时的位标志')
+    enterprise_flags        = models.IntegerField(default=0, db_comment='作为企业奖项时的位标志')
+    class Meta:
+        verbose_name = "奖项分类"
+        verbose_name_plural = verbose_name
+
+# 比率字段 → 计算该比率所用的计数字段，比率 = 计数 / 队伍数，不入库
+RATE_COUNT_FIELDS = {
+    'no_award_rate': 'no_award_team_count',
+    'award_rate': 'award_count',
+    'first_prize_rate': 'first_prize_count',
+    'second_prize_rate': 'second_prize_count',
+    'third_prize_rate': 'third_prize_count',
+    'qualification_rate': 'qualification_count',
+    'final_first_prize_rate': 'final_first_prize_count',
+}
+RATE_FIELD_LABELS = {
+    'no_award_rate': '未获奖率',
+    'award_rate': '获奖率',
+    'first_prize_rate': '一等奖率',
+    'second_prize_rate': '二等奖率',
+    'third_prize_rate': '三等奖率',
+    'qualification_rate': '晋级决赛率',
+    'final_first_prize_rate': '决赛一等奖率',
+}
+
+# 统计字段及各字段的中文名在模型加载时算好一次，统计、画图、导出时直接查表，不再反查 _meta
+# COUNT_FIELDS 为入库的计数字段；STAT_FIELDS 为统计记录的全部字段（计数 + 读取时算出的比率）
+COUNT_FIELDS = [field.name for field in SchoolStatsBase._meta.fields]
+STAT_FIELDS = COUNT_FIELDS + list(RATE_COUNT_FIELDS)
+FIELD_LABELS = {
+    **{
+        field.name: field.db_comment
+        for model in (SchoolYearlyCache, SchoolRangeCache, SchoolSubprojectCache)
+        for field in model._meta.fields if field.db_comment
+    },
+    **RATE_FIELD_LABELS,
+}
+TREND_FIELDS = [
+    field.name for field in SchoolTrendCache._meta.fields
+    if field.name not in {'id', 'area', 'start_year', 'end_year', 'school', 'year', 'updated_at'}
+]
+TREND_FIELD_LABELS = {field.name: field.db_comment for field in SchoolTrendCache._meta.fields}
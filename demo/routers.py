@@ -0,0 +1,34 @@
+# demo/routers.py
+from django.conf import settings
+
+# 源数据（团队、成员、成绩）所在的只读副本别名，未配置时源数据也走 default
+SOURCE_DB_ALIAS = 'yyds_mysql'
+# 只读的源数据表，其余（统计缓存、汇总表等）都在主库
+SOURCE_MODELS = {'team', 'teammember', 'teamachievement'}
+
+
+class YYDSRouter:
+    """
+    读写分离：
+      - Team / TeamMember / TeamAchievement 的读取走只读副本 yyds_mysql
+      - 所有写入（SchoolYearlyCache、汇总表、源数据的修正）都走主库 default
+      - 迁移只在主库执行
+    """
+
+    def _is_source(self, model) -> bool:
+        return model._meta.app_label == 'demo' and model._meta.model_name in SOURCE_MODELS
+
+    def db_for_read(self, model, **hints):
+        if self._is_source(model) and SOURCE_DB_ALIAS in settings.DATABASES:
+            return SOURCE_DB_ALIAS
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # 副本与主库是同一份数据，允许跨别名关联
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -0,0 +1,92 @@
+# demo/services/aggregate.py
+"""
+可合并的学校统计：缓存表只存计数，比率在读取时由计数算出。
+
+  - 合并：计数逐项相加，满足结合律和交换律，年 → 区间、赛区 → 全国、学校 → 赛区合计
+    都由更细粒度的聚合在内存中一次遍历得到（O(行数)），不需要回源重新聚合
+  - 比率：计数 / 队伍数，合并之后再算，天然是按队伍数加权的结果；不对各年的比率取平均
+  - 参赛人数按人去重（STATS_DISTINCT_PARTICIPANTS）时不可相加，合并后的 participant_count 由调用方
+    按人员集合的并集覆盖，见 statistics.range_participant_counts / subproject_participant_counts
+  - derive_rates：读取缓存、源数据分组结果时在记录上补上比率字段
+  - rate_expression：需要在数据库里按比率排序时（排行榜）使用的等价表达式
+"""
+from typing import Any, Dict, Iterable, Mapping
+
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+from demo.models import COUNT_FIELDS, RATE_COUNT_FIELDS
+
+
+def derive_rates(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    按记录里的计数补上各比率字段，原地修改并返回该记录；没有队伍时比率为 0
+    """
+    team_count = record.get('team_count') or 0
+    for rate_field, count_field in RATE_COUNT_FIELDS.items():
+        record[rate_field] = (record.get(count_field) or 0) / team_count if team_count else 0.0
+    return record
+
+
+def rate_expression(rate_field: str):
+    """
+    比率字段在数据库中的计算表达式，队伍数为 0 时取 0
+    """
+    count_field = RATE_COUNT_FIELDS[rate_field]
+    return Coalesce(
+        Cast(F(count_field), FloatField()) / NullIf(F('team_count'), 0),
+        Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+class StatsAggregate:
+    """
+    一组队伍的统计计数，可以和其他 StatsAggregate 或统计记录合并
+    """
+    __slots__ = ('counts',)
+
+    def __init__(self, counts: Mapping[str, Any] | None = None):
+        """
+        :param counts: 统计记录或计数字典，只取 COUNT_FIELDS，其余字段（比率、排名）忽略
+        """
+        counts = counts or {}
+        self.counts: Dict[str, int] = {field: counts.get(field) or 0 for field in COUNT_FIELDS}
+
+    @classmethod
+    def merge_all(cls, items: Iterable['StatsAggregate | Mapping[str, Any]']) -> 'StatsAggregate':
+        """
+        合并任意多个聚合或统计记录
+        """
+        total = cls()
+        for item in items:
+            total += item
+        return total
+
+    def __iadd__(self, other: 'StatsAggregate | Mapping[str, Any]') -> 'StatsAggregate':
+        other_counts = other.counts if isinstance(other, StatsAggregate) else other
+        counts = self.counts
+        for field in COUNT_FIELDS:
+            counts[field] += other_counts.get(field) or 0
+        return self
+
+    def __add__(self, other: 'StatsAggregate | Mapping[str, Any]') -> 'StatsAggregate':
+        merged = StatsAggregate(self.counts)
+        merged += other
+        return merged
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, StatsAggregate) and self.counts == other.counts
+
+    def __repr__(self) -> str:
+        return f"StatsAggregate({self.counts!r})"
+
+    def rate(self, rate_field: str) -> float:
+        team_count = self.counts['team_count']
+        return self.counts[RATE_COUNT_FIELDS[rate_field]] / team_count if team_count else 0.0
+
+    def to_record(self) -> Dict[str, Any]:
+        """
+        转成统计记录：计数加上算出的比率，字段同 STAT_FIELDS
+        """
+        return derive_rates(dict(self.counts))
@@ -0,0 +1,306 @@
+# demo/services/awards.py
+"""
+奖项分类：把 preliminary_award / final_technology / final_business 的各种取值映射为统计桶的位标志。
+每个不同的字符串只分类一次，统计时按位标志累加，不再每行做字符串匹配。
+
+  - Python 侧（内存后端等）：查表得到每支队伍的位标志，按位累加到各个计数字段
+  - SQL 侧：分类结果写入 AwardClass 表，各奖项列按取值 LEFT JOIN 该表得到每支队伍的位标志，
+    每个计数字段是对应位的 Sum，口径与 Python 侧一致
+
+取值按完整字符串匹配，不做子串匹配（'未晋级' 含有 '晋级'，但既不是获奖也不是晋级）。
+"""
+import functools
+import logging
+import operator
+import time
+from typing import Any, Dict, Iterable
+
+from django.db import transaction
+from django.db.models import Case, F, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from demo.models import AwardClass, TeamAchievement
+from demo.services.invalidation import source_version
+
+logger = logging.getLogger(__name__)
+
+# ---------- 位标志 ---------- #
+AWARDED = 1 << 0            # 获奖（初赛有有效奖项）
+FIRST_PRIZE = 1 << 1        # 分赛区一等奖（含晋级）
+SECOND_PRIZE = 1 << 2       # 分赛区二等奖
+THIRD_PRIZE = 1 << 3        # 分赛区三等奖
+QUALIFIED = 1 << 4          # 晋级决赛
+NO_AWARD = 1 << 5           # 初赛没有奖项（NULL）
+FINAL_FIRST_PRIZE = 1 << 6  # 决赛一等奖（技术或商业）
+ENTERPRISE_AWARD = 1 << 7         # 企业命题获奖
+ENTERPRISE_ADVANCEMENT = 1 << 8   # 企业命题晋级
+BEST_PAPER = 1 << 9               # 最佳论文
+BEST_INVESTMENT_PITCH = 1 << 10   # 最具投资价值 / 最佳路演
+
+# 统计字段 → 位标志
+BUCKET_FIELDS = {
+    'award_count': AWARDED,
+    'qualification_count': QUALIFIED,
+    'first_prize_count': FIRST_PRIZE,
+    'second_prize_count': SECOND_PRIZE,
+    'third_prize_count': THIRD_PRIZE,
+    'no_award_team_count': NO_AWARD,
+    'final_first_prize_count': FINAL_FIRST_PRIZE,
+    'enterprise_award_count': ENTERPRISE_AWARD,
+    'enterprise_advancement_count': ENTERPRISE_ADVANCEMENT,
+    'best_paper_count': BEST_PAPER,
+    'best_investment_pitch_count': BEST_INVESTMENT_PITCH,
+}
+
+# 企业命题及单项奖的统计字段
+SPECIAL_AWARD_FIELDS = [
+    'enterprise_award_count', 'enterprise_advancement_count', 'best_paper_count', 'best_investment_pitch_count',
+]
+
+# 整数标记列（大于 0 即为获得）→ 统计字段
+FLAG_COLUMNS = {
+    'enterprise_advancement': 'enterprise_advancement_count',
+    'best_paper': 'best_paper_count',
+    'best_investment_pitch': 'best_investment_pitch_count',
+}
+
+# 初赛奖项 → 位标志，按完整取值匹配（与原先 SQL 中逐个列出的取值一致）
+PRELIMINARY_AWARD_FLAGS = {
+    '一等奖': AWARDED | FIRST_PRIZE,
+    '一等奖(晋级)': AWARDED | FIRST_PRIZE | QUALIFIED,
+    '晋级': AWARDED | FIRST_PRIZE | QUALIFIED,
+    '二等奖': AWARDED | SECOND_PRIZE,
+    '三等奖': AWARDED | THIRD_PRIZE,
+}
+
+# 决赛（技术/商业）奖项里算作一等奖的取值
+FINAL_FIRST_PRIZE_VALUES = {'一等奖'}
+
+# 企业命题奖项里算作获奖的取值
+ENTERPRISE_AWARD_VALUES = {'一等奖', '二等奖', '三等奖'}
+
+# 明确不算获奖的取值，初赛奖项和企业奖项通用
+NOT_AWARDED_VALUES = {'', '重复参赛', '未晋级', '未获奖', '无', '-', '—', '/'}
+
+# 分类表在进程内的有效期（秒）；导入数据后 bump_source_version 递增版本号，各进程随之重新读取
+AWARD_TAXONOMY_TTL = 600
+
+
+def _log_unknown(column: str, value: str):
+    logger.warning("未登记的%s取值 %r，按获奖计数，请在 demo/services/awards.py 中登记", column, value)
+
+
+@functools.lru_cache(maxsize=None)
+def classify_preliminary(value: str | None) -> int:
+    """
+    初赛奖项 → 位标志。
+    只认 PRELIMINARY_AWARD_FLAGS 和 NOT_AWARDED_VALUES 中的完整取值；
+    其他取值只算获奖，不计入任何等级，并记一条警告
+    """
+    if value is None:
+        return NO_AWARD
+    if value in NOT_AWARDED_VALUES:
+        return 0
+    if value in PRELIMINARY_AWARD_FLAGS:
+        return PRELIMINARY_AWARD_FLAGS[value]
+    _log_unknown('初赛奖项', value)
+    return AWARDED
+
+
+@functools.lru_cache(maxsize=None)
+def classify_final(value: str | None) -> int:
+    """
+    决赛（技术/商业）奖项 → 位标志
+    """
+    if value in FINAL_FIRST_PRIZE_VALUES:
+        return FINAL_FIRST_PRIZE
+    return 0
+
+
+@functools.lru_cache(maxsize=None)
+def classify_enterprise(value: str | None) -> int:
+    """
+    企业奖项 → 位标志，口径同 classify_preliminary：
+    ENTERPRISE_AWARD_VALUES 中的取值算获奖，NOT_AWARDED_VALUES 中的不算，其他取值算获奖并记一条警告
+    """
+    if value is None or value in NOT_AWARDED_VALUES:
+        return 0
+    if value not in ENTERPRISE_AWARD_VALUES:
+        _log_unknown('企业奖项', value)
+    return ENTERPRISE_AWARD
+
+
+def team_award_flags(
+    preliminary_award: str | None,
+    final_technology: str | None,
+    final_business: str | None,
+    enterprise_award: str | None = None,
+    enterprise_advancement: int | None = None,
+    best_paper: int | None = None,
+    best_investment_pitch: int | None = None,
+) -> int:
+    """
+    一支队伍成绩的位标志
+    """
+    flags = (
+        classify_preliminary(preliminary_award)
+        | classify_final(final_technology)
+        | classify_final(final_business)
+        | classify_enterprise(enterprise_award)
+    )
+    for value, field in zip(
+        (enterprise_advancement, best_paper, best_investment_pitch), FLAG_COLUMNS.values()
+    ):
+        if value and value > 0:
+            flags |= BUCKET_FIELDS[field]
+    return flags
+
+
+def add_award_flags(rec: dict, flags: int):
+    """
+    按位标志把一支队伍累加到学校记录的各个计数字段
+    """
+    for field, bit in BUCKET_FIELDS.items():
+        if flags & bit:
+            rec[field] += 1
+
+
+class AwardTaxonomy:
+    """
+    当前数据里出现过的所有奖项字符串及其位标志
+    """
+
+    def __init__(
+        self,
+        preliminary_values: Iterable[str | None],
+        final_values: Iterable[str | None],
+        enterprise_values: Iterable[str | None] = (),
+    ):
+        self.preliminary: Dict[str, int] = {
+            value: classify_preliminary(value) for value in preliminary_values if value is not None
+        }
+        self.final: Dict[str, int] = {
+            value: classify_final(value) for value in final_values if value is not None
+        }
+        self.enterprise: Dict[str, int] = {
+            value: classify_enterprise(value) for value in enterprise_values if value is not None
+        }
+
+    def _values_with(self, table: Dict[str, int], bit: int) -> list[str]:
+        return sorted(value for value, flags in table.items() if flags & bit)
+
+    def award_classes(self) -> list[AwardClass]:
+        """
+        每个不同取值一行的 AwardClass，取值没有出现在某一列时该列的位标志为 0
+        """
+        values = set(self.preliminary) | set(self.final) | set(self.enterprise)
+        return [
+            AwardClass(
+                value=value,
+                preliminary_flags=self.preliminary.get(value, 0),
+                final_flags=self.final.get(value, 0),
+                enterprise_flags=self.enterprise.get(value, 0),
+            )
+            for value in sorted(values)
+        ]
+
+    def _flag_terms(self) -> list[tuple[int, Any]]:
+        """
+        一行成绩位标志的各个组成部分（SQL 表达式）及其可能置位的位：
+        各奖项列 LEFT JOIN AwardClass 取对应列的位标志，整数标记列大于 0 时置位；
+        全部按位或即为 team_award_flags 的结果
+        """
+        def joined(relation, column):
+            return Coalesce(F(f'{relation}__{column}'), Value(0))
+
+        def mask(table):
+            return functools.reduce(operator.or_, table.values(), 0)
+
+        terms = [
+            # 初赛奖项为 NULL 的队伍算作没有奖项
+            (mask(self.preliminary) | NO_AWARD, Case(
+                When(preliminary_award__isnull=True, then=Value(NO_AWARD)),
+                default=joined('preliminary_class', 'preliminary_flags'),
+            )),
+            (mask(self.final), joined('final_technology_class', 'final_flags')),
+            (mask(self.final), joined('final_business_class', 'final_flags')),
+            (mask(self.enterprise), joined('enterprise_class', 'enterprise_flags')),
+        ]
+        for column, field in FLAG_COLUMNS.items():
+            bit = BUCKET_FIELDS[field]
+            terms.append((bit, Case(When(**{f'{column}__gt': 0}, then=Value(bit)), default=Value(0))))
+        return terms
+
+    def bucket_sums(self) -> Dict[str, Sum]:
+        """
+        每个计数字段对应的聚合，用于 TeamAchievement 的分组查询：对 JOIN 得到的位标志的相应位求和。
+        每个字段只按位或可能置该位的组成部分，不必每个 Sum 都带上整行的位标志
+        """
+        terms = self._flag_terms()
+        sums = {}
+        for field, bit in BUCKET_FIELDS.items():
+            # 数据里没有任何取值会置该位时（如没有决赛一等奖），该字段恒为 0
+            flags = functools.reduce(
+                lambda a, b: a.bitor(b), [term for term_mask, term in terms if term_mask & bit] or [Value(0)]
+            )
+            sums[field] = Sum(flags.bitrightshift(bit.bit_length() - 1).bitand(1))
+        return sums
+
+
+def sync_award_classes(taxonomy: AwardTaxonomy):
+    """
+    把分类结果写入 AwardClass 表：补上新出现的取值，更新分类规则改变了的取值；
+    多个进程同时写入时由 value 的唯一约束去重
+    :param taxonomy: 当前数据的分类表
+    """
+    existing = {row.value: row for row in AwardClass.objects.all()}
+    flag_fields = ['preliminary_flags', 'final_flags', 'enterprise_flags']
+    missing, changed = [], []
+    for row in taxonomy.award_classes():
+        current = existing.get(row.value)
+        if current is None:
+            missing.append(row)
+        elif any(getattr(current, f) != getattr(row, f) for f in flag_fields):
+            row.pk = current.pk
+            changed.append(row)
+    with transaction.atomic():
+        if missing:
+            AwardClass.objects.bulk_create(missing, ignore_conflicts=True)
+        if changed:
+            AwardClass.objects.bulk_update(changed, flag_fields)
+
+
+_taxonomy: AwardTaxonomy | None = None
+_taxonomy_loaded_at = 0.0
+_taxonomy_version = 0
+
+
+def get_award_taxonomy() -> AwardTaxonomy:
+    """
+    从 team_achievement 取出各奖项字符串字段的所有不同取值并分类，同步到 AwardClass 表，
+    结果在进程内缓存 AWARD_TAXONOMY_TTL 秒，源数据版本号（invalidation.source_version）变化时重新读取
+    """
+    global _taxonomy, _taxonomy_loaded_at, _taxonomy_version
+    version = source_version()
+    if (_taxonomy is None or version != _taxonomy_version
+            or time.monotonic() - _taxonomy_loaded_at > AWARD_TAXONOMY_TTL):
+        def distinct(field):
+            return TeamAchievement.objects.order_by().values_list(field, flat=True).distinct()
+
+        _taxonomy = AwardTaxonomy(
+            distinct('preliminary_award'),
+            list(distinct('final_technology')) + list(distinct('final_business')),
+            distinct('enterprise_award'),
+        )
+        sync_award_classes(_taxonomy)
+        _taxonomy_loaded_at = time.monotonic()
+        _taxonomy_version = version
+    return _taxonomy
+
+
+def invalidate_award_taxonomy():
+    """
+    清空本进程的分类表，下次统计时重新读取奖项取值；其他进程的失效见 invalidation.bump_source_version
+    """
+    global _taxonomy
+    _taxonomy = None
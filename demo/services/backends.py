@@ -0,0 +1,351 @@
+# demo/services/backends.py
+"""
+统计后端：把"从源数据算出学校统计"这一步抽象出来
+  - OrmStatsBackend: 默认实现，通过 Django ORM 在 MySQL 上聚合
+  - MemoryStatsBackend: 一次性把 team / team_member / team_achievement 三张表读进内存，
+    全部在内存里分组计算，可以从 CSV/Parquet 导出文件加载，离线分析和测试时不连生产库
+
+通过 settings.STATS_BACKEND 选择后端，statistics.py 的对外接口保持不变。
+"""
+import csv
+import functools
+import hashlib
+import os
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Tuple
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from demo.models import Team, TeamMember, TeamAchievement
+from demo.services.aggregate import derive_rates
+from demo.services.awards import BUCKET_FIELDS, add_award_flags, team_award_flags
+from demo.services.cache import get_snapshot_store
+from demo.services.statistics import (
+    _build_range_stats, _query_captain_schools, _query_person_keys, _query_raw_data, _query_yearly_stats,
+    NO_SUBPROJECT
+)
+
+# CSV 里表示 NULL 的标记，和 MySQL 导出一致；用来区分空字符串和 NULL
+CSV_NULL = '\\N'
+
+# 内存引擎用到的列，导出文件至少要包含这些列
+TEAM_COLUMNS = ['team_code', 'competition_zone', 'create_year', 'competition_topic', 'enterprise_proposition']
+MEMBER_COLUMNS = [
+    'member_code', 'team_code', 'school', 'member_type', 'member_type_detail',
+    'team_order', 'create_year', 'is_current', 'student_id', 'email',
+]
+ACHIEVEMENT_COLUMNS = [
+    'team_code', 'preliminary_award', 'final_technology', 'final_business',
+    'enterprise_award', 'enterprise_advancement', 'best_paper', 'best_investment_pitch',
+]
+INT_COLUMNS = {'team_order', 'is_current', 'enterprise_advancement', 'best_paper', 'best_investment_pitch'}
+
+
+class StatsBackend:
+    """
+    统计后端接口
+    """
+
+    @classmethod
+    def from_settings(cls) -> 'StatsBackend':
+        """按 settings 创建后端实例"""
+        return cls()
+
+    def captain_schools(self, year: int, area: str) -> Dict[str, str | None]:
+        """
+        指定年份、赛区各队伍队长所在学校 {team_code: school}
+        """
+        raise NotImplementedError
+
+    def school_stats(self, year: int, area: str) -> Dict[str, Dict[str, Any]]:
+        """
+        指定年份、赛区各学校的参赛与获奖统计 {school: {...}}，字段同 SchoolYearlyCache
+        """
+        raise NotImplementedError
+
+    def subproject_stats(self, year: int, area: str) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        指定年份、赛区按子项目拆分的学校统计 {subproject: {school: {...}}}，口径同 school_stats
+        """
+        raise NotImplementedError
+
+    def yearly_stats(self, year: int, area: str) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Dict[str, Any]]]]:
+        """
+        同时返回 (school_stats, subproject_stats)，刷新年度缓存时使用；
+        后端可以覆盖这个方法，用一次分组得到两份结果
+        """
+        return self.school_stats(year, area), self.subproject_stats(year, area)
+
+    def person_keys(self, years: List[int], area: str, by_subproject: bool = False) -> Dict[Any, set]:
+        """
+        指定年份（可多年）、赛区各学校参赛人员的识别键集合 {school: {person_key, …}}，
+        by_subproject 为 True 时键为 (school, subproject)；按人去重时用来合并多年、多校的参赛人数
+        """
+        raise NotImplementedError
+
+    def range_stats(self, start_year: int, end_year: int, area: str) -> List[Tuple[str, dict]]:
+        """
+        指定年份区间、赛区的多年度汇总，按参赛队伍总数排名
+        """
+        years = list(range(start_year, end_year + 1))
+        data_by_year = {temp_year: self.school_stats(temp_year, area) for temp_year in years}
+        participant_counts = None
+        if getattr(settings, 'STATS_DISTINCT_PARTICIPANTS', False):
+            participant_counts = {school: len(keys) for school, keys in self.person_keys(years, area).items()}
+        return _build_range_stats(data_by_year, participant_counts)
+
+
+class OrmStatsBackend(StatsBackend):
+    """
+    通过 Django ORM 在数据库里聚合
+    """
+
+    def captain_schools(self, year: int, area: str) -> Dict[str, str | None]:
+        return _query_captain_schools(year, area)
+
+    def school_stats(self, year: int, area: str) -> Dict[str, Dict[str, Any]]:
+        rows = _query_raw_data(year, area)
+        # 没有学校的队伍跳过
+        return {row['school']: row for row in rows if row['school']}
+
+    def yearly_stats(self, year: int, area: str) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Dict[str, Any]]]]:
+        return _query_yearly_stats(year, area)
+
+    def person_keys(self, years: List[int], area: str, by_subproject: bool = False) -> Dict[Any, set]:
+        return _query_person_keys(years, area, by_subproject)
+
+    def subproject_stats(self, year: int, area: str) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        stats = {}
+        for row in _query_raw_data(year, area, by_subproject=True):
+            if row['school']:
+                stats.setdefault(row.pop('subproject'), {})[row['school']] = row
+        return stats
+
+
+class MemoryStatsBackend(StatsBackend):
+    """
+    纯内存统计引擎：三张源表只加载一次并建好索引，之后每次统计只做分组计数。
+    统计口径与 OrmStatsBackend 保持一致，测试中可以互相校验。
+    """
+
+    def __init__(
+        self,
+        teams: Iterable[Dict[str, Any]],
+        members: Iterable[Dict[str, Any]],
+        achievements: Iterable[Dict[str, Any]],
+    ):
+        # (year, area) → [team_code, …]；team_code → 子项目，口径同 statistics._subproject_expr
+        self._teams_by_key = defaultdict(list)
+        self._subproject_by_team = {}
+        for team in teams:
+            self._teams_by_key[(team['create_year'], team['competition_zone'])].append(team['team_code'])
+            self._subproject_by_team[team['team_code']] = (
+                team.get('enterprise_proposition') or team.get('competition_topic') or NO_SUBPROJECT
+            )
+
+        # team_code → [member, …]，按 member_code 排序，与数据库按主键取第一条一致；
+        # 只保留当前版本的成员行（is_current 为 1 或 NULL），与 CURRENT_MEMBER_Q 一致
+        self._members_by_team = defaultdict(list)
+        for member in sorted(members, key=lambda m: m['member_code']):
+            if member.get('is_current') in (1, None):
+                self._members_by_team[member['team_code']].append(member)
+
+        # team_code → achievement；每支队伍的奖项位标志在加载时就算好，
+        # 每个不同的奖项字符串只分类一次
+        self._achievement_by_team = {}
+        self._award_flags = {}
+        for ach in achievements:
+            self._achievement_by_team[ach['team_code']] = ach
+            self._award_flags[ach['team_code']] = team_award_flags(
+                *(ach.get(column) for column in ACHIEVEMENT_COLUMNS[1:])
+            )
+
+    @classmethod
+    def from_settings(cls) -> 'MemoryStatsBackend':
+        return cls.from_exports(settings.STATS_EXPORT_DIR)
+
+    @classmethod
+    def from_database(cls) -> 'MemoryStatsBackend':
+        """从数据库一次性读出三张源表"""
+        achievements = [
+            dict(zip(ACHIEVEMENT_COLUMNS, row))
+            for row in TeamAchievement.objects.values_list(
+                'team_code_id', *ACHIEVEMENT_COLUMNS[1:]
+            ).iterator()
+        ]
+        return cls(
+            Team.objects.values(*TEAM_COLUMNS).iterator(),
+            TeamMember.objects.values(*MEMBER_COLUMNS).iterator(),
+            achievements,
+        )
+
+    @classmethod
+    def from_exports(cls, directory: str) -> 'MemoryStatsBackend':
+        """
+        从导出目录加载 team / team_member / team_achievement，
+        每张表优先读 .parquet（需要安装 pyarrow），否则读 .csv
+        """
+        return cls(
+            _read_export(directory, 'team', TEAM_COLUMNS),
+            _read_export(directory, 'team_member', MEMBER_COLUMNS),
+            _read_export(directory, 'team_achievement', ACHIEVEMENT_COLUMNS),
+        )
+
+    @staticmethod
+    def export_database_to_csv(directory: str) -> List[str]:
+        """
+        把三张源表需要的列导出成 CSV，NULL 写为 \\N，供离线加载
+        :return: 写出的文件路径
+        """
+        os.makedirs(directory, exist_ok=True)
+        tables = [
+            ('team', TEAM_COLUMNS, Team.objects.values_list(*TEAM_COLUMNS)),
+            ('team_member', MEMBER_COLUMNS, TeamMember.objects.values_list(*MEMBER_COLUMNS)),
+            ('team_achievement', ACHIEVEMENT_COLUMNS,
+             TeamAchievement.objects.values_list('team_code_id', *ACHIEVEMENT_COLUMNS[1:])),
+        ]
+        paths = []
+        for name, columns, qs in tables:
+            path = os.path.join(directory, f"{name}.csv")
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                for row in qs.iterator():
+                    writer.writerow([CSV_NULL if value is None else value for value in row])
+            paths.append(path)
+        return paths
+
+    def captain_schools(self, year: int, area: str) -> Dict[str, str | None]:
+        year = str(year)
+        captains = {}
+        for team_code in self._teams_by_key.get((year, area), []):
+            members = [m for m in self._members_by_team.get(team_code, []) if m['create_year'] == year]
+            captain = (
+                next((m for m in members if m['member_type'] == '队长'), None)
+                or next((m for m in members if '队长' in (m['member_type_detail'] or '')), None)
+            )
+            if captain is not None:
+                captains[team_code] = captain['school']
+        return captains
+
+    def school_stats(self, year: int, area: str) -> Dict[str, Dict[str, Any]]:
+        return self._group_stats(year, area, lambda team_code, school: school)
+
+    def subproject_stats(self, year: int, area: str) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        grouped = self._group_stats(
+            year, area, lambda team_code, school: (self._subproject_by_team[team_code], school)
+        )
+        stats = {}
+        for (subproject, school), rec in grouped.items():
+            stats.setdefault(subproject, {})[school] = rec
+        return stats
+
+    def person_keys(self, years: List[int], area: str, by_subproject: bool = False) -> Dict[Any, set]:
+        keys = defaultdict(set)
+        for year in years:
+            for team_code in self._teams_by_key.get((str(year), area), []):
+                for member in self._members_by_team.get(team_code, []):
+                    group = (member['school'], self._subproject_by_team[team_code]) if by_subproject else member['school']
+                    keys[group].add(_person_key(member))
+        return dict(keys)
+
+    def _group_stats(self, year: int, area: str, group_key) -> Dict[Any, Dict[str, Any]]:
+        """
+        按 group_key(team_code, school) 分组统计，school 为成员或队伍所属学校
+        """
+        codes = self._teams_by_key.get((str(year), area), [])
+
+        # 参赛人数：本赛区队伍里的成员按本人学校计数；按人去重时同一学号/邮箱只算一次
+        distinct_persons = getattr(settings, 'STATS_DISTINCT_PARTICIPANTS', False)
+        persons = defaultdict(set)
+        for team_code in codes:
+            for member in self._members_by_team.get(team_code, []):
+                key = _person_key(member) if distinct_persons else member['member_code']
+                persons[group_key(team_code, member['school'])].add(key)
+
+        stats = {}
+        for team_code in codes:
+            ach = self._achievement_by_team.get(team_code)
+            if ach is None:
+                continue
+            # 学校以 team_order=1 的成员为准
+            school = next(
+                (m['school'] for m in self._members_by_team.get(team_code, []) if m['team_order'] == 1),
+                None
+            )
+            if not school:
+                continue
+            group = group_key(team_code, school)
+            rec = stats.setdefault(group, {
+                'school': school,
+                'team_count': 0,
+                'participant_count': len(persons[group]),
+                **dict.fromkeys(BUCKET_FIELDS, 0),
+            })
+            rec['team_count'] += 1
+            add_award_flags(rec, self._award_flags[team_code])
+
+        for rec in stats.values():
+            derive_rates(rec)
+        return stats
+
+
+def _person_key(member: Dict[str, Any]) -> str:
+    """
+    识别同一个人的键，口径同 statistics._person_key：学号 → 邮箱（小写）→ member_code
+    """
+    return member['student_id'] or (member['email'] or '').lower() or member['member_code']
+
+
+def _read_export(directory: str, name: str, columns: List[str]) -> List[Dict[str, Any]]:
+    """
+    读取一张导出表，只保留 columns 中的列。
+    解析结果存一份快照（demo/services/cache.py），以导出文件的修改时间和大小为水位：
+    文件没变时其他 worker 直接加载快照，不再逐行解析 CSV/Parquet
+    """
+    parquet_path = os.path.join(directory, f"{name}.parquet")
+    path = parquet_path if os.path.exists(parquet_path) else os.path.join(directory, f"{name}.csv")
+    stat = os.stat(path)
+    watermark = (stat.st_mtime_ns, stat.st_size, tuple(columns))
+    store = get_snapshot_store()
+    key = f"export_{hashlib.sha1(os.path.abspath(path).encode()).hexdigest()[:12]}_{name}"
+    rows = store.get(key, watermark=watermark)
+    if rows is None:
+        rows = _parse_export(path, columns)
+        store.put(key, rows, watermark=watermark)
+    return rows
+
+
+def _parse_export(path: str, columns: List[str]) -> List[Dict[str, Any]]:
+    """
+    逐行解析一张导出文件（.parquet 或 .csv）
+    """
+    if path.endswith('.parquet'):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError(f"读取 {path} 需要安装 pyarrow")
+        rows = pq.read_table(path, columns=columns).to_pylist()
+    else:
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            rows = [
+                # 旧版本导出文件缺少的列按 NULL 处理
+                {column: None if row.get(column, CSV_NULL) == CSV_NULL else row[column] for column in columns}
+                for row in csv.DictReader(f)
+            ]
+
+    for row in rows:
+        for column in INT_COLUMNS & row.keys():
+            if row[column] not in (None, ''):
+                row[column] = int(row[column])
+    return rows
+
+
+@functools.cache
+def get_stats_backend() -> StatsBackend:
+    """
+    按 settings.STATS_BACKEND 创建统计后端，进程内只创建一次
+    """
+    backend_path = getattr(settings, 'STATS_BACKEND', 'demo.services.backends.OrmStatsBackend')
+    return import_string(backend_path).from_settings()
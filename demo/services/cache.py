@@ -1,4 +1,34 @@
-import os, time, json
+# demo/services/cache.py
+"""
+文件快照存储：把统计结果以二进制快照的形式存到 demo/data/snapshots/ 下。
+
+  - 格式：魔数 + 头部长度 + 头部（schema 版本、数据水位、写入时间、过期时间）+ pickle protocol 5 的数据
+  - 写入：先写同目录的临时文件再 os.replace 原子替换，多个 gunicorn worker 同时读写也不会读到半截文件
+  - 读取：超过 SNAPSHOT_MMAP_THRESHOLD 的大快照通过 mmap 加载，不额外复制一份文件内容
+  - 失效：按 key 设置 TTL；schema 版本或数据水位对不上时视为未命中
+
+取代原先的 save_data_to_json / load_data_from_json（带缩进的 JSON、只按文件 mtime 判断过期、非原子写入）。
+目前用于内存统计后端的导出文件：各 worker 第一次加载时不必都重新解析 CSV/Parquet，见 backends._read_export
+"""
+import mmap
+import os
+import pickle
+import re
+import struct
+import tempfile
+import time
+from typing import Any
+
+# 文件魔数与快照格式版本，格式不兼容时修改 SNAPSHOT_SCHEMA_VERSION，旧快照自动失效
+SNAPSHOT_MAGIC = b'PEDS'
+SNAPSHOT_SCHEMA_VERSION = 1
+# 魔数(4 字节) + 头部长度(4 字节，大端)
+_PREFIX = struct.Struct('>4sI')
+# 超过这个大小的快照用 mmap 加载
+SNAPSHOT_MMAP_THRESHOLD = 1024 * 1024
+# 未指定 TTL 时的默认有效期（秒），None 表示永不过期
+DEFAULT_SNAPSHOT_TTL = 24 * 3600
+
 
 def get_data_file_path(filename: str) -> str:
     """获取 data/ 目录下的完整路径，按需创建目录。"""
@@ -7,19 +37,141 @@ def get_data_file_path(filename: str) -> str:
     os.makedirs(data_dir, exist_ok=True)
     return os.path.join(data_dir, filename)
 
-def save_data_to_json(data, filename: str) -> str:
-    """将数据写入 JSON 并返回文件路径。"""
-    file_path = get_data_file_path(filename)
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
-    return file_path
-
-def load_data_from_json(filename: str, max_age_hours: int = 24):
-    """若文件不存在或超过 max_age_hours 过期，则返回 None。"""
-    path = get_data_file_path(filename)
-    if not os.path.exists(path):
-        return None
-    if time.time() - os.path.getmtime(path) > max_age_hours * 3600:
-        return None
-    with open(path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+
+class SnapshotStore:
+    """
+    基于文件的快照存储，提供 get / put / invalidate
+    """
+
+    def __init__(self, directory: str | None = None, schema_version: int = SNAPSHOT_SCHEMA_VERSION):
+        self.directory = directory or get_data_file_path('snapshots')
+        self.schema_version = schema_version
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        # key 里可能有中文赛区名，只替换掉不能出现在文件名里的字符
+        return os.path.join(self.directory, re.sub(r'[^\w.-]', '_', key) + '.snap')
+
+    def put(self, key: str, data: Any, ttl: int | None = DEFAULT_SNAPSHOT_TTL, watermark: Any = None) -> str:
+        """
+        写入快照
+        :param key: 快照名
+        :param data: 任意可 pickle 的数据
+        :param ttl: 有效期（秒），None 表示永不过期
+        :param watermark: 数据水位（如源数据最后更新时间），读取时可用来判断快照是否过时
+        :return: 快照文件路径
+        """
+        now = time.time()
+        header = pickle.dumps({
+            'schema_version': self.schema_version,
+            'watermark': watermark,
+            'created_at': now,
+            'expires_at': now + ttl if ttl is not None else None,
+        }, protocol=5)
+        payload = pickle.dumps(data, protocol=5)
+
+        path = self._path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_PREFIX.pack(SNAPSHOT_MAGIC, len(header)))
+                f.write(header)
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return path
+
+    def _read(self, key: str, with_data: bool):
+        """
+        读取快照，返回 (头部, 数据)；文件不存在或格式不对时返回 (None, None)
+        """
+        try:
+            f = open(self._path(key), 'rb')
+        except FileNotFoundError:
+            return None, None
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _PREFIX.size:
+                return None, None
+            if with_data and size >= SNAPSHOT_MMAP_THRESHOLD:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                buffer = f.read() if with_data else f.read(_PREFIX.size)
+            try:
+                magic, header_len = _PREFIX.unpack_from(buffer)
+                if magic != SNAPSHOT_MAGIC:
+                    return None, None
+                if not with_data:
+                    return pickle.loads(f.read(header_len)), None
+                view = memoryview(buffer)
+                try:
+                    header_end = _PREFIX.size + header_len
+                    header = pickle.loads(view[_PREFIX.size:header_end])
+                    data = pickle.loads(view[header_end:])
+                finally:
+                    view.release()
+                return header, data
+            finally:
+                if not isinstance(buffer, bytes):
+                    buffer.close()
+
+    def _is_valid(self, header: dict | None, watermark: Any) -> bool:
+        if header is None or header['schema_version'] != self.schema_version:
+            return False
+        if header['expires_at'] is not None and time.time() > header['expires_at']:
+            return False
+        if watermark is not None and header['watermark'] != watermark:
+            return False
+        return True
+
+    def get(self, key: str, default: Any = None, watermark: Any = None) -> Any:
+        """
+        读取快照；不存在、已过期、schema 版本不符或与给定水位不一致时返回 default
+        """
+        header, data = self._read(key, with_data=True)
+        if not self._is_valid(header, watermark):
+            return default
+        return data
+
+    def meta(self, key: str) -> dict | None:
+        """
+        只读取快照头部（不反序列化数据），不存在时返回 None
+        """
+        header, _ = self._read(key, with_data=False)
+        return header
+
+    def invalidate(self, key: str | None = None):
+        """
+        删除指定快照；key 为 None 时清空整个存储
+        """
+        if key is not None:
+            paths = [self._path(key)]
+        else:
+            paths = [
+                os.path.join(self.directory, name)
+                for name in os.listdir(self.directory) if name.endswith('.snap')
+            ]
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+_default_store: SnapshotStore | None = None
+
+
+def get_snapshot_store() -> SnapshotStore:
+    """
+    默认的快照存储（demo/data/snapshots/），进程内只创建一次
+    """
+    global _default_store
+    if _default_store is None:
+        _default_store = SnapshotStore()
+    return _default_store
+
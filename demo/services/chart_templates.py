@@ -0,0 +1,142 @@
+# demo/services/chart_templates.py
+"""
+图表模板：同一类图表的静态配置（InitOpts、标题样式、坐标轴、工具栏、datazoom、双 Y 轴……）
+在进程内只构造一次，之后每次请求只替换标题、X 轴数据和系列。
+
+  - 骨架：注册的 builder 用占位数据画出一张图，每种"角色"的系列各画一个，系列名就是角色名
+  - 渲染：浅拷贝骨架对象，options 换成新的 dict，只新建被替换的那几层（title / legend / xAxis / series），
+    其余配置对象和骨架共用，骨架本身从不被修改，所以不需要 deepcopy
+  - 折线图的系列数据在 pyecharts 里是 [x, y] 对，骨架里是这种格式的角色，渲染时同样和 X 轴配对
+"""
+import copy
+import threading
+import uuid
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from pyecharts.charts.base import Base
+from pyecharts.commons.utils import OrderedSet
+from pyecharts.options.series_options import BasicOpts
+
+# 骨架里占位用的 X 轴数据
+PLACEHOLDER_X = ['-']
+
+# kind → builder(*params)
+_BUILDERS: Dict[str, Callable[..., Base]] = {}
+# (kind, params) → ChartTemplate
+_TEMPLATES: Dict[Tuple[str, Hashable], 'ChartTemplate'] = {}
+_lock = threading.Lock()
+
+
+def _copy_ordered_set(items: OrderedSet) -> OrderedSet:
+    return OrderedSet(*items.items)
+
+
+def _opts_dict(value) -> dict:
+    """TitleOpts 等配置对象取出内部 dict，已经是 dict 的原样返回"""
+    return value.opts if isinstance(value, BasicOpts) else value
+
+
+class ChartTemplate:
+    """
+    一类图表的骨架
+    """
+
+    def __init__(self, skeleton: Base):
+        self.skeleton = skeleton
+        options = skeleton.options
+        # 角色 → (系列配置, 数据是否为 [x, y] 对)
+        self.prototypes: Dict[str, Tuple[dict, bool]] = {}
+        for series in options['series']:
+            data = series.get('data') or []
+            self.prototypes[series['name']] = (series, bool(data) and isinstance(data[0], list))
+
+        self._title = options.get('title')
+        self._legend = options.get('legend') or []
+
+    def _patched_title(self, title: str):
+        # TitleOpts.opts 和 Grid 合并后的 title 都是 [dict, …]
+        titles = _opts_dict(self._title)
+        if isinstance(titles, list):
+            return [{**_opts_dict(titles[0]), 'text': title}] + titles[1:]
+        return {**titles, 'text': title}
+
+    def render(
+        self,
+        title: str,
+        x_data: List[Any],
+        series: Sequence[Tuple[str, str, List[Any]]],
+        y_axis_names: Optional[Dict[int, str]] = None,
+    ) -> Base:
+        """
+        按骨架生成一张新图
+        :param title: 标题
+        :param x_data: X 轴数据
+        :param series: [(角色, 系列名, 数据), …]，角色是骨架里画过的系列名
+        :param y_axis_names: {Y 轴序号: 名称}，需要改坐标轴名称时传入
+        :return: 与直接用 pyecharts 构造等价的图表对象
+        """
+        skeleton = self.skeleton
+        chart = copy.copy(skeleton)
+        chart.chart_id = uuid.uuid4().hex
+        chart.js_dependencies = _copy_ordered_set(skeleton.js_dependencies)
+        chart.js_functions = _copy_ordered_set(skeleton.js_functions)
+        chart.js_events = _copy_ordered_set(skeleton.js_events)
+        chart.render_options = dict(skeleton.render_options)
+        chart._render_cache = {}
+
+        new_series = []
+        for role, name, data in series:
+            prototype, paired = self.prototypes[role]
+            if paired:
+                data = [list(z) for z in zip(x_data, data)]
+            new_series.append({**prototype, 'name': name, 'data': data})
+
+        options = dict(skeleton.options)
+        options['series'] = new_series
+        options['xAxis'] = [{**options['xAxis'][0], 'data': x_data}] + options['xAxis'][1:]
+        if self._title is not None:
+            options['title'] = self._patched_title(title)
+        if self._legend:
+            options['legend'] = [{**self._legend[0], 'data': [name for _, name, _ in series]}] + self._legend[1:]
+        if y_axis_names:
+            y_axis = list(options['yAxis'])
+            for index, name in y_axis_names.items():
+                y_axis[index] = {**y_axis[index], 'name': name}
+            options['yAxis'] = y_axis
+        chart.options = options
+        return chart
+
+
+def register_chart_template(kind: str):
+    """
+    注册一类图表的骨架 builder，builder 的参数是影响静态配置的选项（如标签旋转角度）
+    """
+    def decorator(builder: Callable[..., Base]):
+        _BUILDERS[kind] = builder
+        return builder
+    return decorator
+
+
+def get_chart_template(kind: str, *params: Hashable) -> ChartTemplate:
+    """
+    取出某类图表的骨架，同一 (kind, params) 在进程内只构造一次
+    :param kind: 注册时的图表种类
+    :param params: 传给 builder 的参数
+    """
+    key = (kind, params)
+    template = _TEMPLATES.get(key)
+    if template is None:
+        with _lock:
+            template = _TEMPLATES.get(key)
+            if template is None:
+                template = ChartTemplate(_BUILDERS[kind](*params))
+                _TEMPLATES[key] = template
+    return template
+
+
+def clear_chart_templates():
+    """
+    清空已构造的骨架，修改图表样式后在测试或 shell 里使用
+    """
+    with _lock:
+        _TEMPLATES.clear()
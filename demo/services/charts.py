@@ -1,10 +1,16 @@
 # demo/services/charts.py
+"""
+单个图表的构造。直接依赖 pyecharts，只由 chartsPage 导入；
+视图在函数内部导入 chartsPage，URLconf、系统检查和管理命令都不会加载这里（见 ImportTimeTests）
+"""
 from typing import Dict, Any, List, Union, Optional
 from pyecharts import options as opts
 from pyecharts.charts import Bar, Line, Grid
 from pyecharts.components import Table
 from pyecharts.options import ComponentTitleOpts, LabelOpts, AxisOpts, ToolboxOpts
-from demo.models import SchoolYearlyCache
+from demo.models import FIELD_LABELS
+from demo.services.chart_templates import PLACEHOLDER_X, get_chart_template, register_chart_template
+from demo.services.awards import SPECIAL_AWARD_FIELDS
 
 # # 通用工具函数
 def _format_percentage(number , ndigits:int = 2) -> str:
@@ -19,6 +25,27 @@ def _format_percentage(number , ndigits:int = 2) -> str:
         return "0%"
 
 
+def _to_rows(stats_data) -> List[Dict[str, Any]]:
+    """
+    统一成带 school 字段的行列表，兼容 {school: {...}} 和 [{'school': ..., ...}] 两种格式
+    :param stats_data: 统计数据
+    """
+    if isinstance(stats_data, dict):
+        return [{'school': school, **data} for school, data in stats_data.items()]
+    return list(stats_data)
+
+
+def _years_label(years: List[int]) -> str:
+    """多年度图表标题里的年份，连续年份写成 2019–2023，否则逐个列出"""
+    from demo.services.statistics import format_years
+    return format_years(years)
+
+
+def _years_total_label(years: List[int], suffix: str = "总和") -> str:
+    """多年度合计列和汇总折线的名称，如 "3年总和"，年份可以不连续"""
+    return f"{len(years)}年{suffix}"
+
+
 # 排序函数
 def _data_sort_and_extract(stats_data, sort_key, extract_key, header = 'school', ):
     """
@@ -29,6 +56,7 @@ def _data_sort_and_extract(stats_data, sort_key, extract_key, header = 'school',
     :param header: 提取的x轴数据或者说表头
     :return:
     """
+    stats_data = _to_rows(stats_data)
     stats_data.sort (
         key = lambda item: item[sort_key] ,
         reverse = True
@@ -37,24 +65,10 @@ def _data_sort_and_extract(stats_data, sort_key, extract_key, header = 'school',
     rows = [item[extract_key] for item in stats_data]
     return headers, rows
 
-def create_generic_bar(
-    x_data: List[str],
-    y_data_list: List[List[Any]],
-    y_names: List[str],
-    title: str,
-    label_show: bool = True,
-    rotate_labels: int = 45,
-) -> Bar:
+@register_chart_template('generic_bar')
+def _generic_bar_skeleton(label_show: bool, rotate_labels: int) -> Grid:
     """
-    创建通用柱状图
-    
-    :param x_data: X轴数据
-    :param y_data_list: Y轴数据列表（可多个系列）
-    :param y_names: Y轴系列名称列表
-    :param title: 图表标题
-    :param label_show: 是否显示标签
-    :param rotate_labels: X轴标签旋转角度
-    :return: 柱状图对象
+    通用柱状图骨架：一个 'bar' 角色的系列，标题和数据由 create_generic_bar 填入
     """
     bar = Bar(
         init_opts= opts.InitOpts(
@@ -63,25 +77,23 @@ def create_generic_bar(
         ),
     )
 
-    bar.add_xaxis(x_data)
-
-    for i, y_data in enumerate(y_data_list):
-        bar.add_yaxis(
-            y_names[i],
-            y_data,
-            label_opts=opts.LabelOpts(is_show=label_show)
-        )
+    bar.add_xaxis(PLACEHOLDER_X)
+    bar.add_yaxis(
+        'bar',
+        [0],
+        label_opts=opts.LabelOpts(is_show=label_show)
+    )
 
     bar.set_global_opts(
 
-        title_opts = opts.TitleOpts(title=title),
+        title_opts = opts.TitleOpts(title=''),
         xaxis_opts = opts.AxisOpts(axislabel_opts=opts.LabelOpts(rotate=rotate_labels)),
         datazoom_opts = opts.DataZoomOpts(
             pos_bottom = "20",
         ),
         toolbox_opts= opts.ToolboxOpts(),
     )
-    bar = (
+    return (
         Grid(init_opts=opts.InitOpts(width="100%"))
         .add(
             bar,
@@ -90,7 +102,32 @@ def create_generic_bar(
             )
         )
     )
-    return bar
+
+
+def create_generic_bar(
+    x_data: List[str],
+    y_data_list: List[List[Any]],
+    y_names: List[str],
+    title: str,
+    label_show: bool = True,
+    rotate_labels: int = 45,
+) -> Bar:
+    """
+    创建通用柱状图，静态配置来自进程内缓存的骨架，只填入标题和数据
+    
+    :param x_data: X轴数据
+    :param y_data_list: Y轴数据列表（可多个系列）
+    :param y_names: Y轴系列名称列表
+    :param title: 图表标题
+    :param label_show: 是否显示标签
+    :param rotate_labels: X轴标签旋转角度
+    :return: 柱状图对象
+    """
+    return get_chart_template('generic_bar', label_show, rotate_labels).render(
+        title,
+        x_data,
+        [('bar', y_name, y_data) for y_name, y_data in zip(y_names, y_data_list)]
+    )
 
 
 def create_generic_table(
@@ -121,7 +158,7 @@ def create_generic_table(
 def build_area_detail_stats_table(
         year: int,
         area: str,
-        stats_data: List
+        stats_data: Union[List, Dict]
 ) -> Table:
     """
     生成xx年xx赛区各个学校统计表格，包含各校的参赛队伍数、获奖率等信息。
@@ -149,10 +186,11 @@ def build_area_detail_stats_table(
     chinese_headers=[]
     # 查找model里面的注释，并替换
     for temp_header in headers:
-        temp_header = SchoolYearlyCache._meta.get_field(temp_header).db_comment
+        temp_header = FIELD_LABELS[temp_header]
         chinese_headers.append(temp_header)
     # 原始统计数据
     # 数据排序
+    stats_data = _to_rows(stats_data)
     stats_data.sort(
         key=lambda temp_item: temp_item['team_count'],
         reverse=True
@@ -175,7 +213,7 @@ def build_area_detail_stats_table(
     )
 
 
-def build_area_detail_team_count_bar(year: int , area: str , stats_data: List) -> Bar:
+def build_area_detail_team_count_bar(year: int , area: str , stats_data: Union[List, Dict]) -> Bar:
     """
     构造柱状图，显示各学校的参赛队伍数。
     :param year: 年份
@@ -197,7 +235,7 @@ def build_area_detail_team_count_bar(year: int , area: str , stats_data: List) -
         title=f"{year}年{area}各学校参赛队伍数"
     )
 
-def build_area_detail_participant_count_bar(year: int , area: str , stats_data: List) -> Bar:
+def build_area_detail_participant_count_bar(year: int , area: str , stats_data: Union[List, Dict]) -> Bar:
     """
     构造柱状图，显示各学校的参赛人员数。
     :param year: 年份
@@ -219,96 +257,141 @@ def build_area_detail_participant_count_bar(year: int , area: str , stats_data:
         title=f"{year}年{area}各学校参赛人员数"
     )
 
-#-------------------------------------------------------------------------------------------------
-def build_range_year_report_first_prize_bar(
-    start_year: int,
-    end_year: int,
-    area: str,
-    stats_data: Dict
-) -> Bar:
+def build_area_top_schools_bar(year: int, area: str, leaderboard: Dict, metric: str) -> Bar:
     """
-    构造柱状图 + 两条折线：
-      - 各年"分赛区一等奖获奖队数量"柱状
-      - "五年总和"折线（Y 轴 0 左侧）
-      - "平均获奖率"折线（Y 轴 1 右侧）
-      
+    构造柱状图，只显示 metric 前 N 名的学校（含并列），其余学校合并为"其他"一根柱子。
+    :param year: 年份
+    :param area: 赛区名称
+    :param leaderboard: statistics.py 的 get_top_schools 返回的数据
+    :param metric: 统计字段
+    :return: 柱状图
+    """
+    label = FIELD_LABELS[metric]
+    schools = [item['school'] for item in leaderboard['rows']]
+    values = [item[metric] for item in leaderboard['rows']]
+    others = leaderboard['others']
+    if others['school_count'] and others[metric] is not None:
+        schools.append(f"其他{others['school_count']}所学校")
+        values.append(others[metric])
+    return create_generic_bar(
+        x_data=schools,
+        y_data_list=[values],
+        y_names=[f"{year}年{area}{label}"],
+        title=f"{year}年{area}{label}前{len(leaderboard['rows'])}名学校"
+    )
+
+def _special_award_bar(rows: List[Dict[str, Any]], title: str) -> Bar:
+    """
+    企业命题及单项奖分组柱状图，只画至少获得一项的学校，按合计从多到少排序
+    """
+    rows = [row for row in rows if any(row.get(f) for f in SPECIAL_AWARD_FIELDS)]
+    rows.sort(key=lambda row: sum(row.get(f) or 0 for f in SPECIAL_AWARD_FIELDS), reverse=True)
+    return create_generic_bar(
+        x_data=[row['school'] for row in rows],
+        y_data_list=[[row.get(f) or 0 for row in rows] for f in SPECIAL_AWARD_FIELDS],
+        y_names=[FIELD_LABELS[f] for f in SPECIAL_AWARD_FIELDS],
+        title=title
+    )
+
+
+def build_area_special_awards_bar(year: int, area: str, stats_data: Union[List, Dict]) -> Bar:
+    """
+    构造柱状图，显示各学校的企业奖项、企业命题晋级、最佳论文、最具投资/最佳路演数量
+    :param year: 年份
+    :param area: 赛区名称
+    :param stats_data: {school: {...}} 或带 school 字段的行列表
+    :return: 柱状图
+    """
+    return _special_award_bar(_to_rows(stats_data), f"{year}年{area}各学校企业命题及单项奖")
+
+
+def build_range_year_special_awards_bar(start_year: int, end_year: int, area: str, stats_data: Dict) -> Bar:
+    """
+    构造柱状图，显示区间内各学校企业命题及单项奖的合计
     :param start_year: 起始年份
     :param end_year: 结束年份
     :param area: 赛区名称
     :param stats_data: 统计数据，从statistics.py的get_multi_year_stats_data获取，
                      或者直接是data_by_year格式的数据
-    :return: 柱状图对象
+    :return: 柱状图
     """
-    # 兼容直接传入data_by_year的情况
-    # if 'years' not in stats_data and 'data_by_year' not in stats_data:
-    # 直接传入的是data_by_year
-    data_by_year = stats_data
-    years = list(range(start_year, end_year + 1))
-
-    # 提取学校并按一等奖获奖数量排序
-    from demo.services.statistics import extract_schools_from_data
-    schools, total_first_prize = extract_schools_from_data(
-        data_by_year,
-        years,
-        sort_key_field='first_prize_count'
-    )
-
-    # 计算总参赛队伍数
-    total_team_count = {
-        s: sum(data_by_year[y].get(s, {}).get('team_count', 0) for y in years)
-        for s in schools
-    }
-
-    # 计算平均获奖率
-    avg_first_prize_rate = {
-        s: round(total_first_prize[s] / total_team_count[s] * 100, 2) if total_team_count[s] else 0.0
-        for s in schools
-    }
-    # else:
-    #     # 传入的是完整的统计数据
-    #     years = stats_data['years']
-    #     schools = stats_data['schools_by_first_prize']
-    #     data_by_year = stats_data['data_by_year']
-    #     total_first_prize = stats_data['total_first_prize']
-    #     avg_first_prize_rate = stats_data['avg_first_prize_rate']
-
-    # 3. 柱状图（每年 first_prize_count）
-    bar = Bar()
-    bar.add_xaxis(schools)
-    for y in years:
-        bar.add_yaxis(
-            f"{y}年分赛区一等奖获奖队数量",
-            [ data_by_year[y].get(s, {}).get('first_prize_count', 0) for s in schools ],
-            label_opts=LabelOpts(is_show=True)
-        )
+    if 'range_stats' in stats_data:
+        range_stats = stats_data['range_stats']
+        years = stats_data['years']
+    else:
+        from demo.services.statistics import _build_range_stats, range_participant_counts
+        years = sorted(stats_data)
+        range_stats = dict(_build_range_stats(stats_data, range_participant_counts(years, area)))
+    return _special_award_bar(
+        _to_rows(range_stats), f"{_years_label(years)} {area} 各学校企业命题及单项奖合计"
+    )
 
-    # 4. 左侧"汇总"折线
+
+def build_area_subproject_bar(year: int, area: str, summary: List) -> Bar:
+    """
+    构造柱状图，显示各子项目的参赛队伍数和参赛人数
+    :param year: 年份
+    :param area: 赛区名称
+    :param summary: statistics.py 的 summarize_subprojects 返回的 [(subproject, {...}), …]
+    :return: 柱状图
+    """
+    return create_generic_bar(
+        x_data=[subproject for subproject, _ in summary],
+        y_data_list=[
+            [data['team_count'] for _, data in summary],
+            [data['participant_count'] for _, data in summary],
+        ],
+        y_names=[FIELD_LABELS['team_count'], FIELD_LABELS['participant_count']],
+        title=f"{year}年{area}各子项目参赛情况"
+    )
+
+
+def build_area_subproject_table(year: int, area: str, summary: List) -> Table:
+    """
+    构造表格，列：子项目 | 学校数 | 队伍数 | 参赛人数 | 获奖数量 | 一等奖数量 | 获奖率 | 一等奖率
+    :param year: 年份
+    :param area: 赛区名称
+    :param summary: statistics.py 的 summarize_subprojects 返回的 [(subproject, {...}), …]
+    :return: 表格对象
+    """
+    fields = ['team_count', 'participant_count', 'award_count', 'first_prize_count']
+    rate_fields = ['award_rate', 'first_prize_rate']
+    headers = ["子项目", "学校数"] + [FIELD_LABELS[f] for f in fields + rate_fields]
+    rows = [
+        [subproject, data['school_count']]
+        + [data[f] for f in fields]
+        + [_format_percentage(data[f]) for f in rate_fields]
+        for subproject, data in summary
+    ]
+    return create_generic_table(headers, rows, title=f"{year}年{area}各子项目统计")
+
+#-------------------------------------------------------------------------------------------------
+@register_chart_template('range_first_prize_bar')
+def _range_first_prize_bar_skeleton() -> Bar:
+    """
+    区间一等奖柱状图骨架：'year' 柱状系列，'total' 汇总折线和 'rate' 获奖率折线（右侧 Y 轴）
+    """
+    bar = Bar()
+    bar.add_xaxis(PLACEHOLDER_X)
+    bar.add_yaxis('year', [0], label_opts=LabelOpts(is_show=True))
     bar.extend_axis(
         yaxis=AxisOpts(
-            name="五年总和",
+            name="合计",
             position="right",
             axislabel_opts=LabelOpts(formatter="{value}")
         )
     )
-    line_sum = (
+    bar.overlap(
         Line()
-        .add_xaxis(schools)
-        .add_yaxis(
-            "五年总和",
-            [ total_first_prize[s] for s in schools ],
-            yaxis_index=1,
-            label_opts=LabelOpts(is_show=True)
-        )
+        .add_xaxis(PLACEHOLDER_X)
+        .add_yaxis('total', [0], yaxis_index=1, label_opts=LabelOpts(is_show=True))
     )
-    bar.overlap(line_sum)
-
-    # 5. 右侧"平均获奖率"折线
-    line_rate = (
+    bar.overlap(
         Line()
-        .add_xaxis(schools)
+        .add_xaxis(PLACEHOLDER_X)
         .add_yaxis(
-            "一等奖平均获奖率",
-            [ avg_first_prize_rate[s] for s in schools ],
+            'rate',
+            [0],
             yaxis_index=1,
             label_opts=LabelOpts(
                 is_show=True,
@@ -316,13 +399,8 @@ def build_range_year_report_first_prize_bar(
             )
         )
     )
-    bar.overlap(line_rate)
-
-    # 6. 全局配置
     bar.set_global_opts(
-        title_opts=opts.TitleOpts(
-            title=f"{start_year}–{end_year} {area} 赛区各高校近五年分赛区一等奖获奖数量及平均获奖率"
-        ),
+        title_opts=opts.TitleOpts(title=''),
         xaxis_opts=AxisOpts(axislabel_opts=LabelOpts(rotate=45)),
         tooltip_opts=opts.TooltipOpts(trigger="axis", axis_pointer_type="shadow"),
         legend_opts=opts.LegendOpts(pos_top="10%"),
@@ -330,6 +408,75 @@ def build_range_year_report_first_prize_bar(
     return bar
 
 
+def build_range_year_report_first_prize_bar(
+    start_year: int,
+    end_year: int,
+    area: str,
+    stats_data: Dict
+) -> Bar:
+    """
+    构造柱状图 + 两条折线：
+      - 各年"分赛区一等奖获奖队数量"柱状
+      - "N年总和"折线（Y 轴 1 右侧）
+      - "平均获奖率"折线（Y 轴 1 右侧）
+      
+    :param start_year: 起始年份
+    :param end_year: 结束年份
+    :param area: 赛区名称
+    :param stats_data: 统计数据，从statistics.py的get_multi_year_stats_data获取，
+                     或者直接是data_by_year格式的数据
+    :return: 柱状图对象
+    """
+    # 兼容直接传入data_by_year的情况
+    if 'years' not in stats_data and 'data_by_year' not in stats_data:
+        # 直接传入的是data_by_year
+        data_by_year = stats_data
+        years = sorted(data_by_year)
+
+        # 提取学校并按一等奖获奖数量排序
+        from demo.services.statistics import extract_schools_from_data
+        schools, total_first_prize = extract_schools_from_data(
+            data_by_year,
+            years,
+            sort_key_field='first_prize_count'
+        )
+
+        # 计算总参赛队伍数
+        total_team_count = {
+            s: sum(data_by_year[y].get(s, {}).get('team_count', 0) for y in years)
+            for s in schools
+        }
+
+        # 计算平均获奖率
+        avg_first_prize_rate = {
+            s: round(total_first_prize[s] / total_team_count[s] * 100, 2) if total_team_count[s] else 0.0
+            for s in schools
+        }
+    else:
+        # 传入的是完整的统计数据
+        years = stats_data['years']
+        schools = stats_data['schools_by_first_prize']
+        data_by_year = stats_data['data_by_year']
+        total_first_prize = stats_data['total_first_prize']
+        avg_first_prize_rate = stats_data['avg_first_prize_rate']
+
+    # 3. 柱状图（每年 first_prize_count）+ "N年总和"、"平均获奖率"折线（右侧 Y 轴）
+    series = [
+        ('year', f"{y}年分赛区一等奖获奖队数量",
+         [data_by_year[y].get(s, {}).get('first_prize_count', 0) for s in schools])
+        for y in years
+    ]
+    total_label = _years_total_label(years)
+    series.append(('total', total_label, [total_first_prize[s] for s in schools]))
+    series.append(('rate', "一等奖平均获奖率", [avg_first_prize_rate[s] for s in schools]))
+    return get_chart_template('range_first_prize_bar').render(
+        f"{_years_label(years)} {area} 赛区各高校分赛区一等奖获奖数量及平均获奖率",
+        schools,
+        series,
+        y_axis_names={1: total_label}
+    )
+
+
 def build_range_year_report_first_prize_table(
     start_year: int,
     end_year: int,
@@ -340,7 +487,7 @@ def build_range_year_report_first_prize_table(
     构造底部表格，列：
       学校名称 |
       {y}年获奖队数量… |
-      五年总和 |
+      N年总和 |
       平均获奖率
       
     :param start_year: 起始年份
@@ -354,7 +501,7 @@ def build_range_year_report_first_prize_table(
     if 'years' not in stats_data and 'data_by_year' not in stats_data:
         # 直接传入的是data_by_year
         data_by_year = stats_data
-        years = list(range(start_year, end_year + 1))
+        years = sorted(data_by_year)
         
         # 提取学校并按一等奖获奖数量排序
         from demo.services.statistics import extract_schools_from_data
@@ -384,7 +531,7 @@ def build_range_year_report_first_prize_table(
         avg_first_prize_rate = stats_data['avg_first_prize_rate']
 
     # 2. 表头
-    headers = ["学校名称"] + [f"{y}年获奖队数量" for y in years] + ["五年总和", "平均获奖率"]
+    headers = ["学校名称"] + [f"{y}年获奖队数量" for y in years] + [_years_total_label(years), "平均获奖率"]
 
     # 3. 行数据
     rows = []
@@ -399,10 +546,43 @@ def build_range_year_report_first_prize_table(
     return create_generic_table(
         headers, 
         rows, 
-        title=f"{area} 赛区各高校近五年分赛区一等奖获奖统计（表格）"
+        title=f"{area} 赛区各高校{_years_label(years)}年分赛区一等奖获奖统计（表格）"
     )
 
 
+@register_chart_template('range_team_count_bar')
+def _range_team_count_bar_skeleton() -> Bar:
+    """
+    区间队伍数柱状图骨架：'year' 柱状系列和 'total' 汇总折线（右侧 Y 轴）
+    """
+    bar = Bar(
+        init_opts=opts.InitOpts(width='100%', height='600px')
+    )
+    bar.add_xaxis(PLACEHOLDER_X)
+    bar.add_yaxis('year', [0], label_opts=LabelOpts(is_show=True))
+    bar.extend_axis(
+        yaxis=AxisOpts(
+            name="合计",
+            position="right",
+            axislabel_opts=LabelOpts(formatter="{value}")
+        )
+    )
+    bar.overlap(
+        Line()
+        .add_xaxis(PLACEHOLDER_X)
+        .add_yaxis('total', [0], yaxis_index=1, label_opts=LabelOpts(is_show=True))
+    )
+    bar.set_global_opts(
+        title_opts=opts.TitleOpts(title=''),
+        xaxis_opts=AxisOpts(axislabel_opts=LabelOpts(rotate=45)),
+        tooltip_opts=opts.TooltipOpts(trigger="axis", axis_pointer_type="shadow"),
+        legend_opts=opts.LegendOpts(pos_top="10%"),
+        toolbox_opts=opts.ToolboxOpts(),
+        datazoom_opts=opts.DataZoomOpts()
+    )
+    return bar
+
+
 # 显示指定年份范围、赛区的各年参赛队伍数统计柱状图
 def build_range_year_area_report_participant_count_bar(
     start_year: int,
@@ -440,53 +620,21 @@ def build_range_year_area_report_participant_count_bar(
         data_by_year = stats_data['data_by_year']
         total_team_count = stats_data['total_team_count']
 
-    # 3. 枚举年度柱状图
-    bar = Bar(
-        init_opts=opts.InitOpts(width='100%', height='600px')
-    )
-    bar.add_xaxis(schools)
-    for y in years:
-        bar.add_yaxis(
-            f"{y}年参赛队伍数量",
-            [data_by_year[y].get(s, {}).get('team_count', 0) for s in schools],
-            label_opts=LabelOpts(is_show=True)
-        )
-
-    # 4. 添加右侧第二 Y 轴，并叠加汇总折线
-    bar.extend_axis(
-        yaxis=AxisOpts(
-            name="五年汇总",
-            position="right",
-            axislabel_opts=LabelOpts(formatter="{value}")
-        )
-    )
-    line = (
-        Line()
-        .add_xaxis(schools)
-        .add_yaxis(
-            "五年汇总",
-            [total_team_count[s] for s in schools],
-            yaxis_index=1,
-            label_opts=LabelOpts(is_show=True)
-        )
-    )
-    bar.overlap(line)
-
-    # 5. 全局布局
-    bar.set_global_opts(
-        title_opts=opts.TitleOpts(
-            title=f"{start_year}–{end_year} {area} 赛区队伍数对比"
-        ),
-        xaxis_opts=AxisOpts(axislabel_opts=LabelOpts(rotate=45)),
-        tooltip_opts=opts.TooltipOpts(trigger="axis", axis_pointer_type="shadow"),
-        legend_opts=opts.LegendOpts(pos_top="10%"),
-        toolbox_opts=opts.ToolboxOpts(),
-        datazoom_opts=opts.DataZoomOpts()
-
+    # 3. 枚举年度柱状图 + 右侧第二 Y 轴的汇总折线
+    series = [
+        ('year', f"{y}年参赛队伍数量",
+         [data_by_year[y].get(s, {}).get('team_count', 0) for s in schools])
+        for y in years
+    ]
+    total_label = _years_total_label(years, "汇总")
+    series.append(('total', total_label, [total_team_count[s] for s in schools]))
+    return get_chart_template('range_team_count_bar').render(
+        f"{_years_label(years)} {area} 赛区队伍数对比",
+        schools,
+        series,
+        y_axis_names={1: total_label}
     )
 
-    return bar
-
 # 显示指定年份范围、赛区的各年参赛队伍数统计表
 def build_range_year_area_report_participant_count_table(
     start_year: int,
@@ -525,7 +673,7 @@ def build_range_year_area_report_participant_count_table(
         total_team_count = stats_data['total_team_count']
 
     # 6. 构造底部表格
-    headers = ["学校名称"] + [f"{y}年队伍数" for y in years] + ["五年总和"]
+    headers = ["学校名称"] + [f"{y}年队伍数" for y in years] + [_years_total_label(years)]
     rows = []
     for s in schools:
         row = [s] + [
@@ -538,11 +686,154 @@ def build_range_year_area_report_participant_count_table(
         Table()
         .add(headers, rows)
         .set_global_opts(
-            title_opts=ComponentTitleOpts(title=f"{area} 赛区五年报名详情")
+            title_opts=ComponentTitleOpts(title=f"{area} 赛区{_years_label(years)}年报名详情")
         )
     )
     return table
 
+# 趋势图默认画队伍数前多少名的学校
+TREND_TOP_N = 10
+
+
+def _trend_data(start_year: int, end_year: int, stats_data: Dict):
+    """
+    取出 (years, schools_by_team_count, trends, area_trend)，兼容直接传入 data_by_year 的情况
+    """
+    if 'years' not in stats_data and 'data_by_year' not in stats_data:
+        from demo.services.statistics import AREA_TOTAL_SCHOOL, _build_trend_stats, extract_schools_from_data
+        years = sorted(stats_data)
+        schools, _ = extract_schools_from_data(stats_data, years, sort_key_field='team_count')
+        trends = _build_trend_stats(stats_data)
+        return years, schools, trends, trends.get(AREA_TOTAL_SCHOOL, [])
+    return (
+        stats_data['years'], stats_data['schools_by_team_count'],
+        stats_data['trends'], stats_data['area_trend']
+    )
+
+
+@register_chart_template('range_trend_line')
+def _range_trend_line_skeleton() -> Line:
+    """
+    趋势折线图骨架：'school' 各校折线和 'area_avg' 赛区滑动平均（右侧 Y 轴，虚线）
+    """
+    line = Line(init_opts=opts.InitOpts(width='100%', height='600px'))
+    line.add_xaxis(PLACEHOLDER_X)
+    line.add_yaxis('school', [0], label_opts=LabelOpts(is_show=False))
+    line.extend_axis(
+        yaxis=AxisOpts(
+            name="赛区队伍数滑动平均",
+            position="right",
+            axislabel_opts=LabelOpts(formatter="{value}")
+        )
+    )
+    line.add_yaxis(
+        'area_avg',
+        [0],
+        yaxis_index=1,
+        is_smooth=True,
+        linestyle_opts=opts.LineStyleOpts(type_="dashed", width=2),
+        label_opts=LabelOpts(is_show=True),
+    )
+    line.set_global_opts(
+        title_opts=opts.TitleOpts(title=''),
+        tooltip_opts=opts.TooltipOpts(trigger="axis"),
+        legend_opts=opts.LegendOpts(pos_top="8%", type_="scroll"),
+        toolbox_opts=opts.ToolboxOpts(),
+    )
+    return line
+
+
+# 显示指定年份范围、赛区队伍数前 N 名学校的逐年趋势
+def build_range_year_trend_line(
+    start_year: int,
+    end_year: int,
+    area: str,
+    stats_data: Dict,
+    top_n: int = TREND_TOP_N
+) -> Line:
+    """
+    构造折线图：队伍数前 top_n 名学校各年的参赛队伍数，
+    以及整个赛区队伍数的滑动平均（右侧 Y 轴）
+
+    :param start_year: 起始年份
+    :param end_year: 结束年份
+    :param area: 赛区名称
+    :param stats_data: 统计数据，从statistics.py的get_multi_year_stats_data获取，
+                     或者直接是data_by_year格式的数据
+    :param top_n: 画多少所学校
+    :return: 折线图对象
+    """
+    years, schools, trends, area_trend = _trend_data(start_year, end_year, stats_data)
+    x_data = [str(y) for y in years]
+
+    series = [
+        ('school', school, [rec['team_count'] for rec in trends.get(school, [])])
+        for school in schools[:top_n]
+    ]
+    series.append((
+        'area_avg', f"{area}队伍数滑动平均",
+        [round(rec['team_count_avg'], 1) for rec in area_trend]
+    ))
+    return get_chart_template('range_trend_line').render(
+        f"{_years_label(years)} {area} 参赛队伍数前{min(top_n, len(schools))}名学校趋势",
+        x_data,
+        series
+    )
+
+
+# 显示指定年份范围、赛区各学校最后一年的同比变化
+def build_range_year_trend_table(
+    start_year: int,
+    end_year: int,
+    area: str,
+    stats_data: Dict
+) -> Table:
+    """
+    构造表格，列：学校名称 | 队伍数 | 同比增长 | 滑动平均 | 排名 | 排名变化 | 获奖率 | 获奖率变化，
+    取区间最后一年的趋势，第一行为赛区合计
+
+    :param start_year: 起始年份
+    :param end_year: 结束年份
+    :param area: 赛区名称
+    :param stats_data: 统计数据，从statistics.py的get_multi_year_stats_data获取，
+                     或者直接是data_by_year格式的数据
+    :return: 表格对象
+    """
+    years, schools, trends, area_trend = _trend_data(start_year, end_year, stats_data)
+
+    def signed(value, percent: bool = False) -> str:
+        if value is None:
+            return "-"
+        if percent:
+            return f"{'+' if value > 0 else ''}{round(value * 100, 2)}%"
+        return f"{'+' if value > 0 else ''}{value}"
+
+    headers = [
+        "学校名称", f"{years[-1]}年队伍数", "同比增长", "滑动平均",
+        "排名", "排名变化", "获奖率", "获奖率变化",
+    ]
+    rows = []
+    for school, records in [(f"{area}合计", area_trend)] + [(s, trends.get(s, [])) for s in schools]:
+        if not records:
+            continue
+        rec = records[-1]
+        rows.append([
+            school,
+            rec['team_count'],
+            signed(rec['team_count_growth'], percent=True),
+            round(rec['team_count_avg'], 1),
+            rec['rank'] if rec['rank'] is not None else "-",
+            signed(rec['rank_change']),
+            _format_percentage(rec['award_rate']),
+            signed(rec['award_rate_change'], percent=True),
+        ])
+
+    return create_generic_table(
+        headers,
+        rows,
+        title=f"{area} 赛区{years[-1]}年各高校同比变化"
+    )
+
 # def render_area_range_chart(
 #     start_year: int,
 #     end_year: int,
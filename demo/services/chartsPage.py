@@ -1,14 +1,88 @@
 # demo/services/charts.py
 # from typing import Dict, Any, List
+import os
+import re
+import simplejson as json
+from django.conf import settings
+from django.templatetags.static import static
+from jinja2 import Environment, FileSystemLoader
 from pyecharts import options as opts
 from pyecharts.charts import Bar, Page, Line
 from pyecharts.components import Table
 from pyecharts.options import ComponentTitleOpts, LabelOpts, AxisOpts
+from pyecharts.charts.base import default
+from pyecharts.commons import utils
 
 from demo.services.charts import build_area_detail_team_count_bar , build_area_detail_participant_count_bar , \
-    build_area_detail_stats_table , \
+    build_area_detail_stats_table , build_area_top_schools_bar , \
+    build_area_subproject_bar , build_area_subproject_table , \
+    build_area_special_awards_bar , build_range_year_special_awards_bar , \
     build_range_year_report_first_prize_bar , build_range_year_report_first_prize_table , \
-    build_range_year_area_report_participant_count_bar , build_range_year_area_report_participant_count_table
+    build_range_year_area_report_participant_count_bar , build_range_year_area_report_participant_count_table , \
+    build_range_year_trend_line , build_range_year_trend_table
+
+
+# 表格内 prettytable 生成的换行缩进
+_TAG_WHITESPACE = re.compile(r'>\s+<')
+_embed_env: Environment | None = None
+
+
+def get_echarts_js_host() -> str:
+    """
+    echarts 脚本所在目录：settings.ECHARTS_JS_HOST 优先，否则为本站 static/echarts/v6/（离线部署），
+    不使用外部 CDN；静态文件里没有该脚本又没有设置 ECHARTS_JS_HOST 时系统检查 demo.E001 报错（见 demo/checks.py）
+    """
+    return getattr(settings, 'ECHARTS_JS_HOST', '') or static('echarts/v6/')
+
+
+def new_page() -> Page:
+    """
+    报表页统一使用的 Page：简单布局，依赖脚本指向 get_echarts_js_host()
+    """
+    return Page(layout=Page.SimplePageLayout, js_host=get_echarts_js_host())
+
+
+def _compact_json(options) -> str:
+    """图表配置转成不缩进、不留空格的 JSON，JsCode 照常替换成函数"""
+    return utils.replace_placeholder(
+        json.dumps(options, separators=(',', ':'), default=default, ignore_nan=True)
+    )
+
+
+def _get_embed_env() -> Environment:
+    global _embed_env
+    if _embed_env is None:
+        _embed_env = Environment(
+            keep_trailing_newline=True,
+            trim_blocks=True,
+            lstrip_blocks=True,
+            loader=FileSystemLoader(os.path.join(settings.BASE_DIR, 'demo', 'templates')),
+        )
+        _embed_env.filters['compact_json'] = _compact_json
+    return _embed_env
+
+
+def render_page_fragment(page: Page) -> str:
+    """
+    代替 page.render_embed() 的默认模板，仍通过 render_embed() 渲染，只换成 embed_page.html：
+      - 不再输出一整份 <html> 文档，依赖脚本和表格样式整页只引用一次
+      - 图表配置 JSON 不缩进、不留空格
+      - 表格 HTML 去掉标签之间的换行缩进
+    :param page: 组装好的 Page
+    :return: 可嵌入的HTML+JS代码
+    """
+    table_ids = set()
+    for c in page:
+        if isinstance(c, Table):
+            c.html_content = _TAG_WHITESPACE.sub('><', c.html_content)
+            table_ids.add(c.chart_id)
+    return page.render_embed(
+        'embed_page.html',
+        env=_get_embed_env(),
+        table_ids=table_ids,
+        has_table=bool(table_ids),
+        table_css=static('css/charts.css'),
+    )
 
 
 def get_range_year_area_report_page(
@@ -28,14 +102,17 @@ def get_range_year_area_report_page(
     :param use_cache: 是否使用缓存（当stats_data为None时有效）
     :return: 可嵌入的HTML+JS代码
     """
-    page = Page(layout=Page.SimplePageLayout)
+    page = new_page()
     page.add(
         build_range_year_area_report_participant_count_table(start_year , end_year , area , stats_data),
         build_range_year_area_report_participant_count_bar (start_year , end_year , area , stats_data),
+        build_range_year_trend_line(start_year , end_year , area , stats_data),
+        build_range_year_trend_table(start_year , end_year , area , stats_data),
+        build_range_year_special_awards_bar(start_year , end_year , area , stats_data),
         # build_range_year_report_first_prize_bar(start_year, end_year, area, stats_data),
         # build_range_year_report_first_prize_table(start_year, end_year, area, stats_data)
     )
-    return page.render_embed()
+    return render_page_fragment(page)
 
 
 
@@ -43,10 +120,11 @@ def get_area_detail_page(
     year: int,
     area: str,
     stats_data=None,
-    use_cache: bool = True
+    use_cache: bool = True,
+    leaderboards: dict | None = None
 ) -> str:
     """
-    将柱状图和带"赛区"列的表格放到同一个 Page，返回 render_embed() 的片段。
+    将柱状图和带"赛区"列的表格放到同一个 Page，返回 render_page_fragment() 的片段。
     
     :param year: 年份
     :param area: 赛区名称
@@ -54,13 +132,41 @@ def get_area_detail_page(
                      可以是get_school_stats_data返回的完整统计数据，
                      也可以是原始统计数据格式 {school: {team_count: int, ...}, ...}
     :param use_cache: 是否使用缓存（当stats_data为None时有效）
+    :param leaderboards: {metric: get_top_schools(...)}，提供时柱状图只画前 N 名学校和"其他"
     :return: 可嵌入的HTML+JS代码
     """
-        
-    page = Page(layout=Page.SimplePageLayout)
+    if leaderboards:
+        bars = [
+            build_area_top_schools_bar( year , area , leaderboard , metric )
+            for metric , leaderboard in leaderboards.items()
+        ]
+    else:
+        bars = [
+            build_area_detail_team_count_bar( year , area , stats_data ),
+            build_area_detail_participant_count_bar( year , area , stats_data )
+        ]
+
+    page = new_page()
     page.add(
         build_area_detail_stats_table( year , area , stats_data ),
-        build_area_detail_team_count_bar( year , area , stats_data ),
-        build_area_detail_participant_count_bar( year , area , stats_data )
+        *bars,
+        build_area_special_awards_bar( year , area , stats_data )
+    )
+    return render_page_fragment(page)
+
+
+def get_area_subprojects_page(year: int, area: str, summary: list) -> str:
+    """
+    赛区各子项目的汇总表格和柱状图，返回 render_page_fragment() 的片段。
+
+    :param year: 年份
+    :param area: 赛区名称
+    :param summary: statistics.py 的 summarize_subprojects 返回的 [(subproject, {...}), …]
+    :return: 可嵌入的HTML+JS代码
+    """
+    page = new_page()
+    page.add(
+        build_area_subproject_table( year , area , summary ),
+        build_area_subproject_bar( year , area , summary ),
     )
-    return page.render_embed()
+    return render_page_fragment(page)
@@ -0,0 +1,213 @@
+# demo/services/export.py
+"""
+统计数据批量导出：CSV / XLSX / Parquet
+数据直接从缓存表按块流式读出，边读边写，不在内存里拼整份数据；
+需要先用 update_stats_cache 预热缓存。
+
+XLSX 依赖 openpyxl，Parquet 依赖 pyarrow，均为可选依赖，未安装时只能导出 CSV。
+"""
+import csv
+from typing import Iterable, Iterator, List, Tuple
+
+from django.db.models import Sum
+
+from demo.models import COUNT_FIELDS, FIELD_LABELS, RATE_COUNT_FIELDS, STAT_FIELDS, SchoolYearlyCache, SchoolRangeCache
+from demo.services.aggregate import derive_rates
+from demo.services.statistics import CACHE_READ_CHUNK_SIZE
+
+EXPORT_FORMATS = ('csv', 'xlsx', 'parquet')
+# Parquet 每个 row group 的行数
+PARQUET_BATCH_SIZE = 5000
+
+
+def _column_headers(fields: List[str]) -> List[str]:
+    """
+    用模型字段的 db_comment 作为中文表头，和 build_area_detail_stats_table 一致
+    """
+    return [FIELD_LABELS[field] for field in fields]
+
+
+def _with_rates(rows: Iterator[tuple], key_count: int) -> Iterator[tuple]:
+    """
+    缓存表只存计数：每行前 key_count 列为年份、赛区等键，其后为 COUNT_FIELDS，补上比率后按 STAT_FIELDS 输出
+    """
+    for row in rows:
+        rec = derive_rates(dict(zip(COUNT_FIELDS, row[key_count:])))
+        yield (*row[:key_count], *(rec[field] for field in STAT_FIELDS))
+
+
+# ---------- 1. 数据集：(字段, 表头, 行迭代器) ---------- #
+def yearly_dataset(years: List[int] | None = None, areas: List[str] | None = None) -> Tuple[List[str], List[str], Iterator[tuple]]:
+    """
+    各年份、各赛区的学校统计（即 get_yearly_area_stats 的结果），按年份、赛区、队伍数排序
+    """
+    keys = ['year', 'area', 'school']
+    fields = keys + STAT_FIELDS
+    qs = SchoolYearlyCache.objects.all()
+    if years:
+        qs = qs.filter(year__in=[str(y) for y in years])
+    if areas:
+        qs = qs.filter(area__in=areas)
+    rows = (qs.order_by('year', 'area', '-team_count', 'school')
+            .values_list(*keys, *COUNT_FIELDS)
+            .iterator(chunk_size=CACHE_READ_CHUNK_SIZE))
+    return fields, _column_headers(fields), _with_rates(rows, len(keys))
+
+
+def range_dataset(start_year: int, end_year: int, areas: List[str] | None = None) -> Tuple[List[str], List[str], Iterator[tuple]]:
+    """
+    指定年份区间各赛区的多年度汇总，按赛区、排名排序
+    """
+    keys = ['area', 'start_year', 'end_year', 'rank', 'school']
+    fields = keys + STAT_FIELDS
+    qs = SchoolRangeCache.objects.filter(start_year=str(start_year), end_year=str(end_year))
+    if areas:
+        qs = qs.filter(area__in=areas)
+    rows = (qs.order_by('area', 'rank', 'school')
+            .values_list(*keys, *COUNT_FIELDS)
+            .iterator(chunk_size=CACHE_READ_CHUNK_SIZE))
+    return fields, _column_headers(fields), _with_rates(rows, len(keys))
+
+
+def national_dataset(years: List[int] | None = None) -> Tuple[List[str], List[str], Iterator[tuple]]:
+    """
+    全国汇总：每年每所学校把各赛区的计数相加，比率按合计重新计算
+    """
+    fields = ['year', 'school'] + STAT_FIELDS
+    qs = SchoolYearlyCache.objects.all()
+    if years:
+        qs = qs.filter(year__in=[str(y) for y in years])
+    sum_fields = [f"sum_{field}" for field in COUNT_FIELDS]
+    sums = (qs.values('year', 'school')
+            .annotate(**{f"sum_{field}": Sum(field) for field in COUNT_FIELDS})
+            .order_by('year', '-sum_team_count', 'school')
+            .values_list('year', 'school', *sum_fields)
+            .iterator(chunk_size=CACHE_READ_CHUNK_SIZE))
+
+    return fields, _column_headers(fields), _with_rates(sums, 2)
+
+
+def get_dataset(
+    name: str,
+    years: List[int] | None = None,
+    areas: List[str] | None = None,
+    start_year: int | None = None,
+    end_year: int | None = None,
+) -> Tuple[List[str], List[str], Iterator[tuple]]:
+    """
+    按名称取数据集：yearly / range / national；range 必须给出起止年份
+    """
+    if name == 'yearly':
+        return yearly_dataset(years, areas)
+    if name == 'range':
+        if start_year is None or end_year is None:
+            raise ValueError("导出多年度汇总需要指定起止年份")
+        return range_dataset(start_year, end_year, areas)
+    if name == 'national':
+        return national_dataset(years)
+    raise ValueError(f"未知的数据集：{name}")
+
+
+# ---------- 2. 写出 ---------- #
+class _Echo:
+    """
+    只把写入的内容原样返回的伪文件，配合 csv.writer 逐行生成
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(headers: List[str], rows: Iterable[tuple]) -> Iterator[str]:
+    """
+    逐行生成 CSV 文本，可直接交给 StreamingHttpResponse；带 BOM 方便 Excel 打开
+    """
+    writer = csv.writer(_Echo())
+    yield '\ufeff' + writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def write_csv(path: str, headers: List[str], rows: Iterable[tuple]) -> int:
+    """
+    写出 CSV 文件，返回数据行数
+    """
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(headers)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def write_xlsx(path, headers: List[str], rows: Iterable[tuple], title: str = '统计数据') -> int:
+    """
+    用 openpyxl 的 write_only 模式写出 XLSX，行直接落到临时文件，不在内存里保留整张表
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ImportError("导出 XLSX 需要安装 openpyxl")
+
+    count = 0
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=title)
+    sheet.append(headers)
+    for row in rows:
+        sheet.append(row)
+        count += 1
+    workbook.save(path)
+    return count
+
+
+def write_parquet(path, fields: List[str], headers: List[str], rows: Iterable[tuple]) -> int:
+    """
+    用 pyarrow 分批写出 Parquet，每 PARQUET_BATCH_SIZE 行一个 row group；
+    Parquet 列名用英文字段名，中文表头写在各列的元数据 comment 里
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("导出 Parquet 需要安装 pyarrow")
+
+    def types(field):
+        if field in RATE_COUNT_FIELDS:
+            return pa.float64()
+        if field in COUNT_FIELDS or field == 'rank':
+            return pa.int64()
+        return pa.string()
+
+    schema = pa.schema([
+        pa.field(field, types(field), metadata={'comment': header})
+        for field, header in zip(fields, headers)
+    ])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= PARQUET_BATCH_SIZE:
+                writer.write_table(pa.Table.from_pylist([dict(zip(fields, r)) for r in batch], schema=schema))
+                count += len(batch)
+                batch = []
+        if batch:
+            writer.write_table(pa.Table.from_pylist([dict(zip(fields, r)) for r in batch], schema=schema))
+            count += len(batch)
+    return count
+
+
+def write_dataset(path, fmt: str, fields: List[str], headers: List[str], rows: Iterable[tuple]) -> int:
+    """
+    按格式写出数据集，返回数据行数
+    :param path: 文件路径；xlsx / parquet 也可以是已打开的二进制文件对象
+    """
+    if fmt == 'csv':
+        return write_csv(path, headers, rows)
+    if fmt == 'xlsx':
+        return write_xlsx(path, headers, rows)
+    if fmt == 'parquet':
+        return write_parquet(path, fields, headers, rows)
+    raise ValueError(f"不支持的导出格式：{fmt}")
@@ -0,0 +1,50 @@
+# demo/services/invalidation.py
+"""
+进程内缓存（学校索引、奖项分类表、赛事元数据）的跨进程失效。
+
+invalidate_school_index 等函数只清空调用它的那个进程里的全局变量，管理命令里调用时 web 进程看不到。
+导入数据后由 update_stats_cache / generate_synthetic_data 调用 bump_source_version，把数据库里
+CacheVersion 表的版本号加一；各缓存构建时记下 source_version()，取用时版本不同即重新构建。
+
+  - source_version 在进程内缓存 VERSION_CHECK_SECONDS 秒，页面请求不会每次都多一次查询，
+    其他进程最迟这么多秒后看到新版本
+  - 没有版本行时版本号为 0
+"""
+import time
+
+from django.db.models import F
+
+from demo.models import CacheVersion
+
+# 源数据（team / team_member / team_achievement）的版本名称
+SOURCE_DATA = 'source_data'
+# 两次读取版本号的最小间隔（秒）
+VERSION_CHECK_SECONDS = 30
+
+_version: int | None = None
+_checked_at = 0.0
+
+
+def source_version() -> int:
+    """
+    源数据的当前版本号，进程内缓存 VERSION_CHECK_SECONDS 秒
+    """
+    global _version, _checked_at
+    if _version is None or time.monotonic() - _checked_at > VERSION_CHECK_SECONDS:
+        _version = (CacheVersion.objects.filter(name=SOURCE_DATA)
+                    .values_list('version', flat=True).first()) or 0
+        _checked_at = time.monotonic()
+    return _version
+
+
+def bump_source_version() -> int:
+    """
+    导入数据后调用：版本号加一，所有进程的学校索引、奖项分类表、赛事元数据随之失效
+    :return: 新的版本号
+    """
+    global _version
+    CacheVersion.objects.get_or_create(name=SOURCE_DATA)
+    CacheVersion.objects.filter(name=SOURCE_DATA).update(version=F('version') + 1)
+    # 本进程立即读取新版本
+    _version = None
+    return source_version()
@@ -0,0 +1,356 @@
+# demo/services/loadtest.py
+"""
+压测：纯 Python 的 asyncio HTTP 客户端（不依赖 locust），模拟多个用户并发浏览报表页。
+
+  - 场景：journey 依次访问 导航页 → 赛区详情页 → 多年度赛区页，模拟真实的浏览路径；
+    也可以只压其中一种页面（navigation / area_detail / range_report）
+  - 目标页：由赛事元数据生成，每一步随机挑一个年份、赛区，不会只命中同一份缓存；
+    同一个 seed 下每个虚拟用户的访问顺序固定，两次压测之间可以对比
+  - 连接：HTTP/1.1 长连接，每个虚拟用户一条；服务端断开长连接时自动重连一次
+  - 指标：按步骤统计请求数、错误数、吞吐量、延迟百分位、响应字节数；服务端开启 QUERY_COUNT_HEADERS 时
+    同时汇总每个请求的数据库查询次数和耗时（X-DB-Queries / X-DB-Time 响应头）
+  - 报告是普通的 dict，可保存成 JSON，和另一次压测（不同缓存模式、不同 worker 配置）的报告对比
+"""
+import asyncio
+import math
+import random
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+from urllib.parse import quote, urlsplit
+
+from django.urls import reverse
+
+from demo.services.metadata import get_competition_metadata
+
+# 场景名 → 每轮依次访问的步骤
+SCENARIOS = {
+    'journey': ('navigation', 'area_detail', 'range_report'),
+    'navigation': ('navigation',),
+    'area_detail': ('area_detail',),
+    'range_report': ('range_report',),
+}
+PERCENTILES = (50, 90, 95, 99)
+# 浏览器默认发送的 Accept-Encoding，压测时同样让服务端压缩响应
+DEFAULT_ACCEPT_ENCODING = 'gzip, deflate, br'
+
+
+def plan_targets(ranges: Iterable[Tuple[int, int]] | None = None) -> Dict[str, List[str]]:
+    """
+    各步骤可访问的页面路径
+    :param ranges: 多年度页的年份区间，默认为全部年份的首尾区间
+    :return: {步骤: [URL 路径, …]}；没有数据时为空字典
+    """
+    metadata = get_competition_metadata()
+    if not metadata.years:
+        return {}
+    ranges = list(ranges or [(metadata.years[0], metadata.years[-1])])
+    return {
+        'navigation': [reverse('demo:navigation')],
+        'area_detail': [
+            reverse('demo:area_detail', args=(year, area))
+            for year in metadata.years for area in metadata.areas
+            if metadata.has_data(year, area)
+        ],
+        'range_report': [
+            reverse('demo:range_year_area_report', args=(start_year, end_year, area))
+            for start_year, end_year in ranges for area in metadata.areas
+        ],
+    }
+
+
+def percentile(sorted_values: List[float], p: float) -> float | None:
+    """最近秩法的百分位数，sorted_values 需已排序"""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+class Response(NamedTuple):
+    status: int
+    headers: Dict[str, str]
+    size: int
+
+
+class HttpConnection:
+    """
+    一条 HTTP/1.1 长连接，只支持 GET
+    """
+
+    def __init__(self, host: str, port: int, timeout: float = 30.0, headers: Dict[str, str] | None = None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.headers = {'Host': f"{host}:{port}", 'User-Agent': 'demo-loadtest', **(headers or {})}
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+    async def get(self, path: str) -> Response:
+        reused = self.writer is not None
+        if not reused:
+            self.reader, self.writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port), self.timeout
+            )
+        try:
+            return await asyncio.wait_for(self._request(path), self.timeout)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            await self.close()
+            if not reused:
+                raise
+        except BaseException:
+            await self.close()
+            raise
+        # 长连接在空闲时被服务端关闭，新开一条连接重试
+        return await self.get(path)
+
+    async def _request(self, path: str) -> Response:
+        lines = [f"GET {quote(path, safe='/%?=&,:;+')} HTTP/1.1"]
+        lines += [f"{name}: {value}" for name, value in self.headers.items()]
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError('连接已被服务端关闭')
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = headers.get('connection', '').lower() != 'close'
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            size = 0
+            while True:
+                chunk_size = int((await self.reader.readline()).split(b';')[0], 16)
+                if chunk_size == 0:
+                    # 跳过 trailer
+                    while await self.reader.readline() not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                await self.reader.readexactly(chunk_size + 2)
+                size += chunk_size
+        elif 'content-length' in headers:
+            size = int(headers['content-length'])
+            await self.reader.readexactly(size)
+        else:
+            # 没有长度信息，读到连接关闭为止
+            size = len(await self.reader.read())
+            keep_alive = False
+
+        if not keep_alive:
+            await self.close()
+        return Response(status, headers, size)
+
+
+class StepStats:
+    """
+    一个步骤的全部请求结果
+    """
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.error_samples: Dict[str, int] = {}
+        self.bytes = 0
+        self.queries: List[int] = []
+        self.db_ms: List[float] = []
+
+    def record(self, elapsed: float, response: Response):
+        self.latencies.append(elapsed)
+        self.bytes += response.size
+        if response.status >= 400:
+            self._error(f"HTTP {response.status}")
+        if 'x-db-queries' in response.headers:
+            self.queries.append(int(response.headers['x-db-queries']))
+            self.db_ms.append(float(response.headers.get('x-db-time', 0)))
+
+    def fail(self, error: BaseException):
+        self._error(f"{type(error).__name__}: {error}")
+
+    def _error(self, message: str):
+        self.errors += 1
+        self.error_samples[message] = self.error_samples.get(message, 0) + 1
+
+    def merge(self, other: 'StepStats'):
+        self.latencies += other.latencies
+        self.errors += other.errors
+        for message, count in other.error_samples.items():
+            self.error_samples[message] = self.error_samples.get(message, 0) + count
+        self.bytes += other.bytes
+        self.queries += other.queries
+        self.db_ms += other.db_ms
+
+    def summary(self, elapsed: float) -> dict:
+        """
+        :param elapsed: 压测总时长（秒），用于计算吞吐量
+        :return: 请求数、错误数、吞吐量（次/秒）、延迟（毫秒）、平均字节数、平均查询次数和查询耗时
+        """
+        latencies = sorted(latency * 1000 for latency in self.latencies)
+        requests = len(latencies)
+        result = {
+            'requests': requests,
+            'errors': self.errors,
+            'rps': requests / elapsed if elapsed > 0 else 0.0,
+            'mean_ms': sum(latencies) / requests if requests else None,
+            **{f"p{p}_ms": percentile(latencies, p) for p in PERCENTILES},
+            'max_ms': latencies[-1] if latencies else None,
+            'avg_bytes': self.bytes / requests if requests else None,
+            'queries': sum(self.queries) / len(self.queries) if self.queries else None,
+            'db_ms': sum(self.db_ms) / len(self.db_ms) if self.db_ms else None,
+        }
+        if self.error_samples:
+            result['error_samples'] = dict(self.error_samples)
+        return result
+
+
+async def _run(
+    base_url: str,
+    steps: Tuple[str, ...],
+    targets: Dict[str, List[str]],
+    users: int,
+    duration: float,
+    ramp_up: float,
+    think_time: float,
+    timeout: float,
+    seed: int,
+    headers: Dict[str, str],
+    warmup: bool,
+) -> Tuple[Dict[str, StepStats], float]:
+    url = urlsplit(base_url)
+    if url.scheme != 'http':
+        raise ValueError(f"只支持 http：{base_url}")
+    host, port, prefix = url.hostname or '127.0.0.1', url.port or 80, url.path.rstrip('/')
+
+    if warmup:
+        # 每个目标页先访问一次，懒加载的缓存（年度缓存、元数据、图表模板）都填好再计时
+        connection = HttpConnection(host, port, timeout, headers)
+        try:
+            for step in steps:
+                for path in targets[step]:
+                    await connection.get(prefix + path)
+        finally:
+            await connection.close()
+
+    loop = asyncio.get_running_loop()
+    stats = {step: StepStats() for step in steps}
+    started = loop.time()
+    deadline = started + duration
+
+    async def virtual_user(index: int):
+        rng = random.Random(seed * 100003 + index)
+        # 在 ramp_up 秒内陆续加入
+        await asyncio.sleep(ramp_up * index / users)
+        connection = HttpConnection(host, port, timeout, headers)
+        try:
+            while loop.time() < deadline:
+                for step in steps:
+                    if loop.time() >= deadline:
+                        break
+                    path = prefix + rng.choice(targets[step])
+                    request_started = time.perf_counter()
+                    try:
+                        response = await connection.get(path)
+                    except (OSError, EOFError, ValueError) as e:
+                        stats[step].fail(e)
+                    else:
+                        stats[step].record(time.perf_counter() - request_started, response)
+                    if think_time:
+                        await asyncio.sleep(rng.uniform(0, 2 * think_time))
+        finally:
+            await connection.close()
+
+    await asyncio.gather(*(virtual_user(i) for i in range(users)))
+    return stats, loop.time() - started
+
+
+def run_load_test(
+    base_url: str,
+    scenario: str = 'journey',
+    targets: Dict[str, List[str]] | None = None,
+    users: int = 10,
+    duration: float = 30.0,
+    ramp_up: float = 0.0,
+    think_time: float = 0.0,
+    timeout: float = 30.0,
+    seed: int = 1,
+    accept_encoding: str = DEFAULT_ACCEPT_ENCODING,
+    warmup: bool = True,
+    label: str = '',
+) -> dict:
+    """
+    执行一次压测
+    :param base_url: 服务地址，如 http://127.0.0.1:8000
+    :param scenario: SCENARIOS 中的场景名
+    :param targets: 各步骤的页面路径，默认由 plan_targets 生成
+    :param users: 并发的虚拟用户数
+    :param duration: 压测时长（秒），含 ramp_up
+    :param ramp_up: 虚拟用户在这么多秒内陆续加入
+    :param think_time: 两次请求之间的平均停顿（秒），0 表示不停顿
+    :param timeout: 单个请求的超时（秒）
+    :param seed: 随机种子
+    :param accept_encoding: 请求头 Accept-Encoding，空串表示不要求压缩
+    :param warmup: 计时前先把每个目标页访问一次
+    :param label: 报告标签，如 "swr-on gunicorn-4w"，对比报告时区分不同配置
+    :return: 报告 {label, base_url, scenario, users, duration, think_time, started_at, elapsed, steps, total}
+    """
+    steps = SCENARIOS[scenario]
+    targets = targets if targets is not None else plan_targets()
+    missing = [step for step in steps if not targets.get(step)]
+    if missing:
+        raise ValueError(f"没有可访问的页面：{', '.join(missing)}")
+
+    headers = {'Accept-Encoding': accept_encoding} if accept_encoding else {}
+    started_at = datetime.now().isoformat(timespec='seconds')
+    stats, elapsed = asyncio.run(_run(
+        base_url, steps, targets, max(1, users), duration, ramp_up, think_time, timeout, seed, headers, warmup
+    ))
+    total = StepStats()
+    for step_stats in stats.values():
+        total.merge(step_stats)
+    return {
+        'label': label,
+        'base_url': base_url,
+        'scenario': scenario,
+        'users': users,
+        'duration': duration,
+        'think_time': think_time,
+        'started_at': started_at,
+        'elapsed': elapsed,
+        'steps': {step: step_stats.summary(elapsed) for step, step_stats in stats.items()},
+        'total': total.summary(elapsed),
+    }
+
+
+def compare_reports(report: dict, baseline: dict) -> Dict[str, dict]:
+    """
+    两份报告按步骤对比吞吐量、p95 延迟和查询次数
+    :return: {步骤: {指标: (本次, 基线, 变化比例或 None)}}，只包含两份报告都有的步骤
+    """
+    def change(current, base):
+        if current is None or not base:
+            return None
+        return current / base - 1
+
+    rows = {}
+    pairs = [(step, report['steps'][step], baseline['steps'][step])
+             for step in report['steps'] if step in baseline['steps']]
+    pairs.append(('total', report['total'], baseline['total']))
+    for step, current, base in pairs:
+        rows[step] = {
+            metric: (current.get(metric), base.get(metric), change(current.get(metric), base.get(metric)))
+            for metric in ('rps', 'p95_ms', 'queries')
+        }
+    return rows
@@ -0,0 +1,115 @@
+# demo/services/memo.py
+"""
+请求级记忆化：同一个请求（一次页面组装）里，统计服务函数对相同参数只真正执行一次。
+
+  - 作用域：request_scope() 在 contextvar 里放一个空字典，退出时还原；
+    contextvar 对同步视图（线程）和异步视图（协程任务）都各自独立，不会串到别的请求
+  - 键：函数 + 绑定默认值之后的参数，get_yearly_area_stats(2023, '上海赛区') 和
+    get_yearly_area_stats(2023, '上海赛区', use_cache=True) 命中同一条；参数无法哈希时不缓存
+  - 没有作用域时（管理命令、后台任务、测试里直接调用）直接执行，不做任何缓存
+  - 返回值在同一请求内共用，调用方不要原地修改
+"""
+import functools
+import inspect
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict
+
+_scope: ContextVar['MemoScope | None'] = ContextVar('stats_memo_scope', default=None)
+
+# 进程内累计的命中/未命中次数，按函数名统计
+_totals: Dict[str, Dict[str, int]] = {}
+_totals_lock = threading.Lock()
+
+
+class MemoScope:
+    """
+    一个请求内的缓存和命中计数
+    """
+
+    def __init__(self):
+        self.values: dict = {}
+        self.hits = 0
+        self.misses = 0
+
+
+@contextmanager
+def request_scope():
+    """
+    开启请求级记忆化作用域；嵌套调用时沿用外层作用域
+    """
+    current = _scope.get()
+    if current is not None:
+        yield current
+        return
+    scope = MemoScope()
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
+
+
+def _freeze(value):
+    """把列表、字典等转换成可哈希的形式用作缓存键"""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+
+def _count(name: str, outcome: str):
+    with _totals_lock:
+        counters = _totals.setdefault(name, {'hits': 0, 'misses': 0})
+        counters[outcome] += 1
+
+
+def memoize_per_request(func: Callable) -> Callable:
+    """
+    装饰统计服务函数，在 request_scope() 内按参数缓存返回值
+    """
+    signature = inspect.signature(func)
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        scope = _scope.get()
+        if scope is None:
+            return func(*args, **kwargs)
+
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = (name, _freeze(tuple(bound.arguments.items())))
+        try:
+            if key in scope.values:
+                scope.hits += 1
+                _count(name, 'hits')
+                return scope.values[key]
+        except TypeError:
+            # 参数里有不可哈希的对象，不缓存
+            return func(*args, **kwargs)
+
+        result = func(*args, **kwargs)
+        scope.values[key] = result
+        scope.misses += 1
+        _count(name, 'misses')
+        return result
+
+    return wrapper
+
+
+def memo_counters() -> Dict[str, Dict[str, int]]:
+    """
+    进程启动以来各函数的命中/未命中次数，供监控采集：{函数名: {'hits': …, 'misses': …}}
+    """
+    with _totals_lock:
+        return {name: dict(counters) for name, counters in _totals.items()}
+
+
+def reset_memo_counters():
+    with _totals_lock:
+        _totals.clear()
@@ -0,0 +1,81 @@
+# demo/services/metadata.py
+"""
+赛事元数据：从 team 表发现有哪些年份、赛区，代替 views.py 里写死的 AREAS / YEARS。
+一次 DISTINCT (create_year, competition_zone) 查询得到全部组合，结果在进程内缓存 METADATA_TTL 秒；
+导入新数据后 update_stats_cache 递增源数据版本号（见 invalidation.py），各进程随之重新读取。
+"""
+import time
+from typing import Iterable, List, Tuple
+
+from demo.models import Team
+from demo.services.invalidation import source_version
+
+# 已知赛区的展示顺序，新出现的赛区按名称排在后面
+AREA_DISPLAY_ORDER = [
+    '东北赛区', '上海赛区', '西南赛区', '华东赛区',
+    '西北赛区', '华中赛区', '华北赛区', '华南赛区',
+    '海外及港澳台赛区',
+]
+
+# 元数据在进程内的有效期（秒）
+METADATA_TTL = 600
+
+
+class CompetitionMetadata:
+    """
+    数据里出现过的 (年份, 赛区) 组合
+    """
+
+    def __init__(self, pairs: Iterable[Tuple[str | None, str | None]]):
+        self.pairs = set()
+        for year, area in pairs:
+            # create_year 是字符串，跳过空值和非年份的脏数据
+            if area and year and str(year).isdigit():
+                self.pairs.add((int(year), area))
+
+        self.years: List[int] = sorted({year for year, _ in self.pairs})
+        order = {area: i for i, area in enumerate(AREA_DISPLAY_ORDER)}
+        self.areas: List[str] = sorted(
+            {area for _, area in self.pairs},
+            key=lambda area: (order.get(area, len(order)), area)
+        )
+
+    def has_area(self, area: str) -> bool:
+        return area in self.areas
+
+    def has_year(self, year: int) -> bool:
+        return year in self.years
+
+    def has_data(self, year: int, area: str) -> bool:
+        """指定年份、赛区是否有参赛队伍"""
+        return (year, area) in self.pairs
+
+
+_metadata: CompetitionMetadata | None = None
+_metadata_loaded_at = 0.0
+_metadata_version = 0
+
+
+def get_competition_metadata() -> CompetitionMetadata:
+    """
+    取出 team 表中所有不同的 (create_year, competition_zone)，结果在进程内缓存 METADATA_TTL 秒，
+    源数据版本号变化时重新读取
+    """
+    global _metadata, _metadata_loaded_at, _metadata_version
+    version = source_version()
+    if (_metadata is None or version != _metadata_version
+            or time.monotonic() - _metadata_loaded_at > METADATA_TTL):
+        _metadata = CompetitionMetadata(
+            Team.objects.order_by().values_list('create_year', 'competition_zone').distinct()
+        )
+        _metadata_loaded_at = time.monotonic()
+        _metadata_version = version
+    return _metadata
+
+
+def invalidate_competition_metadata():
+    """
+    清空本进程的元数据，下次访问时重新读取年份、赛区；其他进程的失效见 invalidation.bump_source_version
+    """
+    global _metadata
+    _metadata = None
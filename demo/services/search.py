@@ -0,0 +1,238 @@
+# demo/services/search.py
+"""
+学校搜索：把 team_member 里出现过的所有学校名读进内存建索引，搜索时不再对 team_member 做 LIKE '%...%' 扫描。
+
+  - 构建：一次分组查询得到 (学校, 年份, 赛区, 人数)，进程内缓存 SCHOOL_INDEX_TTL 秒；
+    导入数据后 update_stats_cache 递增源数据版本号（见 invalidation.py），各进程最迟
+    VERSION_CHECK_SECONDS 秒后重新构建
+  - 规范化：全角转半角、去空白、统一大小写，"复旦大学 " 和 "复旦大学" 视为同一所学校，
+    显示名取人数最多的写法
+  - 子串：二元组倒排索引求交集后再逐个确认；单字查询用单字索引
+  - 前缀：规范化后的名称排序存放，二分查找；安装了 pypinyin 时同时索引全拼和首字母，
+    可以用 fudan、fddx 搜到复旦大学
+  - 排序：完全匹配 > 前缀匹配 > 子串/拼音匹配，同一档按参赛人数从多到少
+"""
+import bisect
+import re
+import threading
+import time
+import unicodedata
+from typing import Dict, Iterable, List, Set, Tuple
+
+from django.db.models import Count, F
+
+from demo.models import TeamMember
+from demo.services.invalidation import source_version
+
+try:
+    from pypinyin import lazy_pinyin
+except ImportError:
+    lazy_pinyin = None
+
+# 索引在进程内的有效期（秒）
+SCHOOL_INDEX_TTL = 3600
+# 默认返回的结果数
+DEFAULT_SEARCH_LIMIT = 20
+
+# 匹配档次，数字越小越靠前
+EXACT, PREFIX, SUBSTRING = 0, 1, 2
+
+_SPACES = re.compile(r'\s+')
+
+
+def normalize_school(name: str) -> str:
+    """
+    学校名的规范化形式，用作索引键：NFKC（全角字母、数字、括号转半角）、去空白、小写
+    """
+    name = unicodedata.normalize('NFKC', name)
+    return _SPACES.sub('', name).lower()
+
+
+def _ngrams(text: str, n: int) -> Set[str]:
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def _pinyin_keys(name: str) -> Tuple[str, ...]:
+    """全拼和首字母，如 复旦大学 → ('fudandaxue', 'fddx')；未安装 pypinyin 时为空"""
+    if lazy_pinyin is None:
+        return ()
+    syllables = [s for s in lazy_pinyin(name, errors='ignore') if s]
+    if not syllables:
+        return ()
+    return ''.join(syllables).lower(), ''.join(s[0] for s in syllables).lower()
+
+
+class SchoolEntry:
+    """
+    一所学校：显示名、参赛年份、赛区及人数
+    """
+    __slots__ = ('name', 'key', 'pairs', 'member_count')
+
+    def __init__(self, name: str, key: str):
+        self.name = name
+        self.key = key
+        self.pairs: Set[Tuple[int, str]] = set()
+        self.member_count = 0
+
+    def to_dict(self) -> dict:
+        return {
+            'school': self.name,
+            'years': sorted({year for year, _ in self.pairs}),
+            'areas': sorted({area for _, area in self.pairs}),
+            'member_count': self.member_count,
+        }
+
+
+class SchoolIndex:
+    """
+    学校名的内存索引
+    """
+
+    def __init__(self, rows: Iterable[Tuple[str | None, str | None, str | None, int]]):
+        """
+        :param rows: (学校, 年份, 赛区, 人数)，同一所学校的不同写法会合并
+        """
+        entries: Dict[str, SchoolEntry] = {}
+        # 同一规范化名称下各种写法的人数，显示名取人数最多的写法
+        spellings: Dict[str, Dict[str, int]] = {}
+        for school, year, area, count in rows:
+            name = (school or '').strip()
+            key = normalize_school(name)
+            if not key:
+                continue
+            entry = entries.get(key)
+            if entry is None:
+                entry = entries[key] = SchoolEntry(name, key)
+            if year and str(year).isdigit() and area:
+                entry.pairs.add((int(year), area))
+            entry.member_count += count
+            by_spelling = spellings.setdefault(key, {})
+            by_spelling[name] = by_spelling.get(name, 0) + count
+        for key, by_spelling in spellings.items():
+            entries[key].name = max(by_spelling.items(), key=lambda kv: (kv[1], kv[0]))[0]
+
+        self.entries: List[SchoolEntry] = sorted(entries.values(), key=lambda e: e.key)
+        # 前缀：(键, 条目序号) 按键排序，规范化名称和拼音共用
+        prefix_keys = [(entry.key, i) for i, entry in enumerate(self.entries)]
+        for i, entry in enumerate(self.entries):
+            prefix_keys.extend((key, i) for key in _pinyin_keys(entry.name))
+        prefix_keys.sort()
+        self._prefix_keys = [key for key, _ in prefix_keys]
+        self._prefix_ids = [i for _, i in prefix_keys]
+
+        # 子串：单字和二元组倒排索引
+        self._unigrams: Dict[str, Set[int]] = {}
+        self._bigrams: Dict[str, Set[int]] = {}
+        for i, entry in enumerate(self.entries):
+            for char in set(entry.key):
+                self._unigrams.setdefault(char, set()).add(i)
+            for gram in _ngrams(entry.key, 2):
+                self._bigrams.setdefault(gram, set()).add(i)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _prefix_matches(self, query: str) -> Set[int]:
+        start = bisect.bisect_left(self._prefix_keys, query)
+        matches = set()
+        for position in range(start, len(self._prefix_keys)):
+            if not self._prefix_keys[position].startswith(query):
+                break
+            matches.add(self._prefix_ids[position])
+        return matches
+
+    def _substring_matches(self, query: str) -> Set[int]:
+        if len(query) == 1:
+            return set(self._unigrams.get(query, ()))
+        grams = sorted(_ngrams(query, 2), key=lambda gram: len(self._bigrams.get(gram, ())))
+        candidates = set(self._bigrams.get(grams[0], ()))
+        for gram in grams[1:]:
+            if not candidates:
+                break
+            candidates &= self._bigrams.get(gram, set())
+        return {i for i in candidates if query in self.entries[i].key}
+
+    def search(self, query: str, limit: int = DEFAULT_SEARCH_LIMIT) -> List[dict]:
+        """
+        按名称子串、前缀或拼音搜索学校
+        :param query: 搜索词
+        :param limit: 最多返回的结果数
+        :return: [{'school': 显示名, 'years': [...], 'areas': [...], 'member_count': 人数}, …]
+        """
+        query = normalize_school(query or '')
+        if not query or limit <= 0:
+            return []
+
+        def tier(i: int) -> int:
+            # 拼音只能命中子串一档，名称本身的前缀才算前缀匹配
+            key = self.entries[i].key
+            if key == query:
+                return EXACT
+            return PREFIX if key.startswith(query) else SUBSTRING
+
+        matches = self._substring_matches(query) | self._prefix_matches(query)
+        tiers = {i: tier(i) for i in matches}
+        ranked = sorted(
+            tiers.items(),
+            key=lambda kv: (kv[1], -self.entries[kv[0]].member_count, self.entries[kv[0]].key)
+        )
+        return [self.entries[i].to_dict() for i, _ in ranked[:limit]]
+
+
+def _load_rows():
+    """
+    一次分组查询：各学校在各年份、赛区的参赛人数（只计当前版本的成员行）
+    """
+    from demo.services.statistics import CURRENT_MEMBER_Q
+
+    # 赛区通过 TeamMember.team 按 team_code 关联 team 表取得，不再每行一个相关子查询
+    return (TeamMember.objects
+            .filter(CURRENT_MEMBER_Q)
+            .exclude(school__isnull=True)
+            .exclude(school='')
+            .annotate(zone=F('team__competition_zone'))
+            .order_by()
+            .values('school', 'create_year', 'zone')
+            .annotate(n=Count('member_code'))
+            .values_list('school', 'create_year', 'zone', 'n'))
+
+
+_index: SchoolIndex | None = None
+_index_loaded_at = 0.0
+_index_version = 0
+_lock = threading.Lock()
+
+
+def _index_expired(version: int) -> bool:
+    return (_index is None or version != _index_version
+            or time.monotonic() - _index_loaded_at > SCHOOL_INDEX_TTL)
+
+
+def get_school_index() -> SchoolIndex:
+    """
+    取出学校索引，进程内缓存 SCHOOL_INDEX_TTL 秒，源数据版本号变化时重新构建；并发请求只构建一次
+    """
+    global _index, _index_loaded_at, _index_version
+    version = source_version()
+    if _index_expired(version):
+        with _lock:
+            if _index_expired(version):
+                _index = SchoolIndex(_load_rows())
+                _index_loaded_at = time.monotonic()
+                _index_version = version
+    return _index
+
+
+def invalidate_school_index():
+    """
+    清空本进程的索引，下次搜索时重新构建；其他进程的失效见 invalidation.bump_source_version
+    """
+    global _index
+    _index = None
+
+
+def search_schools(query: str, limit: int = DEFAULT_SEARCH_LIMIT) -> List[dict]:
+    """
+    搜索学校，见 SchoolIndex.search
+    """
+    return get_school_index().search(query, limit)
@@ -0,0 +1,300 @@
+# demo/services/static_site.py
+"""
+静态报表站点：把导航页、各年各赛区详情页（含子项目页）和多年度赛区页渲染成静态 HTML，
+同时写出 .gz（以及安装了 brotli 时的 .br）压缩版本，nginx 开启 gzip_static / brotli_static 即可直接提供。
+
+  - 页面路径：/demo/area/2023/上海赛区/ → <输出目录>/demo/area/2023/上海赛区/index.html
+  - 数据指纹：按统计缓存表的 (记录数, 最后更新时间) 分组计算，每张表一次 GROUP BY 查询；
+    指纹和上次生成时一致、文件也还在的页面直接跳过
+  - 清单：<输出目录>/.manifest.json 记录每个页面的指纹，已不存在的页面会被删除
+"""
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Callable, Dict, Iterable, List, Tuple
+from urllib.parse import unquote
+
+from django.db.models import Count, Max
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from demo.models import SchoolRangeCache, SchoolSubprojectCache, SchoolYearlyCache
+from demo.services.memo import request_scope
+from demo.services.metadata import get_competition_metadata
+
+MANIFEST_NAME = '.manifest.json'
+# 页面模板、图表样式修改后调大这个版本号，所有页面都会重新生成
+STATIC_SITE_VERSION = 2
+
+
+def get_compressors() -> Dict[str, Callable[[bytes], bytes]]:
+    """
+    可用的压缩格式：gzip 总是可用，brotli 为可选依赖
+    """
+    compressors = {'.gz': lambda content: gzip.compress(content, compresslevel=9, mtime=0)}
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        compressors['.br'] = lambda content: brotli.compress(content, quality=11)
+    return compressors
+
+
+def _fingerprint(*parts) -> str:
+    return hashlib.sha256(json.dumps([STATIC_SITE_VERSION, *parts], default=str).encode()).hexdigest()
+
+
+def _cache_versions(qs, *keys: str) -> Dict[tuple, tuple]:
+    """
+    按 keys 分组取 (记录数, 最后更新时间)，作为这组缓存的数据版本
+    """
+    rows = qs.order_by().values(*keys).annotate(n=Count('id'), last=Max('updated_at'))
+    return {tuple(row[key] for key in keys): (row['n'], row['last']) for row in rows}
+
+
+def _url(name: str, *args) -> str:
+    """reverse 会把中文赛区名转成 %XX，页面文件名和 resolve 都用解码后的路径"""
+    return unquote(reverse(name, args=args))
+
+
+def collect_pages(ranges: Iterable[Tuple[int, int]] | None = None) -> List[Tuple[str, str]]:
+    """
+    列出要生成的所有页面及其数据指纹
+    :param ranges: 多年度页的年份区间，默认为全部年份的首尾区间
+    :return: [(URL 路径, 指纹), …]
+    """
+    metadata = get_competition_metadata()
+    if not metadata.years:
+        return []
+    ranges = list(ranges or [(metadata.years[0], metadata.years[-1])])
+
+    yearly = _cache_versions(SchoolYearlyCache.objects, 'year', 'area')
+    subprojects = _cache_versions(SchoolSubprojectCache.objects, 'year', 'area', 'subproject')
+    ranged = _cache_versions(SchoolRangeCache.objects, 'start_year', 'end_year', 'area')
+
+    nav_fingerprint = _fingerprint(sorted(metadata.pairs), ranges)
+    pages = [
+        (_url('home'), nav_fingerprint),
+        (_url('demo:navigation'), nav_fingerprint),
+    ]
+
+    # 全部赛区汇总页、年度报告页还是"功能暂未开发"的占位页，不生成
+    for year in metadata.years:
+        for area in metadata.areas:
+            if not metadata.has_data(year, area):
+                continue
+            pages.append((
+                _url('demo:area_detail', year, area),
+                _fingerprint(yearly.get((str(year), area)))
+            ))
+            area_subprojects = sorted(
+                (subproject, version) for (y, a, subproject), version in subprojects.items()
+                if y == str(year) and a == area
+            )
+            pages.append((
+                _url('demo:area_subprojects', year, area),
+                _fingerprint(area_subprojects)
+            ))
+            for subproject, version in area_subprojects:
+                pages.append((
+                    _url('demo:area_subproject_detail', year, area, subproject),
+                    _fingerprint(version)
+                ))
+
+    for start_year, end_year in ranges:
+        for area in metadata.areas:
+            # 多年度页同时用到区间汇总和区间内每一年的年度缓存
+            pages.append((
+                _url('demo:range_year_area_report', start_year, end_year, area),
+                _fingerprint(
+                    ranged.get((str(start_year), str(end_year), area)),
+                    [yearly.get((str(y), area)) for y in range(start_year, end_year + 1)]
+                )
+            ))
+    return pages
+
+
+def page_file_path(output_dir: str, path: str) -> str:
+    """
+    URL 路径对应的 HTML 文件，以 / 结尾的路径写成目录下的 index.html
+    """
+    relative = path.lstrip('/')
+    if not relative or relative.endswith('/'):
+        relative += 'index.html'
+    return os.path.join(output_dir, *relative.split('/'))
+
+
+def _write_atomic(file_path: str, content: bytes):
+    directory = os.path.dirname(file_path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def render_page(path: str) -> bytes:
+    """
+    不经过 HTTP，直接解析 URL 并调用对应视图，返回页面内容
+    """
+    match = resolve(path)
+    # 不经过中间件，记忆化作用域在这里开启
+    with request_scope():
+        response = match.func(RequestFactory().get(path), *match.args, **match.kwargs)
+    if response.status_code != 200:
+        raise ValueError(f"{path} 返回 {response.status_code}")
+    return response.content
+
+
+def build_page(output_dir: str, path: str) -> Tuple[str, int, float]:
+    """
+    渲染一个页面并写出 HTML 及其压缩版本，供并行的工作进程调用
+    :return: (URL 路径, HTML 字节数, 耗时秒数)
+    """
+    from demo.services import tasks
+
+    started = time.perf_counter()
+    content = render_page(path)
+    # 年度缓存过期时视图会提交后台刷新，工作进程退出前等它写完
+    tasks.wait_for_pending()
+
+    file_path = page_file_path(output_dir, path)
+    _write_atomic(file_path, content)
+    for suffix, compress in get_compressors().items():
+        _write_atomic(file_path + suffix, compress(content))
+    return path, len(content), time.perf_counter() - started
+
+
+def remove_page(output_dir: str, path: str):
+    """
+    删除已不存在的页面及其压缩版本
+    """
+    file_path = page_file_path(output_dir, path)
+    for suffix in ('', '.gz', '.br'):
+        try:
+            os.remove(file_path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def load_manifest(output_dir: str) -> Dict[str, str]:
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_manifest(output_dir: str, manifest: Dict[str, str]):
+    _write_atomic(
+        os.path.join(output_dir, MANIFEST_NAME),
+        json.dumps(manifest, ensure_ascii=False, indent=0, sort_keys=True).encode('utf-8')
+    )
+
+
+def plan_build(
+    output_dir: str,
+    pages: List[Tuple[str, str]],
+    force: bool = False
+) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """
+    对比清单，找出需要重新生成的页面和需要删除的页面
+    :return: (待生成的 [(URL 路径, 指纹), …], 待删除的 URL 路径)
+    """
+    manifest = load_manifest(output_dir)
+    todo = [
+        (path, fingerprint) for path, fingerprint in pages
+        if force
+        or manifest.get(path) != fingerprint
+        or not os.path.exists(page_file_path(output_dir, path))
+    ]
+    current = {path for path, _ in pages}
+    removed = [path for path in manifest if path not in current]
+    return todo, removed
+
+
+def _init_worker():
+    """工作进程初始化：spawn 方式启动时需要重新加载 Django"""
+    import django
+    django.setup()
+
+
+def build_site(
+    output_dir: str,
+    ranges: Iterable[Tuple[int, int]] | None = None,
+    workers: int = 1,
+    force: bool = False,
+    on_page: Callable[[str, int, float], None] | None = None,
+    on_error: Callable[[str, Exception], None] | None = None,
+) -> dict:
+    """
+    生成静态站点，只重新渲染指纹变化的页面
+    :param output_dir: 输出目录
+    :param ranges: 多年度页的年份区间
+    :param workers: 并行渲染的进程数，1 表示在当前进程里依次渲染
+    :param force: 忽略清单，全部重新生成
+    :param on_page: 每个页面完成后的回调 (URL 路径, HTML 字节数, 耗时)
+    :param on_error: 页面渲染失败时的回调 (URL 路径, 异常)
+    :return: 汇总信息 {total, rendered, skipped, removed, failed, bytes, seconds}
+    """
+    started = time.perf_counter()
+    pages = collect_pages(ranges)
+    todo, removed = plan_build(output_dir, pages, force)
+    manifest = load_manifest(output_dir)
+    fingerprints = dict(todo)
+    summary = {
+        'total': len(pages), 'rendered': 0, 'skipped': len(pages) - len(todo),
+        'removed': len(removed), 'failed': 0, 'bytes': 0,
+    }
+
+    def done(path, size, elapsed):
+        manifest[path] = fingerprints[path]
+        summary['rendered'] += 1
+        summary['bytes'] += size
+        if on_page:
+            on_page(path, size, elapsed)
+
+    def failed(path, error):
+        # 失败的页面从清单里去掉，下次一定重新生成
+        manifest.pop(path, None)
+        summary['failed'] += 1
+        if on_error:
+            on_error(path, error)
+
+    if workers > 1 and len(todo) > 1:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        from django.db import connections
+
+        # fork 出来的子进程不能和父进程共用数据库连接
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            futures = {executor.submit(build_page, output_dir, path): path for path, _ in todo}
+            for future in as_completed(futures):
+                try:
+                    done(*future.result())
+                except Exception as e:
+                    failed(futures[future], e)
+    else:
+        for path, _ in todo:
+            try:
+                done(*build_page(output_dir, path))
+            except Exception as e:
+                failed(path, e)
+
+    for path in removed:
+        remove_page(output_dir, path)
+        manifest.pop(path, None)
+    save_manifest(output_dir, manifest)
+
+    summary['seconds'] = time.perf_counter() - started
+    return summary
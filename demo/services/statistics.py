@@ -1,12 +1,20 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 from demo.models import (
     Team, TeamMember, TeamAchievement,
-    SchoolYearlyCache
+    SchoolYearlyCache, SchoolRangeCache, SchoolSubprojectCache, SchoolTrendCache,
+    COUNT_FIELDS, RATE_COUNT_FIELDS, STAT_FIELDS, TREND_FIELDS
 )
-from django.db.models import Count , Q , F , OuterRef , Subquery , ExpressionWrapper , FloatField
+from django.db.models import Count , Q , F , Max , OuterRef , Subquery , Sum , Value , Window
+from django.db.models.functions import Coalesce, Lower, NullIf, Rank
 from django.db import transaction
 from typing import Dict, Any, List, Tuple
+from demo.services.aggregate import StatsAggregate, derive_rates, rate_expression
+from demo.services.awards import add_award_flags, get_award_taxonomy, team_award_flags
+from demo.services.memo import memoize_per_request
 
 def extract_schools_from_data(
     data_by_year: Dict[int, Dict[str, Dict[str, Any]]],
@@ -41,25 +49,6 @@ def extract_schools_from_data(
     return schools, total_map
 
 
-# 动态获取SchoolYearlyCache模型中的统计字段
-def get_stat_fields():
-    """
-    获取SchoolYearlyCache模型中的统计字段列表，排除非统计相关字段
-    """
-    # 排除这些字段，它们不是统计数据字段
-    exclude_fields = {'id', 'year', 'area', 'school', 'updated_at'}
-    
-    # 获取模型的所有字段名
-    all_fields = [field.name for field in SchoolYearlyCache._meta.get_fields()]
-    
-    # 过滤出统计字段
-    stat_fields = [field for field in all_fields if field not in exclude_fields]
-    return stat_fields
-
-# 获取统计字段列表
-STAT_FIELDS = get_stat_fields()
-
-
 # TODO: 要补全的函数
 def get_area_stats( ) -> dict:
     # """从 AreaStats 表查询某年各赛区 & 子项目的队伍和人数统计。"""
@@ -78,50 +67,21 @@ def get_area_stats( ) -> dict:
 
 
 
+@memoize_per_request
 def get_area_detail_stats(year: int, area: str) -> dict:
     """
     获取指定年份、指定赛区下各学校的参赛队伍数量统计，
     学校以队长的 school 字段为准。返回 {school_name: team_count, …}。
-    异常情况（无队长、重复队长）会记录到日志并跳过或取第一条。
+    异常情况（无队长、重复队长）跳过或取第一条，队长的确定见统计后端的 captain_schools。
     """
-    # 1. 计算指定赛区每个学校的参赛队伍，学校以队长的学校为准
-    stats = {}
-    # 2. 从数据库查询指定年份、指定赛区的队伍
-    qs = Team.objects.filter(
-        competition_zone=area,
-        create_year=str(year)
-    )
-    for team in qs:
-        # 1) 尝试按 member_type 找队长
-        captain_qs = TeamMember.objects.filter(
-            team_code=team.team_code,
-            create_year=str(year),
-            member_type='队长'
-        )
-        if not captain_qs.exists():
-            # 2) 回退到 member_type_detail 包含 "队长"
-            captain_qs = TeamMember.objects.filter(
-                team_code=team.team_code,
-                create_year=str(year),
-            ).filter(
-                models.Q(member_type_detail__contains='队长')
-            )
-
-        try:
-            captain = captain_qs.get()
-        except TeamMember.DoesNotExist:
-            # 真正没找到队长，跳过
-            print(f"队伍 {team.team_code} 无队长，跳过")
-            continue
-        except TeamMember.MultipleObjectsReturned:
-            # 多条时取第一条
-            captain = captain_qs.first()
+    from demo.services.backends import get_stats_backend
 
-        school = captain.school
+    # 计算指定赛区每个学校的参赛队伍，学校以队长的学校为准
+    stats = {}
+    for school in get_stats_backend().captain_schools(year, area).values():
         if not school:
-            # 如果 school 为空，也跳过
+            # 如果 school 为空，跳过
             continue
-
         stats[school] = stats.get(school, 0) + 1
 
     # —— 按数量降序排序 —— 
@@ -130,6 +90,7 @@ def get_area_detail_stats(year: int, area: str) -> dict:
     )
     return sorted_stats
 
+@memoize_per_request
 def get_area_full_stats(year: int, area: str, use_cache: bool = True) -> dict:
     """
     返回一个 school_stats：
@@ -155,53 +116,217 @@ def get_area_full_stats(year: int, area: str, use_cache: bool = True) -> dict:
     all_stats = get_yearly_area_stats( year , area , use_cache=use_cache )
 
     # 3) 只保留本区学校，并把 team_count 覆盖到 school_stats 里
+    #    （年度统计在同一请求内是共用的，复制一份再改）
+    #    比率按覆盖后的队伍数重新计算
     school_stats = {}
     for school, stats in all_stats.items():
         if school in area_team_counts:
-            stats['team_count'] = area_team_counts[school]
-            school_stats[school] = stats
+            school_stats[school] = derive_rates({**stats, 'team_count': area_team_counts[school]})
 
     return school_stats
 
 # ---------- 1. 缓存读取 ---------- #
+# 缓存读取时 iterator 每次从游标取出的行数
+CACHE_READ_CHUNK_SIZE = 2000
+
+
 def _fetch_cached_stats(year: int, area: str) -> dict | None:
     """
     如缓存命中则返回 dict；未命中返回 None
+    只用 values_list 取需要的列、单次查询，并通过 iterator 流式读取，
+    不构造 SchoolYearlyCache 模型实例，也不再额外发一次 exists() 查询
     """
-    qs = SchoolYearlyCache.objects.filter(year=str(year), area=area)
-    if not qs.exists():
-        return None
+    stats, _ = _fetch_cached_stats_with_age(year, area)
+    return stats
 
-    return {
-        c.school: {field: getattr(c, field) for field in STAT_FIELDS}
-        for c in qs
-    }
+
+def _fetch_cached_stats_with_age(year: int, area: str) -> Tuple[dict | None, datetime | None]:
+    """
+    同 _fetch_cached_stats，同时返回这批缓存中最早的 updated_at，用来判断是否过期
+    """
+    rows = (SchoolYearlyCache.objects
+            .filter(year=str(year), area=area)
+            .values_list('updated_at', 'school', *COUNT_FIELDS)
+            .iterator(chunk_size=CACHE_READ_CHUNK_SIZE))
+
+    stats = {}
+    updated_at = None
+    for row in rows:
+        stats[row[1]] = derive_rates(dict(zip(COUNT_FIELDS, row[2:])))
+        if updated_at is None or row[0] < updated_at:
+            updated_at = row[0]
+    return stats or None, updated_at
+
+
+def _fetch_cached_range_stats_with_age(
+    start_year: int, end_year: int, area: str
+) -> Tuple[Dict[int, dict], Dict[int, datetime]]:
+    """
+    一次查询读出区间内各年的年度缓存，不判断是否过期
+    :return: ({year: {school: {...}}}, {year: 该年缓存中最早的 updated_at})，缓存里没有的年份不出现
+    """
+    cached, oldest = {}, {}
+    rows = (_yearly_cache_rows(start_year, end_year, area)
+            .values_list('year', 'updated_at', 'school', *COUNT_FIELDS)
+            .iterator(chunk_size=CACHE_READ_CHUNK_SIZE))
+    for row in rows:
+        year = int(row[0])
+        cached.setdefault(year, {})[row[2]] = derive_rates(dict(zip(COUNT_FIELDS, row[3:])))
+        if year not in oldest or row[1] < oldest[year]:
+            oldest[year] = row[1]
+    return cached, oldest
+
+
+def _fetch_cached_subproject_stats(year: int, area: str) -> Dict[str, dict] | None:
+    """
+    读取按子项目拆分的学校统计 {subproject: {school: {...}}}；未命中返回 None
+    """
+    rows = (SchoolSubprojectCache.objects
+            .filter(year=str(year), area=area)
+            .values_list('subproject', 'school', *COUNT_FIELDS)
+            .iterator(chunk_size=CACHE_READ_CHUNK_SIZE))
+
+    stats = {}
+    for row in rows:
+        stats.setdefault(row[0], {})[row[1]] = derive_rates(dict(zip(COUNT_FIELDS, row[2:])))
+    return stats or None
+
+
+def _is_stale(updated_at: datetime) -> bool:
+    """
+    缓存写入时间早于 STATS_CACHE_MAX_AGE 秒之前即视为过期
+    """
+    max_age = getattr(settings, 'STATS_CACHE_MAX_AGE', 3600)
+    return timezone.now() - updated_at > timedelta(seconds=max_age)
 
 
 # ---------- 2. 统计计算 ---------- #
-def _query_raw_data(year: int, area: str):
+# 成员表按版本保存：改过信息的成员会留下 is_current=0 的旧版本行（previous_version_id 指向前一版本），
+# 统计只看当前版本；没有启用版本管理的历史数据 is_current 为 NULL，同样视为当前。
+# 建议在 team_member 上建 (team_code, is_current) 索引，MySQL 对该条件可以走 ref_or_null。
+CURRENT_MEMBER_Q = Q(is_current=1) | Q(is_current__isnull=True)
+
+# 没有赛题、也不是企业命题的队伍归入的子项目
+NO_SUBPROJECT = '无子项目'
+
+
+def _person_key():
     """
-    一次性把原始 QuerySet 拿出来，避免函数间重复 IO
+    识别同一个人的键：优先学号，其次邮箱（不区分大小写），都没有时退回 member_code
+    """
+    return Coalesce(NullIf('student_id', Value('')), NullIf(Lower('email'), Value('')), 'member_code')
+
+
+def _subproject_expr(prefix: str = ''):
+    """
+    队伍所属子项目：企业命题队伍按企业命题分组，其余按赛题分组，都为空时归入 NO_SUBPROJECT
+    :param prefix: 从其他表关联到 Team 时的字段前缀，如 'team_code__'
+    """
+    return Coalesce(
+        NullIf(F(f'{prefix}enterprise_proposition'), Value('')),
+        NullIf(F(f'{prefix}competition_topic'), Value('')),
+        Value(NO_SUBPROJECT),
+        output_field=models.TextField(),
+    )
+
+
+def _query_participant_counts(
+    year: int,
+    area: str,
+    distinct_persons: bool | None = None,
+    by_subproject: bool = False
+) -> Dict[Any, int]:
+    """
+    一次分组查询统计各学校的参赛人数 {school: count}，只计当前版本的成员行
     :param year: 年份
     :param area: 赛区名称
-    :return: award_count_map: 直接返回用数据库查询的结果
+    :param distinct_persons: 为 True 时同一个人（学号/邮箱相同）参加多支队伍只算一次；
+                             默认取 settings.STATS_DISTINCT_PARTICIPANTS
+    :param by_subproject: 为 True 时按 (学校, 子项目) 分组，返回 {(school, subproject): count}
+    """
+    if distinct_persons is None:
+        distinct_persons = getattr(settings, 'STATS_DISTINCT_PARTICIPANTS', False)
+    counter = Count(_person_key(), distinct=True) if distinct_persons else Count('member_code')
+    # 通过 TeamMember.team 按 team_code 关联 team 表，赛区、年份和子项目都在同一个 JOIN 里取
+    members = TeamMember.objects.filter(
+        CURRENT_MEMBER_Q, team__competition_zone=area, team__create_year=str(year)
+    )
+    group_by = ['school']
+    if by_subproject:
+        members = members.annotate(subproject=_subproject_expr('team__'))
+        group_by.append('subproject')
+    rows = (members
+            .order_by()
+            .values(*group_by)
+            .annotate(participant_count=counter)
+            .values_list(*group_by, 'participant_count'))
+    if by_subproject:
+        return {(school, subproject): count for school, subproject, count in rows}
+    return dict(rows)
+
+
+def _query_person_keys(years: List[int], area: str, by_subproject: bool = False) -> Dict[Any, set]:
+    """
+    按人去重统计时使用：一次查询取出各学校参赛人员的识别键集合 {school: {person_key, …}}，
+    多个年份、多个学校的集合求并集后再计数，同一个人不会重复计算
+    :param years: 年份列表
+    :param area: 赛区名称
+    :param by_subproject: 为 True 时按 (学校, 子项目) 分组，返回 {(school, subproject): {…}}
+    """
+    members = TeamMember.objects.filter(
+        CURRENT_MEMBER_Q, team__competition_zone=area, team__create_year__in=[str(y) for y in years]
+    ).annotate(person=_person_key())
+    group_by = ['school']
+    if by_subproject:
+        members = members.annotate(subproject=_subproject_expr('team__'))
+        group_by.append('subproject')
+    rows = members.order_by().values_list(*group_by, 'person').distinct()
+
+    keys = {}
+    for row in rows:
+        group = tuple(row[:-1]) if by_subproject else row[0]
+        keys.setdefault(group, set()).add(row[-1])
+    return keys
+
+
+def _query_captain_schools(year: int, area: str) -> Dict[str, str | None]:
+    """
+    一次查询取出指定年份、赛区所有队伍的队长学校，返回 {team_code: school}
+    队长优先按 member_type='队长' 确定，没有时回退到 member_type_detail 包含"队长"；
+    同一队伍有多名队长时按 member_code 取第一条，找不到队长的队伍不出现在结果里。
+    """
+    codes = Team.objects.filter(
+        competition_zone=area,
+        create_year=str(year)
+    ).values('team_code')
+    rows = (TeamMember.objects
+            .filter(CURRENT_MEMBER_Q, team_code__in=Subquery(codes), create_year=str(year))
+            .filter(Q(member_type='队长') | Q(member_type_detail__contains='队长'))
+            .order_by('team_code', 'member_code')
+            .values_list('team_code', 'member_type', 'school'))
+
+    captains = {}
+    for team_code, member_type, school in rows:
+        by_type = member_type == '队长'
+        # 第一条命中，或者之前只是按 member_type_detail 命中而这条按 member_type 命中
+        if team_code not in captains or (by_type and not captains[team_code][0]):
+            captains[team_code] = (by_type, school)
+    return {team_code: school for team_code, (_, school) in captains.items()}
+
+
+def _query_award_counts(year: int, area: str, by_subproject: bool = False) -> List[dict]:
+    """
+    一次分组查询得到各学校（队长学校）的队伍数和各项获奖计数，不含参赛人数和比率
+    :param year: 年份
+    :param area: 赛区名称
+    :param by_subproject: 为 True 时按 (学校, 子项目) 分组，每行多一个 subproject 字段
     """
     # 从团队表中查询指定赛区和年份的所有队伍
     teams = Team.objects.filter(competition_zone=area, create_year=str(year))
     # 然后查询所有队伍的 team_code
     codes = list(teams.values_list('team_code', flat=True))
-    participant_count_sub_q = (TeamMember.objects
-    .filter(school = OuterRef('school'),
-            team_code__in = codes
-            )
-    .values('school')
-    .annotate(
-        participant_count = Count('member_code')
-    )
-    .values('participant_count')[:1]
-    )
-
     award_count_sub_q = TeamMember.objects.filter(
+        CURRENT_MEMBER_Q,
         team_code= OuterRef('team_code'),
         team_order= 1
     ).values('school')[:1]
@@ -209,126 +334,119 @@ def _query_raw_data(year: int, area: str):
     award_count_sq = TeamAchievement.objects.annotate(
         school = Subquery(award_count_sub_q)
     )
-    award_count_map = (award_count_sq.values ( 'school' )
+    # 各个获奖计数的口径来自奖项分类表（读取时同步到 AwardClass 表），对 JOIN 得到的位标志按位求和
+    bucket_counts = get_award_taxonomy().bucket_sums()
+    group_by = ['school']
+    if by_subproject:
+        award_count_sq = award_count_sq.annotate(subproject=_subproject_expr('team_code__'))
+        group_by.append('subproject')
+    award_count_map = (award_count_sq.values ( *group_by )
     .filter ( team_code__in = codes )
     .annotate (
         team_count = Count (
             'team_code'
         ) ,
-        participant_count = Subquery(participant_count_sub_q),
-        award_count = Count (
-            'team_code' ,
-            filter =(~Q ( preliminary_award__isnull = True )) &    # 主要靠这个判断是不是null来判断有没有奖
-                    (~Q ( preliminary_award = '' )) &              # 主要用来辅助
-                    (~Q ( preliminary_award = '重复参赛' ))
-        ) ,
-        qualification_count = Count (
-            'team_code' ,
-            filter = Q ( preliminary_award = '晋级' ) |
-                     Q ( preliminary_award = '一等奖(晋级)' )
-        ) ,
-        first_prize_count = Count (
-            'team_code' ,
-            filter = Q ( preliminary_award = '一等奖' ) |
-                     Q ( preliminary_award = '晋级' ) |
-                     Q ( preliminary_award = '一等奖(晋级)' )
-        ) ,
-        second_prize_count = Count (
-            'team_code' ,
-            filter = Q ( preliminary_award = '二等奖' )
-        ) ,
-        third_prize_count = Count (
-            'team_code' ,
-            filter = Q ( preliminary_award = '三等奖' )
-        ) ,
-        no_award_team_count = Count (
-            'team_code' ,
-            filter = Q ( preliminary_award = None )
-        ) ,
-        final_first_prize_count = Count (
-            'team_code' ,
-            filter = Q ( final_technology = '一等奖' ) | Q ( final_business = '一等奖' )
-        ) ,
-        # ---------计算各种比率-------------
-        award_rate = ExpressionWrapper(
-            F('award_count') * 1.0 / F('team_count'),
-            output_field = FloatField()
-        ),
-        qualification_rate = ExpressionWrapper (
-            F ( 'qualification_count' ) * 1.0 / F ( 'team_count' ) ,
-            output_field = FloatField ()
-        ) ,
-        first_prize_rate = ExpressionWrapper (
-            F ( 'first_prize_count' ) * 1.0 / F ( 'team_count' ) ,
-            output_field = FloatField ()
-        ) ,
-        second_prize_rate = ExpressionWrapper (
-            F ( 'second_prize_count' ) * 1.0 / F ( 'team_count' ) ,
-            output_field = FloatField ()
-        ) ,
-        third_prize_rate = ExpressionWrapper (
-            F ( 'third_prize_count' ) * 1.0 / F ( 'team_count' ) ,
-            output_field = FloatField ()
-        ) ,
-        final_first_prize_rate = ExpressionWrapper (
-            F ( 'final_first_prize_count' ) * 1.0 / F ( 'team_count' ) ,
-            output_field = FloatField ()
-        ) ,
-        no_award_team_rate = ExpressionWrapper (
-            F ( 'no_award_team_count' ) * 1.0 / F ( 'team_count' ) ,
-            output_field = FloatField ()
-        ) ,
+        **bucket_counts,
     )
     )
 
     # 将award_count转为字典
-    award_count_map = list(award_count_map)
+    return list(award_count_map)
+
+
+def _query_raw_data(year: int, area: str, by_subproject: bool = False):
+    """
+    一次性把原始 QuerySet 拿出来，避免函数间重复 IO
+    :param year: 年份
+    :param area: 赛区名称
+    :param by_subproject: 为 True 时按 (学校, 子项目) 分组，每行多一个 subproject 字段
+    :return: award_count_map: 直接返回用数据库查询的结果
+    """
+    award_count_map = _query_award_counts(year, area, by_subproject)
+    # 参赛人数单独一次分组查询，按学校合并，不再对每所学校跑一次相关子查询
+    participant_counts = _query_participant_counts(year, area, by_subproject=by_subproject)
+    for row in award_count_map:
+        key = (row['school'], row['subproject']) if by_subproject else row['school']
+        row['participant_count'] = participant_counts.get(key, 0)
+        # 比率不在 SQL 里算，和读取缓存时一样由计数得到
+        derive_rates(row)
     # award_count_map = {obj['school'] : obj for obj in award_count_map}
     return award_count_map
 
 
+def _query_yearly_stats(year: int, area: str) -> Tuple[Dict[str, dict], Dict[str, dict]]:
+    """
+    学校统计和按子项目拆分的统计只做一次 (学校, 子项目) 分组聚合：
+    子项目统计直接取分组结果，学校的各项计数由各子项目相加（StatsAggregate 合并）。
+    参赛人数按成员本人学校计数，学校合计取 (学校, 子项目) 人数表里该校的全部人数，
+    包括该校在某些子项目下没有自己带队的队伍的成员；按人去重时同一个人可能跨子项目，
+    另做一次按学校去重的计数
+    :return: (school_stats, subproject_stats)，结构同 school_stats / subproject_stats
+    """
+    distinct_persons = getattr(settings, 'STATS_DISTINCT_PARTICIPANTS', False)
+    rows = _query_award_counts(year, area, by_subproject=True)
+    participant_counts = _query_participant_counts(year, area, distinct_persons, by_subproject=True)
+    if distinct_persons:
+        school_participants = _query_participant_counts(year, area, distinct_persons)
+    else:
+        school_participants = {}
+        for (school, _), count in participant_counts.items():
+            school_participants[school] = school_participants.get(school, 0) + count
+
+    subproject_stats, records_by_school = {}, {}
+    for row in rows:
+        # 没有学校的队伍跳过
+        if not row['school']:
+            continue
+        row['participant_count'] = participant_counts.get((row['school'], row['subproject']), 0)
+        subproject_stats.setdefault(row.pop('subproject'), {})[row['school']] = derive_rates(row)
+        records_by_school.setdefault(row['school'], []).append(row)
+
+    school_stats = {}
+    for school, records in records_by_school.items():
+        rec = {'school': school, **StatsAggregate.merge_all(records).counts}
+        rec['participant_count'] = school_participants.get(school, 0)
+        school_stats[school] = derive_rates(rec)
+    return school_stats, subproject_stats
+
+
 
 def _update_school_record(rec: dict, ach: TeamAchievement | None):
     """
-    根据成绩更新学校汇总记录
-    """
-    # 预赛奖项
-    pre = ach.preliminary_award
-    if pre:
-        rec['award_count'] += 1
-
-        if '晋级' in pre:
-            rec['first_prize_count'] += 1
-            rec['qualification_count'] += 1
-        elif '一等奖' in pre:
-            rec['first_prize_count'] += 1
-        elif '二等奖' in pre:
-            rec['second_prize_count'] += 1
-        elif '三等奖' in pre:
-            rec['third_prize_count'] += 1
-        else:
-            print(f"预赛奖项没有匹配的项")
-
-            # 总决赛一等奖
-        final_one = (
-                (ach.final_technology and '一等奖' in ach.final_technology) or
-                (ach.final_business and '一等奖' in ach.final_business)
-        )
-        if final_one:
-            rec['final_first_prize_count'] += 1
-    else:
-        # 没有预赛奖项，算没有获奖的队伍
-        rec['no_award_team_count'] += 1
-        return
+    根据成绩更新学校汇总记录，奖项口径见 awards.py
+    """
+    add_award_flags(rec, team_award_flags(
+        ach.preliminary_award, ach.final_technology, ach.final_business,
+        ach.enterprise_award, ach.enterprise_advancement, ach.best_paper, ach.best_investment_pitch
+    ))
 
 
 def _compute_stats(year: int, area: str) -> dict:
     """
-    真正的统计入口，只关心计算逻辑
+    真正的统计入口，只关心计算逻辑；具体由配置的统计后端（默认 ORM）完成
+    :return: {school: {...}}，与缓存读取的结构保持一致
     """
-    # 返回队伍信息查询以及初步的参数队伍数统计
-    award_count_map = _query_raw_data(year, area)
-    return award_count_map
+    from demo.services.backends import get_stats_backend
+
+    return get_stats_backend().school_stats(year, area)
+
+
+def _compute_yearly_stats(year: int, area: str) -> Tuple[Dict[str, dict], Dict[str, dict]]:
+    """
+    学校统计和按子项目拆分的统计一起算出，见 StatsBackend.yearly_stats
+    """
+    from demo.services.backends import get_stats_backend
+
+    return get_stats_backend().yearly_stats(year, area)
+
+
+def _compute_subproject_stats(year: int, area: str) -> Dict[str, dict]:
+    """
+    按子项目拆分的学校统计 {subproject: {school: {...}}}，由统计后端一次分组得到
+    """
+    from demo.services.backends import get_stats_backend
+
+    return get_stats_backend().subproject_stats(year, area)
 
 
 # ---------- 3. 写回缓存 ---------- #
@@ -350,8 +468,8 @@ def _flush_cache(year: int, area: str, stats: dict):
             'updated_at': now,
         }
         
-        # 从STAT_FIELDS添加统计字段
-        for field in STAT_FIELDS:
+        # 只写入计数字段，比率读取时再算
+        for field in COUNT_FIELDS:
             cache_data[field] = data.get(field, 0)
             
         objs.append(SchoolYearlyCache(**cache_data))
@@ -361,31 +479,70 @@ def _flush_cache(year: int, area: str, stats: dict):
         SchoolYearlyCache.objects.bulk_create(objs)
 
 
+def _flush_subproject_cache(year: int, area: str, subproject_stats: Dict[str, dict]):
+    """
+    全量覆盖式写回按子项目拆分的学校统计：先删后插
+    """
+    now = timezone.now()
+    objs = [
+        SchoolSubprojectCache(
+            year=str(year),
+            area=area,
+            subproject=subproject,
+            school=sch,
+            updated_at=now,
+            **{field: data.get(field, 0) for field in COUNT_FIELDS}
+        )
+        for subproject, stats in subproject_stats.items()
+        for sch, data in stats.items()
+    ]
+
+    with transaction.atomic():
+        SchoolSubprojectCache.objects.filter(year=str(year), area=area).delete()
+        SchoolSubprojectCache.objects.bulk_create(objs)
+
+
 # ---------- 4. Facade：对外统一接口 ---------- #
+@memoize_per_request
 def get_yearly_area_stats(year: int , area: str , use_cache: bool = True) -> dict:
     """
     获取指定某年赛区各个学校得数据
     1) 命中缓存直接返回（如果use_cache=True）
     2) 否则计算 → 写缓存 → 返回
+    开启 STATS_STALE_WHILE_REVALIDATE 时，过期的缓存照常返回，同时在后台重新计算；
+    缓存缺失时当场计算并返回，写缓存放到后台执行：学校统计和按子项目拆分的统计一起算出（同一次分组聚合），
+    两份缓存都由后台写入
     :param year: 年份
     :param area: 赛区名称
     :param use_cache: 是否使用缓存，默认为True。设置为False时将跳过缓存直接计算
     """
+    swr = getattr(settings, 'STATS_STALE_WHILE_REVALIDATE', True)
     if use_cache:
-        cached = _fetch_cached_stats(year, area)
+        cached, updated_at = _fetch_cached_stats_with_age(year, area)
         if cached is not None:
+            if swr and _is_stale(updated_at):
+                enqueue_yearly_refresh(year, area)
             return cached
 
-    stats = _compute_stats(year, area)
-    
+    if not (use_cache and swr):
+        return _compute_stats(year, area)
+
+    stats, subproject_stats = _compute_yearly_stats(year, area)
+    if stats:
+        from demo.services.tasks import enqueue
+        enqueue(
+            ('yearly', year, area), refresh_yearly_area_cache_in_background, year, area, stats, subproject_stats
+        )
     # 即使不使用缓存读取，也要更新缓存
     # _flush_cache(year, area, stats)
     return stats
 
+@memoize_per_request
 def get_range_yearly_area_stats(
     start_year: int,
     end_year: int,
     area: str,
+    use_cache: bool = True,
 ) -> dict[int, dict[str, dict[str, int]]]:
     """
     返回指定赛区在 [start_year, end_year] 区间内，各年份的学校统计数据：
@@ -395,18 +552,615 @@ def get_range_yearly_area_stats(
       …
     }
     每个内层字典的结构与 get_school_yearly_stats(year, area) 相同。
+    区间内的年度缓存一次查询读出，过期的年份照常返回并在后台刷新（同 get_yearly_area_stats），
+    缓存里没有的年份再逐年计算
     :param start_year: 起始年份
     :param end_year: 结束年份
     :param area: 赛区名称
+    :param use_cache: 是否使用缓存，设置为False时逐年直接计算
     """
-    results: dict[int, list] = {}
+    cached: dict[int, dict] = {}
+    if use_cache:
+        cached, oldest = _fetch_cached_range_stats_with_age(start_year, end_year, area)
+        if getattr(settings, 'STATS_STALE_WHILE_REVALIDATE', True):
+            for temp_year, updated_at in oldest.items():
+                if _is_stale(updated_at):
+                    enqueue_yearly_refresh(temp_year, area)
+
+    results: dict[int, dict] = {}
     for temp_year in range(start_year, end_year + 1):
-        # 复用单年函数，传递use_cache参数
-        yearly = get_yearly_area_stats( temp_year , area , use_cache=False )
-        results[temp_year] = yearly
+        if temp_year in cached:
+            results[temp_year] = cached[temp_year]
+        else:
+            results[temp_year] = get_yearly_area_stats(temp_year, area, use_cache=use_cache)
     return results
 
-# ---------- 5. 图表数据准备 ---------- #
+def refresh_yearly_area_cache(year: int, area: str) -> dict:
+    """
+    重新计算指定年份、赛区的学校统计并写回缓存，供预热流程调用；
+    按子项目拆分的统计同时刷新，两者来自同一次 (学校, 子项目) 分组聚合，见 _query_yearly_stats
+    :param year: 年份
+    :param area: 赛区名称
+    """
+    stats, subproject_stats = _compute_yearly_stats(year, area)
+    _flush_cache(year, area, stats)
+    _flush_subproject_cache(year, area, subproject_stats)
+    return stats
+
+
+@memoize_per_request
+def get_subproject_stats(year: int, area: str, use_cache: bool = True) -> Dict[str, dict]:
+    """
+    获取指定年份、赛区按子项目拆分的学校统计 {subproject: {school: {...}}}
+    缓存缺失时同 get_yearly_area_stats：学校统计和按子项目拆分的统计一起算出，
+    两份缓存由同一个 ('yearly', year, area) 后台任务写入
+    :param year: 年份
+    :param area: 赛区名称
+    :param use_cache: 是否使用缓存；缓存由 refresh_yearly_area_cache 与年度缓存一起写入
+    """
+    if use_cache:
+        cached = _fetch_cached_subproject_stats(year, area)
+        if cached is not None:
+            return cached
+    if not (use_cache and getattr(settings, 'STATS_STALE_WHILE_REVALIDATE', True)):
+        return _compute_subproject_stats(year, area)
+
+    stats, subproject_stats = _compute_yearly_stats(year, area)
+    if stats:
+        from demo.services.tasks import enqueue
+        enqueue(
+            ('yearly', year, area), refresh_yearly_area_cache_in_background, year, area, stats, subproject_stats
+        )
+    return subproject_stats
+
+
+def summarize_subprojects(
+    subproject_stats: Dict[str, dict],
+    participant_counts: Dict[str, int] | None = None
+) -> List[Tuple[str, dict]]:
+    """
+    各子项目的合计（计数相加，比率重新计算，另加 school_count），按队伍数从多到少排序
+    :param subproject_stats: get_subproject_stats 的结果
+    :param participant_counts: 按人去重时各子项目的参赛人数 {subproject: count}，见 subproject_participant_counts；
+                               为 None 时参赛人数和其他计数一样相加
+    :return: [(subproject, {...}), …]
+    """
+    summary = []
+    for subproject, stats in subproject_stats.items():
+        rec = StatsAggregate.merge_all(stats.values()).to_record()
+        if participant_counts is not None:
+            rec['participant_count'] = participant_counts.get(subproject, 0)
+        summary.append((subproject, {**rec, 'school_count': len(stats)}))
+    return sorted(summary, key=lambda kv: kv[1]['team_count'], reverse=True)
+
+
+def _distinct_participants() -> bool:
+    return getattr(settings, 'STATS_DISTINCT_PARTICIPANTS', False)
+
+
+def subproject_participant_counts(year: int, area: str, subproject_stats: Dict[str, dict]) -> Dict[str, int] | None:
+    """
+    按人去重（STATS_DISTINCT_PARTICIPANTS）时，子项目合计的参赛人数不能由各学校相加，
+    取各学校人员集合的并集重新计数；不去重时返回 None，由 summarize_subprojects 直接相加
+    :param subproject_stats: get_subproject_stats 的结果，只统计其中出现的学校
+    :return: {subproject: count} 或 None
+    """
+    if not _distinct_participants():
+        return None
+    from demo.services.backends import get_stats_backend
+
+    keys = get_stats_backend().person_keys([year], area, by_subproject=True)
+    return {
+        subproject: len(set().union(*(keys.get((school, subproject), ()) for school in stats)))
+        for subproject, stats in subproject_stats.items()
+    }
+
+
+def range_participant_counts(years: List[int], area: str) -> Dict[str, int] | None:
+    """
+    按人去重（STATS_DISTINCT_PARTICIPANTS）时，多年合计的参赛人数不能由各年相加（同一个人参加多年会重复计数），
+    按学校取各年人员集合的并集重新计数；不去重时返回 None，由 _build_range_stats 直接相加
+    :return: {school: count} 或 None
+    """
+    if not _distinct_participants():
+        return None
+    from demo.services.backends import get_stats_backend
+
+    return {school: len(keys) for school, keys in get_stats_backend().person_keys(years, area).items()}
+
+
+def enqueue_yearly_refresh(year: int, area: str):
+    """
+    把指定年份、赛区的缓存刷新提交到后台线程池，同一 (year, area) 排队中时不重复提交
+    :return: 对应的 Future
+    """
+    from demo.services.tasks import enqueue
+
+    return enqueue(('yearly', year, area), refresh_yearly_area_cache_in_background, year, area)
+
+
+def refresh_yearly_area_cache_in_background(
+    year: int,
+    area: str,
+    stats: dict | None = None,
+    subproject_stats: Dict[str, dict] | None = None,
+):
+    """
+    后台任务：刷新年度缓存（及按子项目拆分的缓存），再重新汇总包含这一年的多年度汇总和逐年趋势，
+    避免多年度页的合计与各年数据不一致
+    :param stats: 请求线程已经算好的学校统计，和 subproject_stats 一起给出时只写缓存不再计算
+    :param subproject_stats: 同一次计算得到的按子项目拆分的统计，见 _compute_yearly_stats
+    """
+    if stats is None or subproject_stats is None:
+        refresh_yearly_area_cache(year, area)
+    else:
+        _flush_cache(year, area, stats)
+        _flush_subproject_cache(year, area, subproject_stats)
+    refresh_dependent_range_caches(year, area)
+
+
+def mark_yearly_cache_stale(years: List[int] | None = None, areas: List[str] | None = None) -> int:
+    """
+    导入数据后把年度缓存标记为过期（updated_at 置为最早时间），
+    之后的请求先拿到旧数据，再由后台重新计算；
+    后台刷新年度缓存后会一并重新汇总包含该年的多年度汇总，见 refresh_yearly_area_cache_in_background
+    :return: 标记的行数
+    """
+    qs = SchoolYearlyCache.objects.all()
+    if years:
+        qs = qs.filter(year__in=[str(y) for y in years])
+    if areas:
+        qs = qs.filter(area__in=areas)
+    # update() 不会触发 auto_now
+    return qs.update(updated_at=datetime(1970, 1, 1, tzinfo=dt_timezone.utc))
+
+
+# ---------- 5. 多年度汇总 ---------- #
+# 合并统计记录见 aggregate.StatsAggregate：计数相加，比率按合并后的队伍数重新计算
+
+
+def _build_range_stats(
+    data_by_year: Dict[int, Dict[str, Dict[str, Any]]],
+    participant_counts: Dict[str, int] | None = None
+) -> List[Tuple[str, dict]]:
+    """
+    把多年的学校统计汇总成一份：计数求和，比率按队伍数加权，
+    并按参赛队伍总数排名（并列同名次）
+    :param data_by_year: {year: {school: {...}}}
+    :param participant_counts: 按人去重时的多年参赛人数 {school: count}，见 range_participant_counts；
+                               为 None 时参赛人数和其他计数一样相加
+    :return: 按排名排好序的 [(school, {...}), …]
+    """
+    by_school = {}
+    for stats in data_by_year.values():
+        for school, data in stats.items():
+            by_school.setdefault(school, []).append(data)
+    totals = {school: StatsAggregate.merge_all(records).to_record() for school, records in by_school.items()}
+    if participant_counts is not None:
+        for school, rec in totals.items():
+            rec['participant_count'] = participant_counts.get(school, 0)
+
+    # 队伍数相同的按学校名排列，和读取 SchoolRangeCache 时的 order_by('rank', 'school') 一致
+    ranked = sorted(totals.items(), key=lambda kv: (-kv[1]['team_count'], kv[0]))
+    prev_team_count = None
+    rank = 0
+    for index, (school, rec) in enumerate(ranked, start=1):
+        if rec['team_count'] != prev_team_count:
+            rank = index
+            prev_team_count = rec['team_count']
+        rec['rank'] = rank
+    return ranked
+
+
+def _yearly_cache_rows(start_year: int, end_year: int, area: str):
+    return SchoolYearlyCache.objects.filter(
+        area=area, year__in=[str(y) for y in range(start_year, end_year + 1)]
+    )
+
+
+def _yearly_cache_versions(start_year: int, end_year: int, area: str):
+    """
+    区间内年度缓存的最后更新时间（单行单列的查询集，作为子查询使用）
+    """
+    return (_yearly_cache_rows(start_year, end_year, area)
+            .order_by()
+            .values('area')
+            .annotate(latest=Max('updated_at'))
+            .values('latest'))
+
+
+def _fetch_cached_range_stats(start_year: int, end_year: int, area: str) -> List[Tuple[str, dict]] | None:
+    """
+    读取预先汇总好的多年度统计，已按排名排序；未命中返回 None。
+    汇总之后区间内有年度缓存重新计算过（source_updated_at 更早）时同样视为未命中
+    """
+    fields = COUNT_FIELDS + ['rank']
+    rows = (SchoolRangeCache.objects
+            .filter(area=area, start_year=str(start_year), end_year=str(end_year),
+                    source_updated_at__gte=Subquery(_yearly_cache_versions(start_year, end_year, area)))
+            .order_by('rank', 'school')
+            .values_list('school', *fields)
+            .iterator(chunk_size=CACHE_READ_CHUNK_SIZE))
+
+    ranked = [(row[0], derive_rates(dict(zip(fields, row[1:])))) for row in rows]
+    return ranked or None
+
+
+def _flush_range_cache(
+    start_year: int,
+    end_year: int,
+    area: str,
+    ranked: List[Tuple[str, dict]],
+    source_updated_at: datetime | None,
+):
+    """
+    全量覆盖式写回多年度汇总：先删后插
+    :param source_updated_at: 汇总所用年度缓存的最后更新时间
+    """
+    now = timezone.now()
+    objs = [
+        SchoolRangeCache(
+            area=area,
+            start_year=str(start_year),
+            end_year=str(end_year),
+            school=school,
+            rank=data['rank'],
+            updated_at=now,
+            source_updated_at=source_updated_at,
+            **{field: data.get(field, 0) for field in COUNT_FIELDS}
+        )
+        for school, data in ranked
+    ]
+
+    with transaction.atomic():
+        SchoolRangeCache.objects.filter(
+            area=area, start_year=str(start_year), end_year=str(end_year)
+        ).delete()
+        SchoolRangeCache.objects.bulk_create(objs)
+
+
+# 趋势的滑动平均窗口（年）
+TREND_WINDOW = 3
+# SchoolTrendCache 中代表整个赛区合计的 school 值
+AREA_TOTAL_SCHOOL = ''
+
+
+def _growth(current: float, previous: float | None) -> float | None:
+    """同比增长率，上一年没有数据或为 0 时无法计算"""
+    if not previous:
+        return None
+    return (current - previous) / previous
+
+
+def _build_trend_stats(data_by_year: Dict[int, Dict[str, Dict[str, Any]]]) -> Dict[str, List[dict]]:
+    """
+    从各年的学校统计一次遍历算出逐年趋势：队伍数/参赛人数同比增长、队伍数滑动平均、
+    当年排名及排名变化、获奖率及其同比变化。只用已有的年度数据，不查源数据表。
+    :param data_by_year: {year: {school: {...}}}
+    :return: {school: [{'year': y, ...}, …]}，按年份排序，区间内每年一条；
+             键 AREA_TOTAL_SCHOOL 为整个赛区的合计（排名相关字段为 None）
+    """
+    years = sorted(data_by_year)
+    schools = {school for stats in data_by_year.values() for school in stats}
+
+    # 每年按队伍数排名（并列同名次），没参赛的学校当年没有排名
+    ranks_by_year = {}
+    for year in years:
+        ranked = sorted(data_by_year[year].items(), key=lambda kv: kv[1].get('team_count') or 0, reverse=True)
+        ranks, prev_team_count, rank = {}, None, 0
+        for index, (school, data) in enumerate(ranked, start=1):
+            if data.get('team_count') != prev_team_count:
+                rank = index
+                prev_team_count = data.get('team_count')
+            ranks[school] = rank
+        ranks_by_year[year] = ranks
+
+    def series(rows_by_year: Dict[int, dict], ranks: Dict[int, int | None]) -> List[dict]:
+        result, window, prev = [], [], None
+        for year in years:
+            data = rows_by_year.get(year) or {}
+            team_count = data.get('team_count') or 0
+            participant_count = data.get('participant_count') or 0
+            award_rate = (data.get('award_count') or 0) / team_count if team_count else 0.0
+            window = (window + [team_count])[-TREND_WINDOW:]
+            rank = ranks.get(year)
+            result.append({
+                'year': year,
+                'team_count': team_count,
+                'team_count_growth': _growth(team_count, prev and prev['team_count']),
+                'team_count_avg': sum(window) / len(window),
+                'participant_count': participant_count,
+                'participant_count_growth': _growth(participant_count, prev and prev['participant_count']),
+                'rank': rank,
+                'rank_change': prev['rank'] - rank if prev and prev['rank'] and rank else None,
+                'award_rate': award_rate,
+                'award_rate_change': (
+                    award_rate - prev['award_rate'] if prev and prev['team_count'] and team_count else None
+                ),
+            })
+            prev = result[-1]
+        return result
+
+    trends = {
+        school: series(
+            {year: data_by_year[year].get(school) for year in years},
+            {year: ranks_by_year[year].get(school) for year in years},
+        )
+        for school in schools
+    }
+    area_totals = {
+        year: {
+            field: sum(data.get(field) or 0 for data in data_by_year[year].values())
+            for field in ('team_count', 'participant_count', 'award_count')
+        }
+        for year in years
+    }
+    trends[AREA_TOTAL_SCHOOL] = series(area_totals, {})
+    return trends
+
+
+def _fetch_cached_trend_stats(start_year: int, end_year: int, area: str) -> Dict[str, List[dict]] | None:
+    """
+    读取与多年度汇总一起生成的逐年趋势；未命中返回 None
+    """
+    rows = (SchoolTrendCache.objects
+            .filter(area=area, start_year=str(start_year), end_year=str(end_year))
+            .order_by('school', 'year')
+            .values_list('school', 'year', *TREND_FIELDS)
+            .iterator(chunk_size=CACHE_READ_CHUNK_SIZE))
+
+    trends = {}
+    for row in rows:
+        trends.setdefault(row[0], []).append({'year': int(row[1]), **dict(zip(TREND_FIELDS, row[2:]))})
+    return trends or None
+
+
+def _flush_trend_cache(start_year: int, end_year: int, area: str, trends: Dict[str, List[dict]]):
+    """
+    全量覆盖式写回逐年趋势：先删后插
+    """
+    now = timezone.now()
+    objs = [
+        SchoolTrendCache(
+            area=area,
+            start_year=str(start_year),
+            end_year=str(end_year),
+            school=school,
+            year=str(rec['year']),
+            updated_at=now,
+            **{field: rec[field] for field in TREND_FIELDS}
+        )
+        for school, records in trends.items()
+        for rec in records
+    ]
+
+    with transaction.atomic():
+        SchoolTrendCache.objects.filter(
+            area=area, start_year=str(start_year), end_year=str(end_year)
+        ).delete()
+        SchoolTrendCache.objects.bulk_create(objs, batch_size=CACHE_READ_CHUNK_SIZE)
+
+
+def refresh_range_area_cache(start_year: int, end_year: int, area: str) -> List[Tuple[str, dict]]:
+    """
+    基于年度缓存重新汇总指定年份区间、赛区的数据并写回，供预热流程和后台刷新调用；
+    逐年趋势用同一份年度数据算出，一并写回。
+    直接读年度缓存行，不经过 get_yearly_area_stats：区间内其他过期年份不会因此排队刷新
+    （它们各自的刷新完成后会再汇总一次）；缓存里没有的年份先同步算出并写入年度缓存
+    :param start_year: 起始年份
+    :param end_year: 结束年份
+    :param area: 赛区名称
+    """
+    cached_years = set(_yearly_cache_rows(start_year, end_year, area)
+                       .order_by().values_list('year', flat=True).distinct())
+    for temp_year in range(start_year, end_year + 1):
+        if str(temp_year) not in cached_years:
+            refresh_yearly_area_cache(temp_year, area)
+    # 先取版本再读数据：读取期间有年度缓存刷新时，记下的版本偏旧，汇总下次读取时按过期处理
+    source_updated_at = _yearly_cache_rows(start_year, end_year, area).aggregate(latest=Max('updated_at'))['latest']
+    cached, _ = _fetch_cached_range_stats_with_age(start_year, end_year, area)
+    # 没有任何学校的年份（该年没有数据）不会写入缓存行
+    data_by_year = {temp_year: cached.get(temp_year, {}) for temp_year in range(start_year, end_year + 1)}
+    ranked = _build_range_stats(data_by_year, range_participant_counts(list(data_by_year), area))
+    _flush_range_cache(start_year, end_year, area, ranked, source_updated_at)
+    _flush_trend_cache(start_year, end_year, area, _build_trend_stats(data_by_year))
+    return ranked
+
+
+def refresh_dependent_range_caches(year: int, area: str) -> List[Tuple[int, int]]:
+    """
+    重新汇总指定赛区已有的、包含该年份的多年度汇总（及逐年趋势）
+    :return: 重新汇总的 [(start_year, end_year), …]
+    """
+    ranges = sorted({
+        (int(start), int(end))
+        for start, end in (SchoolRangeCache.objects
+                           .filter(area=area, start_year__lte=str(year), end_year__gte=str(year))
+                           .values_list('start_year', 'end_year')
+                           .distinct())
+    })
+    for start_year, end_year in ranges:
+        refresh_range_area_cache(start_year, end_year, area)
+    return ranges
+
+
+def format_years(years: List[int]) -> str:
+    """
+    年份的显示名称：连续年份写成 2019–2023，不连续的逐个列出 2019、2021、2023
+    """
+    years = sorted(years)
+    if len(years) > 1 and years == list(range(years[0], years[-1] + 1)):
+        return f"{years[0]}–{years[-1]}"
+    return '、'.join(str(year) for year in years)
+
+
+def _assemble_multi_year_stats(
+    years: List[int],
+    data_by_year: Dict[int, Dict[str, Dict[str, Any]]],
+    ranked: List[Tuple[str, dict]],
+    trends: Dict[str, List[dict]]
+) -> dict:
+    """
+    把各年数据、汇总排名和趋势整理成多年度图表使用的结构，见 get_multi_year_stats_data
+    """
+    range_stats = dict(ranked)
+    schools = [school for school, _ in ranked]
+    schools_by_first_prize = sorted(
+        schools, key=lambda s: range_stats[s]['first_prize_count'], reverse=True
+    )
+    return {
+        'years': years,
+        'label': format_years(years),
+        'data_by_year': data_by_year,
+        'range_stats': range_stats,
+        'schools_by_team_count': schools,
+        'total_team_count': {s: range_stats[s]['team_count'] for s in schools},
+        'schools_by_first_prize': schools_by_first_prize,
+        'total_first_prize': {s: range_stats[s]['first_prize_count'] for s in schools},
+        'avg_first_prize_rate': {
+            s: round(range_stats[s]['first_prize_rate'] * 100, 2) for s in schools
+        },
+        'trends': {s: trends[s] for s in schools if s in trends},
+        'area_trend': trends.get(AREA_TOTAL_SCHOOL, []),
+    }
+
+
+@memoize_per_request
+def get_multi_year_stats_data(
+    start_year: int,
+    end_year: int,
+    area: str,
+    use_cache: bool = True
+) -> dict:
+    """
+    获取多年度统计数据，用于多年度图表。
+    学校顺序、合计和平均比率直接取自预先汇总的 SchoolRangeCache，
+    未预热或汇总之后年度缓存重新计算过时，在内存中按年汇总。
+    :param start_year: 起始年份
+    :param end_year: 结束年份
+    :param area: 赛区名称
+    :param use_cache: 是否使用缓存
+    :return: {
+        'years': [...],
+        'label': 年份的显示名称，见 format_years,
+        'data_by_year': {year: {school: {...}}},
+        'range_stats': {school: {...}},
+        'schools_by_team_count': [...],
+        'total_team_count': {school: int},
+        'schools_by_first_prize': [...],
+        'total_first_prize': {school: int},
+        'avg_first_prize_rate': {school: float(百分数)},
+        'trends': {school: [{'year': y, ...}, …]}，见 _build_trend_stats,
+        'area_trend': [{'year': y, ...}, …]，整个赛区的合计趋势,
+      }
+    """
+    years = list(range(start_year, end_year + 1))
+    data_by_year = {
+        temp_year: get_yearly_area_stats(temp_year, area, use_cache=use_cache)
+        for temp_year in years
+    }
+
+    ranked = _fetch_cached_range_stats(start_year, end_year, area) if use_cache else None
+    # 逐年趋势与汇总一起写入，汇总未命中或已过期时趋势也不可用
+    trends = _fetch_cached_trend_stats(start_year, end_year, area) if ranked is not None else None
+    if ranked is None:
+        ranked = _build_range_stats(data_by_year, range_participant_counts(years, area))
+    if trends is None:
+        trends = _build_trend_stats(data_by_year)
+    return _assemble_multi_year_stats(years, data_by_year, ranked, trends)
+
+
+@memoize_per_request
+def get_year_set_stats_data(years: List[int], area: str, use_cache: bool = True) -> dict:
+    """
+    任意年份组合（如 2019、2021、2023）的多年度统计数据，结构同 get_multi_year_stats_data。
+    只读取各年的年度缓存，在内存中合并：计数相加，比率按合并后的队伍数重新计算；
+    趋势的同比、排名变化按相邻的所选年份计算。不读取也不写入 SchoolRangeCache，
+    新的对比组合不需要预热，也不会查询源数据表（年度缓存已预热时；按人去重时多年参赛人数另需回源一次）
+    :param years: 年份列表，顺序和重复不影响结果
+    :param area: 赛区名称
+    :param use_cache: 是否使用年度缓存
+    """
+    years = sorted(set(years))
+    data_by_year = {
+        temp_year: get_yearly_area_stats(temp_year, area, use_cache=use_cache)
+        for temp_year in years
+    }
+    ranked = _build_range_stats(data_by_year, range_participant_counts(years, area))
+    return _assemble_multi_year_stats(years, data_by_year, ranked, _build_trend_stats(data_by_year))
+
+# ---------- 6. 排行榜 ---------- #
+@memoize_per_request
+def get_leaderboard(
+    metric: str = 'team_count',
+    limit: int = 20,
+    years: List[int] | None = None,
+    areas: List[str] | None = None,
+) -> Dict[Tuple[int, str], dict]:
+    """
+    在数据库里按 (年份, 赛区) 分区，用 RANK() OVER (PARTITION BY ...) 取每个分区 metric 前 limit 名的学校，
+    名次并列的学校一并返回；排在后面的学校合并为"其他"一项，只返回其学校数和合计。
+    数据取自 SchoolYearlyCache，需要先预热缓存。
+    :param metric: 排序用的统计字段，必须是 STAT_FIELDS 之一
+    :param limit: 每个分区保留的名次
+    :param years: 只看这些年份，默认全部
+    :param areas: 只看这些赛区，默认全部
+    :return: {
+        (year, area): {
+          'rows': [{'school': …, 'rank': …, metric: …}, …],
+          'others': {'school_count': …, metric: …},   # 比率字段不求和，值为 None
+        }, …
+      }
+    """
+    if metric not in STAT_FIELDS:
+        raise ValueError(f"未知的统计字段：{metric}")
+
+    partition = [F('year'), F('area')]
+    is_rate = metric in RATE_COUNT_FIELDS
+    qs = SchoolYearlyCache.objects.all()
+    if is_rate:
+        # 比率不入库，按计数现算
+        qs = qs.annotate(**{metric: rate_expression(metric)})
+    if years is not None:
+        qs = qs.filter(year__in=[str(y) for y in years])
+    if areas is not None:
+        qs = qs.filter(area__in=areas)
+
+    rows = (qs
+            .annotate(
+                rank=Window(Rank(), partition_by=partition, order_by=F(metric).desc()),
+                metric_total=Window(Sum(metric), partition_by=partition),
+                school_total=Window(Count('id'), partition_by=partition),
+            )
+            .filter(rank__lte=limit)
+            .order_by('year', 'area', 'rank', 'school')
+            .values_list('year', 'area', 'school', 'rank', metric, 'metric_total', 'school_total'))
+
+    boards = {}
+    for year, area, school, rank, value, metric_total, school_total in rows:
+        board = boards.setdefault((int(year), area), {
+            'rows': [],
+            'others': {'school_count': school_total, metric: None if is_rate else metric_total},
+        })
+        board['rows'].append({'school': school, 'rank': rank, metric: value})
+        board['others']['school_count'] -= 1
+        if not is_rate:
+            board['others'][metric] -= value
+    return boards
+
+
+@memoize_per_request
+def get_top_schools(year: int, area: str, metric: str = 'team_count', limit: int = 20) -> dict:
+    """
+    获取指定年份、赛区 metric 前 limit 名的学校（含并列）及"其他"合计，结构同 get_leaderboard 的单个分区。
+    缓存为空时 rows 为空列表。
+    """
+    boards = get_leaderboard(metric, limit, years=[year], areas=[area])
+    empty_others = {'school_count': 0, metric: None if metric in RATE_COUNT_FIELDS else 0}
+    return boards.get((year, area), {'rows': [], 'others': empty_others})
+
+
+# ---------- 7. 图表数据准备 ---------- #
 #
 # def get_school_stats_data(year: int, area: str, use_cache: bool = True) -> Dict:
 #     """
@@ -0,0 +1,184 @@
+# demo/services/synthetic.py
+"""
+合成数据：在本地 SQLite / MySQL 里造出 team / team_member / team_achievement，作为压测和性能对比用的替身库。
+
+  - 可复现：同一个 seed 生成的数据完全一致，不同机器、不同缓存配置的压测结果可以直接对比
+  - 分布：学校规模按 Zipf 分布（少数学校队伍很多），大多数队伍来自本赛区的学校；
+    奖项、决赛、企业命题和单项奖的比例接近真实数据，奖项写法包含 '一等奖(晋级)'、'重复参赛'、空串等变体
+  - 成员表带少量 is_current=0 的旧版本行，统计时应被过滤掉
+  - 所有行的代码都以 SYNTHETIC_PREFIX 开头，clear_synthetic 只删除这些行，不会碰真实数据
+"""
+import random
+import time
+from typing import Iterable, List
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from demo.models import Team, TeamAchievement, TeamMember
+from demo.routers import SOURCE_DB_ALIAS
+
+SYNTHETIC_PREFIX = 'SYN'
+BATCH_SIZE = 2000
+
+DEFAULT_AREAS = ['东北赛区', '上海赛区', '西南赛区', '华东赛区', '西北赛区', '华中赛区', '华北赛区', '华南赛区']
+
+_SCHOOL_PREFIXES = [
+    '北京', '上海', '华东', '华南', '华中', '西北', '西南', '东北', '南京', '浙江',
+    '武汉', '四川', '重庆', '山东', '湖南', '广东', '福建', '河北', '江苏', '安徽',
+]
+_SCHOOL_SUFFIXES = ['大学', '理工大学', '师范大学', '工业大学', '科技大学', '交通大学', '财经大学', '农业大学']
+
+# (初赛奖项, 权重)：None 表示没有奖项
+_PRELIMINARY_AWARDS = [
+    ('一等奖', 8), ('一等奖(晋级)', 4), ('二等奖', 15), ('三等奖', 25),
+    ('晋级', 3), ('重复参赛', 1), ('', 4), (None, 40),
+]
+_FINAL_AWARDS = [('一等奖', 2), ('二等奖', 3), ('三等奖', 5)]
+_ENTERPRISE_PROPOSITIONS = [f"企业命题{i}" for i in range(1, 9)]
+_TOPICS = ['人工智能', '大数据', '物联网', '云计算', '网络安全']
+
+
+def source_alias() -> str:
+    """源数据表所在的数据库别名，未配置只读副本时为 default"""
+    return SOURCE_DB_ALIAS if SOURCE_DB_ALIAS in settings.DATABASES else 'default'
+
+
+def ensure_source_tables(using: str) -> List[str]:
+    """
+    源数据表是 managed=False，迁移不会建表；替身库里缺的表在这里创建
+    :return: 新建的表名
+    """
+    connection = connections[using]
+    existing = set(connection.introspection.table_names())
+    created = []
+    with connection.schema_editor() as editor:
+        for model in (Team, TeamMember, TeamAchievement):
+            if model._meta.db_table not in existing:
+                editor.create_model(model)
+                created.append(model._meta.db_table)
+    return created
+
+
+def clear_synthetic(using: str) -> int:
+    """
+    删除之前生成的合成数据
+    :return: 删除的队伍数
+    """
+    with transaction.atomic(using=using):
+        TeamAchievement.objects.using(using).filter(team_code__team_code__startswith=SYNTHETIC_PREFIX).delete()
+        TeamMember.objects.using(using).filter(member_code__startswith=SYNTHETIC_PREFIX).delete()
+        deleted, _ = Team.objects.using(using).filter(team_code__startswith=SYNTHETIC_PREFIX).delete()
+    return deleted
+
+
+def school_names(count: int) -> List[str]:
+    """count 个不重复的学校名，超过组合数时加序号"""
+    names = [prefix + suffix for suffix in _SCHOOL_SUFFIXES for prefix in _SCHOOL_PREFIXES]
+    names += [f"{names[i % len(names)]}{i // len(names) + 1}分校" for i in range(max(0, count - len(names)))]
+    return names[:count]
+
+
+def _weighted(rng: random.Random, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+def _team_rows(rng: random.Random, code: str, year: int, area: str, school: str, schools: List[str]):
+    """一支队伍的 (Team, TeamAchievement, [TeamMember, …])"""
+    team = Team(
+        team_code=code, team_name=f"队伍{code}", competition_zone=area, create_year=str(year), is_current=1,
+    )
+    enterprise = rng.random() < 0.3
+    if enterprise:
+        team.enterprise_proposition = rng.choice(_ENTERPRISE_PROPOSITIONS)
+    else:
+        team.competition_topic = rng.choice(_TOPICS)
+
+    preliminary = _weighted(rng, _PRELIMINARY_AWARDS)
+    qualified = preliminary is not None and '晋级' in preliminary
+    achievement = TeamAchievement(
+        team_code=team, year=str(year), preliminary_award=preliminary,
+        final_technology=_weighted(rng, _FINAL_AWARDS) if qualified and rng.random() < 0.8 else None,
+        enterprise_award=rng.choice(['一等奖', '二等奖', '三等奖']) if enterprise and rng.random() < 0.3 else None,
+        enterprise_advancement=int(enterprise and rng.random() < 0.1),
+        best_paper=int(rng.random() < 0.01),
+        best_investment_pitch=int(rng.random() < 0.01),
+    )
+
+    members = []
+    for order in range(1, rng.randint(1, 5) + 1):
+        member_code = f"{code}M{order}"
+        # 大约一成的队员来自其他学校
+        member_school = school if order == 1 or rng.random() < 0.9 else rng.choice(schools)
+        fields = dict(
+            team_code=code, member_name=f"成员{member_code}", school=member_school,
+            member_type='队长' if order == 1 else '队员', team_order=order,
+            student_id=member_code, create_year=str(year),
+        )
+        members.append(TeamMember(member_code=member_code, is_current=1, **fields))
+        if rng.random() < 0.03:
+            # 改过信息的成员留下的旧版本行
+            members.append(TeamMember(member_code=member_code + 'V0', is_current=0, **fields))
+    return team, achievement, members
+
+
+def generate(
+    years: Iterable[int],
+    areas: Iterable[str] = DEFAULT_AREAS,
+    teams_per_area: int = 200,
+    school_count: int = 300,
+    seed: int = 1,
+    using: str | None = None,
+) -> dict:
+    """
+    生成合成数据并批量写入
+    :param years: 年份
+    :param areas: 赛区
+    :param teams_per_area: 每年每个赛区的平均队伍数，各赛区按 ±50% 浮动
+    :param school_count: 学校数
+    :param seed: 随机种子
+    :param using: 数据库别名，默认为源数据表所在的库
+    :return: {teams, members, schools, seconds}
+    """
+    using = using or source_alias()
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    areas = list(areas)
+    schools = school_names(school_count)
+    # 每所学校有一个主赛区，学校规模按 Zipf 分布
+    home = {school: areas[i % len(areas)] for i, school in enumerate(schools)}
+    weights = {school: 1 / (rank + 1) for rank, school in enumerate(rng.sample(schools, len(schools)))}
+    by_area = {area: [school for school in schools if home[school] == area] or schools for area in areas}
+    area_size = {area: rng.uniform(0.5, 1.5) for area in areas}
+
+    teams: List[Team] = []
+    achievements: List[TeamAchievement] = []
+    members: List[TeamMember] = []
+    for year in years:
+        for area in areas:
+            local = by_area[area]
+            local_weights = [weights[school] for school in local]
+            for i in range(max(1, round(teams_per_area * area_size[area]))):
+                # 大约一成半的队伍来自外赛区的学校
+                if rng.random() < 0.85:
+                    school = rng.choices(local, local_weights)[0]
+                else:
+                    school = rng.choice(schools)
+                code = f"{SYNTHETIC_PREFIX}{year}{areas.index(area):02d}{i:05d}"
+                team, achievement, team_members = _team_rows(rng, code, year, area, school, schools)
+                teams.append(team)
+                achievements.append(achievement)
+                members.extend(team_members)
+
+    with transaction.atomic(using=using):
+        for model, rows in ((Team, teams), (TeamAchievement, achievements), (TeamMember, members)):
+            model.objects.using(using).bulk_create(rows, batch_size=BATCH_SIZE)
+
+    return {
+        'teams': len(teams),
+        'members': len(members),
+        'schools': len({member.school for member in members}),
+        'seconds': time.perf_counter() - started,
+    }
+
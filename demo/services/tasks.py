@@ -0,0 +1,75 @@
+# demo/services/tasks.py
+"""
+进程内后台任务：缓存过期时把重新计算放到线程池里执行，请求线程直接返回旧缓存。
+同一个 key（如 ('yearly', 2023, '上海赛区')）在排队或执行中时不会重复提交。
+"""
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, Hashable
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_executor: ThreadPoolExecutor | None = None
+# key → 排队或执行中的任务
+_pending: dict[Hashable, Future] = {}
+_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'STATS_REFRESH_WORKERS', 2),
+            thread_name_prefix='stats-refresh',
+        )
+    return _executor
+
+
+def _run(key: Hashable, func: Callable, args: tuple, kwargs: dict):
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        logger.exception("后台任务 %s 执行失败", key)
+        raise
+    finally:
+        # 工作线程里的数据库连接不会被请求结束信号回收，任务结束后主动关闭
+        connections.close_all()
+        with _lock:
+            _pending.pop(key, None)
+
+
+def enqueue(key: Hashable, func: Callable, *args, **kwargs) -> Future:
+    """
+    提交后台任务；同一个 key 已在排队或执行中时直接返回已有的 Future
+    :param key: 去重用的任务标识
+    :param func: 要执行的函数
+    """
+    with _lock:
+        future = _pending.get(key)
+        if future is None:
+            future = _get_executor().submit(_run, key, func, args, kwargs)
+            _pending[key] = future
+        return future
+
+
+def pending_keys() -> list:
+    """
+    当前排队或执行中的任务标识
+    """
+    with _lock:
+        return list(_pending)
+
+
+def wait_for_pending(timeout: float | None = None) -> bool:
+    """
+    等待当前所有后台任务结束，供管理命令和测试使用
+    :return: 是否全部结束
+    """
+    with _lock:
+        futures = list(_pending.values())
+    _, not_done = wait(futures, timeout=timeout)
+    return not not_done
@@ -0,0 +1,318 @@
+# demo/services/warmup.py
+"""
+分片、可断点续跑的缓存预热：
+
+  - 工作项：年度缓存按 年份+赛区、多年度汇总按 区间+赛区 拆分，写入 CacheWarmupItem，同一 run_id 下不重复
+  - 认领：按 (id, 状态, 尝试次数) 做条件更新，更新到一行才算认领成功，多个进程、多台主机共用一个数据库即可协作；
+    不依赖 select_for_update，SQLite 上同样适用
+  - 分片：--shard i/n 按工作项的 crc32 取模，只认领属于自己分片的工作项，不同主机可以各跑一个分片
+  - 依赖：多年度汇总读取年度缓存，区间内同赛区的年度工作项全部结束后才会被认领；
+    依赖的年度工作项属于其他分片、且还没人认领或租期已过（那台主机没启动或已崩溃）时，本分片直接认领它；
+    连续等待超过 max_wait 秒仍没有可做的工作项时放弃，由调用方以非零状态退出
+  - 断点续跑：已完成的工作项跳过；失败的工作项在 MAX_ATTEMPTS 次以内重试；
+    认领后超过租期仍未完成（进程崩溃）的工作项可被重新认领
+"""
+import os
+import socket
+import time
+import zlib
+from datetime import timedelta
+from typing import Callable, Iterable, List, Tuple
+
+from django.db import connections
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.utils import timezone
+
+from demo.models import CacheWarmupItem
+from demo.services.statistics import refresh_range_area_cache, refresh_yearly_area_cache
+
+# 失败的工作项最多尝试的次数
+MAX_ATTEMPTS = 3
+# 认领后超过这么多秒未完成，视为工作进程已崩溃
+DEFAULT_LEASE_SECONDS = 1800
+# 等待其他进程完成依赖的年度工作项时的轮询间隔
+POLL_SECONDS = 2.0
+# 连续等待依赖的上限（秒）：崩溃进程的工作项一个租期后即可重新认领，两个租期仍在等待说明批次卡住了
+DEFAULT_MAX_WAIT_SECONDS = 2 * DEFAULT_LEASE_SECONDS
+# claim_next 的返回值：本分片还有工作项在等待依赖，稍后再试
+WAIT = object()
+
+# (类型, 起始年份, 结束年份, 赛区)
+WorkUnit = Tuple[str, int, int, str]
+
+
+def plan_units(
+    years: Iterable[int],
+    areas: Iterable[str],
+    ranges: Iterable[Tuple[int, int]]
+) -> List[WorkUnit]:
+    """
+    列出一次预热的全部工作项，年度工作项在前
+    """
+    areas = list(areas)
+    units = [(CacheWarmupItem.YEARLY, year, year, area) for year in years for area in areas]
+    units += [(CacheWarmupItem.RANGE, start_year, end_year, area)
+              for start_year, end_year in ranges for area in areas]
+    return units
+
+
+def shard_of(kind: str, start_year, end_year, area: str, shards: int) -> int:
+    """
+    工作项所属的分片，和进程、主机无关，各主机对同一工作项算出的结果一致
+    """
+    return zlib.crc32(f"{kind}:{start_year}:{end_year}:{area}".encode('utf-8')) % shards
+
+
+def default_worker_name() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def new_run_id() -> str:
+    return timezone.now().strftime('%Y%m%d-%H%M%S')
+
+
+def prepare_run(run_id: str, units: List[WorkUnit]) -> int:
+    """
+    写入工作项；已存在的（其他进程先写入、或断点续跑）保持原状态
+    :return: 该批次的工作项总数
+    """
+    CacheWarmupItem.objects.bulk_create(
+        [
+            CacheWarmupItem(run_id=run_id, kind=kind, start_year=str(start_year),
+                            end_year=str(end_year), area=area)
+            for kind, start_year, end_year, area in units
+        ],
+        ignore_conflicts=True,
+    )
+    return CacheWarmupItem.objects.filter(run_id=run_id).count()
+
+
+def _claimable(run_id: str, lease_seconds: int):
+    expired = timezone.now() - timedelta(seconds=lease_seconds)
+    return CacheWarmupItem.objects.filter(run_id=run_id).filter(
+        Q(status=CacheWarmupItem.PENDING)
+        | Q(status=CacheWarmupItem.FAILED, attempts__lt=MAX_ATTEMPTS)
+        | Q(status=CacheWarmupItem.CLAIMED, claimed_at__lt=expired)
+    )
+
+
+def _unfinished_yearly(run_id: str) -> set:
+    """
+    还没结束的年度工作项 {(年份, 赛区)}；失败且不再重试的算作已结束
+    """
+    rows = CacheWarmupItem.objects.filter(run_id=run_id, kind=CacheWarmupItem.YEARLY).exclude(
+        Q(status=CacheWarmupItem.DONE) | Q(status=CacheWarmupItem.FAILED, attempts__gte=MAX_ATTEMPTS)
+    ).values_list('start_year', 'area')
+    return set(rows)
+
+
+def _range_dependencies(run_id: str, shard: Tuple[int, int]) -> set:
+    """
+    本分片还没结束的多年度工作项所依赖的年度工作项 {(年份, 赛区)}
+    """
+    index, shards = shard
+    rows = CacheWarmupItem.objects.filter(run_id=run_id, kind=CacheWarmupItem.RANGE).exclude(
+        Q(status=CacheWarmupItem.DONE) | Q(status=CacheWarmupItem.FAILED, attempts__gte=MAX_ATTEMPTS)
+    ).values_list('start_year', 'end_year', 'area')
+    return {
+        (str(year), area)
+        for start_year, end_year, area in rows
+        if shard_of(CacheWarmupItem.RANGE, start_year, end_year, area, shards) == index
+        for year in range(int(start_year), int(end_year) + 1)
+    }
+
+
+def claim_next(
+    run_id: str,
+    worker: str,
+    shard: Tuple[int, int] | None = None,
+    lease_seconds: int = DEFAULT_LEASE_SECONDS
+) -> CacheWarmupItem | None | object:
+    """
+    认领下一个工作项：先认领本分片的，再认领本分片多年度工作项所依赖、属于其他分片的可认领年度工作项
+    :param shard: (分片序号, 分片总数)，序号从 0 开始；None 表示不分片
+    :return: 认领到的工作项；WAIT 表示还有工作项在等待依赖；None 表示本分片已无可做的工作项
+    """
+    candidates = list(_claimable(run_id, lease_seconds).order_by('-kind', 'start_year', 'end_year', 'area'))
+    if shard is not None:
+        index, shards = shard
+        own = [
+            item for item in candidates
+            if shard_of(item.kind, item.start_year, item.end_year, item.area, shards) == index
+        ]
+        if not own:
+            return None
+        needed = _range_dependencies(run_id, shard)
+        own_pks = {item.pk for item in own}
+        candidates = own + [
+            item for item in candidates
+            if item.pk not in own_pks and item.kind == CacheWarmupItem.YEARLY
+            and (item.start_year, item.area) in needed
+        ]
+    if not candidates:
+        return None
+
+    waiting = False
+    blocked = None
+    for item in candidates:
+        if item.kind == CacheWarmupItem.RANGE:
+            if blocked is None:
+                blocked = _unfinished_yearly(run_id)
+            years = range(int(item.start_year), int(item.end_year) + 1)
+            if any((str(year), item.area) in blocked for year in years):
+                waiting = True
+                continue
+        now = timezone.now()
+        claimed = CacheWarmupItem.objects.filter(
+            pk=item.pk, status=item.status, attempts=item.attempts
+        ).update(status=CacheWarmupItem.CLAIMED, worker=worker, claimed_at=now, attempts=F('attempts') + 1)
+        if claimed:
+            item.status, item.worker, item.claimed_at = CacheWarmupItem.CLAIMED, worker, now
+            item.attempts += 1
+            return item
+        # 被其他进程抢先认领，接着看下一个
+    return WAIT if waiting else None
+
+
+def process_item(item: CacheWarmupItem) -> int:
+    """
+    执行一个工作项
+    :return: 写入的学校数
+    """
+    if item.kind == CacheWarmupItem.YEARLY:
+        return len(refresh_yearly_area_cache(int(item.start_year), item.area))
+    return len(refresh_range_area_cache(int(item.start_year), int(item.end_year), item.area))
+
+
+def run_worker(
+    run_id: str,
+    worker: str | None = None,
+    shard: Tuple[int, int] | None = None,
+    lease_seconds: int = DEFAULT_LEASE_SECONDS,
+    poll_seconds: float = POLL_SECONDS,
+    on_item: Callable[[CacheWarmupItem, Exception | None], None] | None = None,
+    max_wait: float | None = DEFAULT_MAX_WAIT_SECONDS,
+) -> dict:
+    """
+    反复认领并执行工作项，直到本分片没有可做的工作项，或连续等待依赖超过 max_wait 秒
+    :param on_item: 每个工作项结束后的回调 (工作项, 异常或 None)
+    :param max_wait: 连续等待依赖的上限（秒），None 表示一直等
+    :return: 本进程的统计 {worker, done, failed, schools, seconds, timed_out}
+    """
+    worker = worker or default_worker_name()
+    summary = {'worker': worker, 'done': 0, 'failed': 0, 'schools': 0, 'timed_out': False}
+    started = time.perf_counter()
+    waiting_since = None
+    while True:
+        item = claim_next(run_id, worker, shard, lease_seconds)
+        if item is None:
+            break
+        if item is WAIT:
+            now = time.perf_counter()
+            if waiting_since is None:
+                waiting_since = now
+            elif max_wait is not None and now - waiting_since >= max_wait:
+                summary['timed_out'] = True
+                break
+            time.sleep(poll_seconds)
+            continue
+        waiting_since = None
+
+        item_started = time.perf_counter()
+        error = None
+        try:
+            item.school_count = process_item(item)
+            item.status, item.error = CacheWarmupItem.DONE, ''
+            summary['done'] += 1
+            summary['schools'] += item.school_count
+        except Exception as e:
+            error = e
+            item.status, item.error = CacheWarmupItem.FAILED, f"{type(e).__name__}: {e}"
+            summary['failed'] += 1
+        item.elapsed = time.perf_counter() - item_started
+        item.finished_at = timezone.now()
+        # 租期过后工作项可能已被别的进程重新认领，只更新自己仍持有的
+        CacheWarmupItem.objects.filter(pk=item.pk, worker=worker, attempts=item.attempts).update(
+            status=item.status, error=item.error, elapsed=item.elapsed,
+            school_count=item.school_count, finished_at=item.finished_at,
+        )
+        if on_item:
+            on_item(item, error)
+
+    summary['seconds'] = time.perf_counter() - started
+    return summary
+
+
+def _init_worker():
+    """工作进程初始化：spawn 方式启动时需要重新加载 Django"""
+    import django
+    django.setup()
+
+
+def _run_local_worker(run_id: str, shard, lease_seconds: int, poll_seconds: float, max_wait: float | None) -> dict:
+    try:
+        return run_worker(run_id, shard=shard, lease_seconds=lease_seconds, poll_seconds=poll_seconds,
+                          max_wait=max_wait)
+    finally:
+        connections.close_all()
+
+
+def run_workers(
+    run_id: str,
+    workers: int = 1,
+    shard: Tuple[int, int] | None = None,
+    lease_seconds: int = DEFAULT_LEASE_SECONDS,
+    poll_seconds: float = POLL_SECONDS,
+    on_item: Callable[[CacheWarmupItem, Exception | None], None] | None = None,
+    max_wait: float | None = DEFAULT_MAX_WAIT_SECONDS,
+) -> List[dict]:
+    """
+    在本机启动 workers 个进程共同处理一个批次（同一分片）
+    :param on_item: 只在 workers 为 1 时调用，多进程时各工作项的结果见 run_summary
+    :param max_wait: 见 run_worker
+    :return: 每个进程的统计
+    """
+    if workers <= 1:
+        return [run_worker(run_id, shard=shard, lease_seconds=lease_seconds,
+                           poll_seconds=poll_seconds, on_item=on_item, max_wait=max_wait)]
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    # fork 出来的子进程不能和父进程共用数据库连接
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        futures = [
+            executor.submit(_run_local_worker, run_id, shard, lease_seconds, poll_seconds, max_wait)
+            for _ in range(workers)
+        ]
+        return [future.result() for future in futures]
+
+
+def run_summary(run_id: str) -> dict:
+    """
+    批次的整体进度和按工作进程的吞吐量，包括其他主机上的进程
+    :return: {'status': {状态: 工作项数}, 'workers': [{worker, done, failed, schools, busy, wall, rate}, …]}
+    """
+    items = CacheWarmupItem.objects.filter(run_id=run_id)
+    status = dict(items.order_by().values_list('status').annotate(n=Count('id')))
+    rows = items.exclude(worker='').order_by('worker').values('worker').annotate(
+        done=Count('id', filter=Q(status=CacheWarmupItem.DONE)),
+        failed=Count('id', filter=Q(status=CacheWarmupItem.FAILED)),
+        schools=Sum('school_count', filter=Q(status=CacheWarmupItem.DONE), default=0),
+        busy=Sum('elapsed', default=0.0),
+        first=Min('claimed_at'),
+        last=Max('finished_at'),
+    )
+    workers = []
+    for row in rows:
+        first, last = row.pop('first'), row.pop('last')
+        wall = (last - first).total_seconds() if first and last else 0.0
+        # 吞吐量按进程从第一次认领到最后一次完成的时间计算，含等待依赖的时间
+        row.update(wall=wall, rate=row['done'] / wall if wall > 0 else None)
+        workers.append(row)
+    return {'status': status, 'workers': workers}
+
+
+def pending_count(summary: dict) -> int:
+    """批次里还没完成的工作项数（含失败）"""
+    return sum(n for status, n in summary['status'].items() if status != CacheWarmupItem.DONE)
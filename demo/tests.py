@@ -1,3 +1,1389 @@
-from django.test import TestCase
+import compileall
+import gzip
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-# Create your tests here.
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Q
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from demo.models import (
+    AwardClass, CacheVersion, CacheWarmupItem, RATE_COUNT_FIELDS, SchoolRangeCache, SchoolSubprojectCache,
+    SchoolYearlyCache, STAT_FIELDS, Team, TeamMember, TeamAchievement,
+)
+from demo.services import (
+    awards, cache, invalidation, loadtest, memo, metadata, search, statistics, synthetic, tasks, warmup
+)
+from demo.services.backends import MemoryStatsBackend, OrmStatsBackend
+
+# 源数据表都是 managed=False，测试库里不会自动建表
+SOURCE_MODELS = (Team, TeamMember, TeamAchievement)
+
+# (team_code, 赛区, 年份, 初赛奖项, 决赛技术, 成员[(member_code, 学校, member_type, member_type_detail, team_order)])
+FIXTURE_TEAMS = [
+    ('T01', '上海赛区', '2023', '一等奖', '一等奖', [
+        ('M011', '复旦大学', '队长', None, 1), ('M012', '同济大学', '队员', None, 2),
+    ]),
+    ('T02', '上海赛区', '2023', '一等奖(晋级)', None, [
+        ('M021', '复旦大学', '队长', None, 1), ('M022', '复旦大学', '队员', None, 2),
+    ]),
+    ('T03', '上海赛区', '2023', '二等奖', '二等奖', [
+        # 只有 member_type_detail 标了队长
+        ('M031', '同济大学', '队员', '队长', 1), ('M032', '同济大学', '队员', '队员', 2),
+    ]),
+    ('T04', '上海赛区', '2023', None, None, [
+        ('M041', '同济大学', '队长', None, 1),
+    ]),
+    ('T05', '上海赛区', '2023', '', None, [
+        ('M051', '上海交通大学', '队长', None, 1), ('M052', '复旦大学', '队员', None, 2),
+    ]),
+    ('T06', '上海赛区', '2023', '重复参赛', None, [
+        ('M061', '上海交通大学', '队长', None, 1),
+    ]),
+    ('T07', '上海赛区', '2023', '晋级', None, [
+        # 两个队长，取 member_code 靠前的
+        ('M071', '上海交通大学', '队长', None, 1), ('M072', '华东师范大学', '队长', None, 2),
+    ]),
+    ('T08', '上海赛区', '2023', '三等奖', None, [
+        # 没有队长
+        ('M081', None, '队员', None, 1),
+    ]),
+    ('T09', '上海赛区', '2022', '三等奖', '一等奖', [
+        ('M091', '复旦大学', '队长', None, 1),
+    ]),
+    ('T10', '西北赛区', '2023', '一等奖', None, [
+        ('M101', '西北工业大学', '队长', None, 1),
+    ]),
+]
+
+
+class SourceTablesTestCase(TestCase):
+    """
+    在测试库里手动创建源数据表，并写入 FIXTURE_TEAMS
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        with connection.schema_editor() as editor:
+            for model in SOURCE_MODELS:
+                editor.create_model(model)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        with connection.schema_editor() as editor:
+            for model in reversed(SOURCE_MODELS):
+                editor.delete_model(model)
+
+    def setUp(self):
+        # 奖项分类表、年份赛区在进程内缓存，换了测试数据要重新读
+        awards.invalidate_award_taxonomy()
+        metadata.invalidate_competition_metadata()
+
+    @classmethod
+    def setUpTestData(cls):
+        for team_code, area, year, award, final_technology, members in FIXTURE_TEAMS:
+            team = Team.objects.create(team_code=team_code, competition_zone=area, create_year=year, is_current=1)
+            TeamAchievement.objects.create(
+                team_code=team, preliminary_award=award, final_technology=final_technology, year=year
+            )
+            for member_code, school, member_type, member_type_detail, team_order in members:
+                TeamMember.objects.create(
+                    member_code=member_code, team_code=team_code, school=school, member_type=member_type,
+                    member_type_detail=member_type_detail, team_order=team_order, create_year=year, is_current=1
+                )
+
+
+class StatsBackendTests(SourceTablesTestCase):
+    """
+    ORM 后端和内存后端对同一份数据的统计结果必须一致
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.orm = OrmStatsBackend()
+        self.memory = MemoryStatsBackend.from_database()
+
+    def test_captain_schools_match(self):
+        for year, area in [(2023, '上海赛区'), (2022, '上海赛区'), (2023, '西北赛区'), (2024, '上海赛区')]:
+            self.assertEqual(self.orm.captain_schools(year, area), self.memory.captain_schools(year, area))
+        self.assertEqual(self.orm.captain_schools(2023, '上海赛区')['T03'], '同济大学')
+        self.assertEqual(self.orm.captain_schools(2023, '上海赛区')['T07'], '上海交通大学')
+        self.assertNotIn('T08', self.orm.captain_schools(2023, '上海赛区'))
+
+    def test_school_stats_match(self):
+        orm_stats = self.orm.school_stats(2023, '上海赛区')
+        self.assertEqual(orm_stats, self.memory.school_stats(2023, '上海赛区'))
+        self.assertEqual(orm_stats['复旦大学']['first_prize_count'], 2)
+        self.assertEqual(orm_stats['复旦大学']['participant_count'], 4)
+        self.assertEqual(orm_stats['同济大学']['no_award_team_count'], 1)
+        self.assertEqual(orm_stats['上海交通大学']['award_count'], 1)
+
+    def test_range_stats_match(self):
+        self.assertEqual(
+            self.orm.range_stats(2022, 2023, '上海赛区'),
+            self.memory.range_stats(2022, 2023, '上海赛区')
+        )
+
+    def test_csv_export_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory, tempfile.TemporaryDirectory() as snapshots:
+            MemoryStatsBackend.export_database_to_csv(directory)
+            with mock.patch.object(cache, '_default_store', cache.SnapshotStore(snapshots)):
+                offline = MemoryStatsBackend.from_exports(directory)
+                # 导出文件没变时第二次加载直接读快照，不再解析 CSV
+                with mock.patch('demo.services.backends._parse_export') as parse:
+                    reloaded = MemoryStatsBackend.from_exports(directory)
+                parse.assert_not_called()
+                # 重新导出后水位变化，重新解析
+                with open(os.path.join(directory, 'team.csv'), 'a', encoding='utf-8') as f:
+                    f.write('T99,上海赛区,2023,,\n')
+                self.assertIn('T99', MemoryStatsBackend.from_exports(directory)._subproject_by_team)
+        self.assertEqual(offline.school_stats(2023, '上海赛区'), self.orm.school_stats(2023, '上海赛区'))
+        self.assertEqual(reloaded.school_stats(2023, '上海赛区'), self.orm.school_stats(2023, '上海赛区'))
+
+
+class AwardTaxonomyTests(SourceTablesTestCase):
+    """
+    奖项分类表与原先 SQL 中逐个列出的取值口径一致
+    """
+
+    def test_known_values(self):
+        taxonomy = awards.get_award_taxonomy()
+        self.assertEqual(
+            taxonomy._values_with(taxonomy.preliminary, awards.FIRST_PRIZE), ['一等奖', '一等奖(晋级)', '晋级']
+        )
+        self.assertEqual(
+            taxonomy._values_with(taxonomy.preliminary, awards.QUALIFIED), ['一等奖(晋级)', '晋级']
+        )
+        self.assertNotIn('', taxonomy._values_with(taxonomy.preliminary, awards.AWARDED))
+        self.assertNotIn('重复参赛', taxonomy._values_with(taxonomy.preliminary, awards.AWARDED))
+        self.assertEqual(awards.team_award_flags(None, None, '一等奖'), awards.NO_AWARD | awards.FINAL_FIRST_PRIZE)
+
+    def test_negative_values_are_not_awards(self):
+        # 子串匹配会把 '未晋级' 算成获奖、一等奖和晋级
+        for value in ('未晋级', '未获奖', '无'):
+            self.assertEqual(awards.classify_preliminary(value), 0)
+        self.assertEqual(awards.classify_final('未获一等奖'), 0)
+        for value in ('无', '-', '', None):
+            self.assertEqual(awards.classify_enterprise(value), 0)
+        self.assertEqual(awards.classify_enterprise('二等奖'), awards.ENTERPRISE_AWARD)
+
+        TeamAchievement.objects.filter(team_code='T04').update(preliminary_award='未晋级')
+        TeamAchievement.objects.filter(team_code='T03').update(enterprise_award='无')
+        awards.invalidate_award_taxonomy()
+        for backend in (OrmStatsBackend(), MemoryStatsBackend.from_database()):
+            stats = backend.school_stats(2023, '上海赛区')['同济大学']
+            self.assertEqual(
+                (stats['award_count'], stats['first_prize_count'], stats['qualification_count'],
+                 stats['no_award_team_count'], stats['enterprise_award_count']),
+                (1, 0, 0, 0, 0),
+                type(backend).__name__
+            )
+
+    def test_counts_match_published_sql(self):
+        # 改用分类表之前 SQL 里逐个列出的口径
+        legacy = {
+            'award_count': ~Q(preliminary_award__isnull=True) & ~Q(preliminary_award='') & ~Q(preliminary_award='重复参赛'),
+            'qualification_count': Q(preliminary_award='晋级') | Q(preliminary_award='一等奖(晋级)'),
+            'first_prize_count': (Q(preliminary_award='一等奖') | Q(preliminary_award='晋级')
+                                  | Q(preliminary_award='一等奖(晋级)')),
+            'second_prize_count': Q(preliminary_award='二等奖'),
+            'third_prize_count': Q(preliminary_award='三等奖'),
+            'no_award_team_count': Q(preliminary_award=None),
+            'final_first_prize_count': Q(final_technology='一等奖') | Q(final_business='一等奖'),
+        }
+        sums = TeamAchievement.objects.aggregate(**awards.get_award_taxonomy().bucket_sums())
+        rows = TeamAchievement.objects.values_list('preliminary_award', 'final_technology', 'final_business')
+        flags = [awards.team_award_flags(*row) for row in rows]
+        for field, q in legacy.items():
+            expected = TeamAchievement.objects.filter(q).count()
+            self.assertEqual(sums[field], expected, field)
+            self.assertEqual(sum(bool(f & awards.BUCKET_FIELDS[field]) for f in flags), expected, field)
+
+    def test_award_classes_synced(self):
+        # 分类表读取时写入 AwardClass，每个不同取值一行；分类规则改变后再次读取时更新
+        awards.get_award_taxonomy()
+        row = AwardClass.objects.get(value='一等奖')
+        self.assertEqual(
+            (row.preliminary_flags, row.final_flags),
+            (awards.AWARDED | awards.FIRST_PRIZE, awards.FINAL_FIRST_PRIZE)
+        )
+        self.assertEqual(AwardClass.objects.filter(value='一等奖').count(), 1)
+        AwardClass.objects.filter(value='一等奖').update(final_flags=0)
+        awards.invalidate_award_taxonomy()
+        awards.get_award_taxonomy()
+        self.assertEqual(AwardClass.objects.get(value='一等奖').final_flags, awards.FINAL_FIRST_PRIZE)
+
+    def test_bucket_without_values(self):
+        # 数据里没有任何决赛一等奖时 没有取值会置该位，也要能正常计数
+        TeamAchievement.objects.update(final_technology=None)
+        awards.invalidate_award_taxonomy()
+        stats = OrmStatsBackend().school_stats(2023, '西北赛区')
+        self.assertEqual(stats['西北工业大学']['final_first_prize_count'], 0)
+        self.assertEqual(stats['西北工业大学']['first_prize_count'], 1)
+
+
+class ParticipantCountTests(SourceTablesTestCase):
+    """
+    参赛人数只计当前版本的成员行，可选按人去重
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # M012 改过学校，旧版本行不再是当前版本
+        TeamMember.objects.create(
+            member_code='M012-v1', team_code='T01', school='复旦大学', member_type='队员',
+            team_order=2, create_year='2023', is_current=0
+        )
+        # 没有版本信息的历史数据视为当前
+        TeamMember.objects.create(
+            member_code='M013', team_code='T01', school='复旦大学', member_type='队员',
+            team_order=3, create_year='2023', is_current=None
+        )
+        # 同一个人（学号相同）在两支队伍里
+        TeamMember.objects.filter(member_code__in=['M011', 'M021']).update(student_id='S001')
+        TeamMember.objects.filter(member_code='M022').update(email='A@Example.com')
+        TeamMember.objects.filter(member_code='M052').update(email='a@example.com')
+
+    def test_only_current_versions_counted(self):
+        stats = OrmStatsBackend().school_stats(2023, '上海赛区')
+        self.assertEqual(stats['复旦大学']['participant_count'], 5)
+        self.assertEqual(stats['同济大学']['participant_count'], 4)
+        self.assertEqual(stats, MemoryStatsBackend.from_database().school_stats(2023, '上海赛区'))
+
+    @override_settings(STATS_DISTINCT_PARTICIPANTS=True)
+    def test_distinct_persons(self):
+        stats = OrmStatsBackend().school_stats(2023, '上海赛区')
+        # M011 / M021 学号相同，M022 / M052 邮箱只差大小写
+        self.assertEqual(stats['复旦大学']['participant_count'], 3)
+        self.assertEqual(stats, MemoryStatsBackend.from_database().school_stats(2023, '上海赛区'))
+
+
+    def test_single_grouping_matches_separate_queries(self):
+        # 同一个人（S001）的两支队伍分属不同子项目
+        Team.objects.filter(team_code='T01').update(competition_topic='物联网')
+        backend = OrmStatsBackend()
+        for distinct in (False, True):
+            with self.subTest(distinct=distinct), override_settings(STATS_DISTINCT_PARTICIPANTS=distinct):
+                expected = (backend.school_stats(2023, '上海赛区'), backend.subproject_stats(2023, '上海赛区'))
+                # 队伍代码、(学校, 子项目) 分组聚合、(学校, 子项目) 参赛人数，按人去重时再加按学校去重的人数
+                with self.assertNumQueries(4 if distinct else 3):
+                    result = backend.yearly_stats(2023, '上海赛区')
+                self.assertEqual(result, expected)
+
+    @override_settings(STATS_DISTINCT_PARTICIPANTS=True)
+    def test_distinct_persons_not_summed_when_merging(self):
+        # S001 在 2022 年也参过赛，2023 年还在另一所学校带队的队伍里
+        TeamMember.objects.filter(member_code__in=['M091', 'M061']).update(student_id='S001')
+        for year in (2022, 2023):
+            statistics.refresh_yearly_area_cache(year, '上海赛区')
+        summed = sum(
+            statistics.get_yearly_area_stats(year, '上海赛区')['复旦大学']['participant_count'] for year in (2022, 2023)
+        )
+        merged = statistics.get_year_set_stats_data([2022, 2023], '上海赛区')
+        self.assertEqual(merged['range_stats']['复旦大学']['participant_count'], summed - 1)
+        ranked = dict(statistics.refresh_range_area_cache(2022, 2023, '上海赛区'))
+        self.assertEqual(ranked['复旦大学']['participant_count'], summed - 1)
+        self.assertEqual(
+            OrmStatsBackend().range_stats(2022, 2023, '上海赛区'),
+            MemoryStatsBackend.from_database().range_stats(2022, 2023, '上海赛区'),
+        )
+
+        subproject_stats = statistics.get_subproject_stats(2023, '上海赛区')
+        plain = dict(statistics.summarize_subprojects(subproject_stats))
+        distinct = dict(statistics.summarize_subprojects(
+            subproject_stats, statistics.subproject_participant_counts(2023, '上海赛区', subproject_stats)
+        ))
+        no_subproject = statistics.NO_SUBPROJECT
+        self.assertEqual(distinct[no_subproject]['participant_count'], plain[no_subproject]['participant_count'] - 1)
+
+
+class SubprojectStatsTests(SourceTablesTestCase):
+    """
+    按子项目拆分的学校统计：企业命题优先，其次赛题，都为空时归入"无子项目"
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Team.objects.filter(team_code__in=['T01', 'T02', 'T03']).update(competition_topic='物联网')
+        Team.objects.filter(team_code__in=['T03', 'T05']).update(enterprise_proposition='华为/鲲鹏')
+        Team.objects.filter(team_code='T06').update(competition_topic='')
+
+    def test_orm_and_memory_match(self):
+        orm_stats = OrmStatsBackend().subproject_stats(2023, '上海赛区')
+        self.assertEqual(orm_stats, MemoryStatsBackend.from_database().subproject_stats(2023, '上海赛区'))
+        self.assertEqual(set(orm_stats), {'物联网', '华为/鲲鹏', statistics.NO_SUBPROJECT})
+        self.assertEqual(orm_stats['物联网']['复旦大学']['team_count'], 2)
+        self.assertEqual(orm_stats['华为/鲲鹏']['同济大学']['second_prize_count'], 1)
+
+    def test_subprojects_add_up_to_school_stats(self):
+        school_stats = OrmStatsBackend().school_stats(2023, '上海赛区')
+        summary = dict(statistics.summarize_subprojects(
+            OrmStatsBackend().subproject_stats(2023, '上海赛区')
+        ))
+        self.assertEqual(
+            sum(data['team_count'] for data in summary.values()),
+            sum(data['team_count'] for data in school_stats.values())
+        )
+        self.assertEqual(summary['物联网']['school_count'], 1)
+
+    def test_query_count_independent_of_subprojects(self):
+        awards.get_award_taxonomy()
+        with self.assertNumQueries(3):
+            OrmStatsBackend().subproject_stats(2023, '上海赛区')
+
+    def test_cache_miss_enqueues_yearly_refresh(self):
+        with mock.patch('demo.services.tasks.enqueue') as enqueue:
+            stats = statistics.get_subproject_stats(2023, '上海赛区')
+        (key, func, *args), _ = enqueue.call_args
+        self.assertEqual(key, ('yearly', 2023, '上海赛区'))
+        self.assertIs(func, statistics.refresh_yearly_area_cache_in_background)
+        func(*args)
+        # 后台任务把年度缓存和按子项目拆分的缓存一起写入
+        self.assertIsNotNone(statistics._fetch_cached_stats_with_age(2023, '上海赛区')[0])
+        self.assertEqual(set(statistics._fetch_cached_subproject_stats(2023, '上海赛区')), set(stats))
+
+    def test_refresh_writes_subproject_cache(self):
+        statistics.refresh_yearly_area_cache(2023, '上海赛区')
+        with self.assertNumQueries(1):
+            cached = statistics.get_subproject_stats(2023, '上海赛区')
+        computed = statistics.get_subproject_stats(2023, '上海赛区', use_cache=False)
+        # 缓存里不带冗余的 school 字段
+        self.assertEqual(cached, {
+            subproject: {school: {f: data[f] for f in STAT_FIELDS} for school, data in stats.items()}
+            for subproject, stats in computed.items()
+        })
+
+
+class SpecialAwardStatsTests(SourceTablesTestCase):
+    """
+    企业命题及单项奖与其他奖项在同一次分组查询里统计
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        TeamAchievement.objects.filter(team_code__in=['T01', 'T02']).update(enterprise_award='企业一等奖')
+        TeamAchievement.objects.filter(team_code='T05').update(enterprise_award='', enterprise_advancement=1)
+        TeamAchievement.objects.filter(team_code='T03').update(best_paper=1, enterprise_advancement=0)
+        TeamAchievement.objects.filter(team_code='T07').update(best_investment_pitch=2)
+
+    def test_counts_match(self):
+        awards.get_award_taxonomy()
+        with self.assertNumQueries(3):
+            orm_stats = OrmStatsBackend().school_stats(2023, '上海赛区')
+        self.assertEqual(orm_stats, MemoryStatsBackend.from_database().school_stats(2023, '上海赛区'))
+        self.assertEqual(orm_stats['复旦大学']['enterprise_award_count'], 2)
+        self.assertEqual(orm_stats['上海交通大学']['enterprise_award_count'], 0)
+        self.assertEqual(orm_stats['上海交通大学']['enterprise_advancement_count'], 1)
+        self.assertEqual(orm_stats['上海交通大学']['best_investment_pitch_count'], 1)
+        self.assertEqual(orm_stats['同济大学']['best_paper_count'], 1)
+        self.assertEqual(orm_stats['同济大学']['enterprise_advancement_count'], 0)
+
+
+class StaticSiteTests(SourceTablesTestCase):
+    """
+    静态站点：页面和压缩版本写到对应路径，数据没变化时不重新生成
+    """
+
+    def setUp(self):
+        super().setUp()
+        for year, area in (('2022', '上海赛区'), ('2023', '上海赛区'), ('2023', '西北赛区')):
+            statistics.refresh_yearly_area_cache(int(year), area)
+        for area in ('上海赛区', '西北赛区'):
+            statistics.refresh_range_area_cache(2022, 2023, area)
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+
+    def test_build_writes_pages_and_skips_unchanged(self):
+        from demo.services import static_site
+
+        summary = static_site.build_site(self.output_dir)
+        self.assertEqual(summary['failed'], 0)
+        self.assertEqual(summary['rendered'], summary['total'])
+
+        page = static_site.page_file_path(self.output_dir, '/demo/area/2023/上海赛区/')
+        with open(page, 'rb') as f:
+            content = f.read()
+        self.assertIn('复旦大学'.encode(), content)
+        with gzip.open(page + '.gz') as f:
+            self.assertEqual(f.read(), content)
+        self.assertTrue(os.path.exists(
+            static_site.page_file_path(self.output_dir, '/demo/range/2022-2023/西北赛区/')
+        ))
+        # 占位页不生成
+        paths = [path for path, _ in static_site.collect_pages()]
+        self.assertNotIn(static_site._url('demo:yearly_report', 2023), paths)
+        self.assertNotIn(static_site._url('demo:range_year_report_all_area'), paths)
+
+        summary = static_site.build_site(self.output_dir)
+        self.assertEqual(summary['rendered'], 0)
+        self.assertEqual(summary['skipped'], summary['total'])
+
+        # 只有数据变化的赛区页面重新生成
+        statistics.refresh_yearly_area_cache(2023, '西北赛区')
+        rendered = []
+        static_site.build_site(self.output_dir, on_page=lambda path, size, elapsed: rendered.append(path))
+        self.assertIn('/demo/area/2023/西北赛区/', rendered)
+        self.assertIn('/demo/range/2022-2023/西北赛区/', rendered)
+        self.assertFalse([path for path in rendered if '上海赛区' in path])
+
+
+class YearSetStatsTests(SourceTablesTestCase):
+    """
+    任意年份组合：由年度缓存在内存中合并，和连续区间的汇总结果一致
+    """
+
+    def setUp(self):
+        super().setUp()
+        for year in (2022, 2023):
+            statistics.refresh_yearly_area_cache(year, '上海赛区')
+        statistics.refresh_range_area_cache(2022, 2023, '上海赛区')
+
+    def test_format_years(self):
+        self.assertEqual(statistics.format_years([2023, 2021, 2022]), '2021–2023')
+        self.assertEqual(statistics.format_years([2023, 2019, 2021]), '2019、2021、2023')
+        self.assertEqual(statistics.format_years([2023]), '2023')
+
+    def test_merges_yearly_caches_only(self):
+        expected = statistics.get_multi_year_stats_data(2022, 2023, '上海赛区')
+        with CaptureQueriesContext(connection) as ctx:
+            merged = statistics.get_year_set_stats_data([2023, 2022], '上海赛区')
+        self.assertEqual(len(ctx), 2)
+        self.assertFalse(any('team_achievement' in query['sql'] for query in ctx.captured_queries))
+
+        self.assertEqual(merged['years'], [2022, 2023])
+        self.assertEqual(merged['schools_by_team_count'], expected['schools_by_team_count'])
+        for school, data in expected['range_stats'].items():
+            for field in ('team_count', 'award_count', 'first_prize_rate', 'rank'):
+                self.assertAlmostEqual(merged['range_stats'][school][field], data[field])
+
+    def test_range_yearly_stats_reads_caches_once(self):
+        expected = statistics.get_range_yearly_area_stats(2022, 2023, '上海赛区', use_cache=False)
+        with CaptureQueriesContext(connection) as ctx:
+            cached = statistics.get_range_yearly_area_stats(2022, 2023, '上海赛区')
+        self.assertEqual(len(ctx), 1)
+        self.assertEqual(list(cached), [2022, 2023])
+        for year, stats in expected.items():
+            self.assertEqual(
+                {school: data['team_count'] for school, data in cached[year].items()},
+                {school: data['team_count'] for school, data in stats.items()},
+            )
+
+    def test_year_set_page(self):
+        response = self.client.get('/demo/range/2022,2023/上海赛区/')
+        self.assertEqual(response.status_code, 200)
+        content = response.content.decode()
+        self.assertIn('2022–2023年 上海赛区', content)
+        self.assertIn('2年总和', content)
+        self.assertIn('不存在', self.client.get('/demo/range/2022,2031/上海赛区/').content.decode())
+
+
+class RangeCacheStalenessTests(SourceTablesTestCase):
+    """
+    多年度汇总记录所用年度缓存的版本，年度缓存之后重新计算过时汇总视为过期
+    """
+
+    def setUp(self):
+        super().setUp()
+        for year in (2022, 2023):
+            statistics.refresh_yearly_area_cache(year, '上海赛区')
+        statistics.refresh_range_area_cache(2022, 2023, '上海赛区')
+
+    def test_range_cache_stale_after_yearly_refresh(self):
+        self.assertIsNotNone(statistics._fetch_cached_range_stats(2022, 2023, '上海赛区'))
+
+        # 年度缓存刷新后数据变了，汇总还是旧的
+        SchoolYearlyCache.objects.filter(year='2023', area='上海赛区', school='复旦大学').update(
+            team_count=10, updated_at=timezone.now() + timedelta(seconds=1)
+        )
+        self.assertIsNone(statistics._fetch_cached_range_stats(2022, 2023, '上海赛区'))
+        data = statistics.get_multi_year_stats_data(2022, 2023, '上海赛区')
+        self.assertEqual(data['range_stats']['复旦大学']['team_count'], 11)
+        self.assertEqual(
+            data['area_trend'][-1]['team_count'],
+            sum(stats['team_count'] for stats in data['data_by_year'][2023].values())
+        )
+
+        statistics.refresh_range_area_cache(2022, 2023, '上海赛区')
+        ranked = dict(statistics._fetch_cached_range_stats(2022, 2023, '上海赛区'))
+        self.assertEqual(ranked['复旦大学']['team_count'], 11)
+
+    def test_background_refresh_rebuilds_dependent_ranges(self):
+        TeamAchievement.objects.filter(team_code='T04').update(preliminary_award='一等奖')
+        awards.invalidate_award_taxonomy()
+        statistics.mark_yearly_cache_stale([2022, 2023], ['上海赛区'])
+
+        with mock.patch('demo.services.tasks.enqueue') as enqueue:
+            statistics.get_yearly_area_stats(2023, '上海赛区')
+        (key, func, *args), _ = enqueue.call_args
+        self.assertEqual(key, ('yearly', 2023, '上海赛区'))
+        # 重新汇总直接读年度缓存行，不会为区间内同样过期的 2022 年再排队刷新
+        with mock.patch('demo.services.tasks.enqueue') as enqueue:
+            func(*args)
+        enqueue.assert_not_called()
+
+        ranked = dict(statistics._fetch_cached_range_stats(2022, 2023, '上海赛区'))
+        self.assertEqual(ranked['同济大学']['first_prize_count'], 1)
+        with mock.patch('demo.services.tasks.enqueue'):
+            trends = statistics.get_multi_year_stats_data(2022, 2023, '上海赛区')['trends']
+        self.assertEqual(trends['同济大学'][-1]['award_rate'], 1.0)
+
+    def test_cache_miss_flushes_both_caches_in_background(self):
+        SchoolYearlyCache.objects.filter(year='2023').delete()
+        SchoolSubprojectCache.objects.filter(year='2023').delete()
+
+        with mock.patch('demo.services.tasks.enqueue') as enqueue:
+            stats = statistics.get_yearly_area_stats(2023, '上海赛区')
+        (key, func, *args), _ = enqueue.call_args
+        self.assertEqual(key, ('yearly', 2023, '上海赛区'))
+        # 请求线程已经算好学校统计和按子项目拆分的统计，后台只写缓存不再计算
+        with mock.patch.object(statistics, '_compute_yearly_stats') as compute:
+            func(*args)
+        compute.assert_not_called()
+        self.assertEqual(
+            statistics._fetch_cached_stats_with_age(2023, '上海赛区')[0],
+            {school: {f: data[f] for f in STAT_FIELDS} for school, data in stats.items()}
+        )
+        self.assertEqual(
+            set(statistics._fetch_cached_subproject_stats(2023, '上海赛区')),
+            set(statistics.get_subproject_stats(2023, '上海赛区', use_cache=False))
+        )
+
+    def test_marking_yearly_stale_keeps_range_cache(self):
+        statistics.mark_yearly_cache_stale([2023], ['上海赛区'])
+        self.assertIsNotNone(statistics._fetch_cached_range_stats(2022, 2023, '上海赛区'))
+
+
+class SchoolSearchTests(SourceTablesTestCase):
+    """
+    学校搜索：内存索引，一次分组查询构建，之后的搜索不再查库
+    """
+
+    def setUp(self):
+        super().setUp()
+        search.invalidate_school_index()
+
+    def test_search_by_substring_and_prefix(self):
+        results = search.search_schools('复旦')
+        self.assertEqual(results, [{
+            'school': '复旦大学', 'years': [2022, 2023], 'areas': ['上海赛区'], 'member_count': 5,
+        }])
+        self.assertEqual([r['school'] for r in search.search_schools('交通')], ['上海交通大学'])
+        # 完全匹配在前，其余按人数
+        self.assertEqual(
+            [r['school'] for r in search.search_schools('大学')],
+            ['复旦大学', '同济大学', '上海交通大学', '华东师范大学', '西北工业大学']
+        )
+        self.assertEqual(len(search.search_schools('大学', limit=2)), 2)
+        self.assertEqual(search.search_schools('  '), [])
+        self.assertEqual(search.search_schools('清华'), [])
+
+    def test_index_built_once(self):
+        search.search_schools('复旦')
+        with CaptureQueriesContext(connection) as ctx:
+            search.search_schools('同济')
+        self.assertEqual(len(ctx), 0)
+
+    def test_version_bump_from_another_process(self):
+        self.assertEqual(search.search_schools('清华'), [])
+        metadata.get_competition_metadata()
+        taxonomy = awards.get_award_taxonomy()
+        Team.objects.create(team_code='T11', competition_zone='华北赛区', create_year='2023', is_current=1)
+        TeamMember.objects.create(
+            member_code='M111', team_code='T11', school='清华大学', member_type='队长',
+            team_order=1, create_year='2023', is_current=1
+        )
+        # 另一个进程（管理命令）递增了版本号，本进程的全局变量没有被清空
+        CacheVersion.objects.update_or_create(name=invalidation.SOURCE_DATA, defaults={'version': 99})
+        self.assertEqual(search.search_schools('清华'), [])
+        with mock.patch.object(invalidation, 'VERSION_CHECK_SECONDS', -1):
+            self.assertEqual([r['school'] for r in search.search_schools('清华')], ['清华大学'])
+            self.assertTrue(metadata.get_competition_metadata().has_data(2023, '华北赛区'))
+            self.assertIsNot(awards.get_award_taxonomy(), taxonomy)
+
+    def test_normalization_and_ranking(self):
+        index = search.SchoolIndex([
+            ('ＭＩＴ 大学', '2023', '上海赛区', 1),
+            ('MIT大学', '2022', '西北赛区', 3),
+            ('大学', '2023', '上海赛区', 1),
+            ('大学城学院', '2023', '上海赛区', 9),
+        ])
+        self.assertEqual(len(index), 3)
+        self.assertEqual(index.search('mit')[0], {
+            'school': 'MIT大学', 'years': [2022, 2023], 'areas': ['上海赛区', '西北赛区'], 'member_count': 4,
+        })
+        self.assertEqual([r['school'] for r in index.search('大学')], ['大学', '大学城学院', 'MIT大学'])
+
+    def test_pinyin(self):
+        if search.lazy_pinyin is None:
+            self.skipTest('未安装 pypinyin')
+        self.assertEqual([r['school'] for r in search.search_schools('fudan')], ['复旦大学'])
+        self.assertEqual([r['school'] for r in search.search_schools('tjdx')], ['同济大学'])
+
+    def test_search_endpoint(self):
+        response = self.client.get('/demo/search/schools/', {'q': '同济', 'limit': 'x'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('同济大学', response.content.decode())
+        data = response.json()
+        self.assertEqual(data['query'], '同济')
+        self.assertEqual(data['results'][0]['school'], '同济大学')
+
+
+class SyntheticDataTests(SourceTablesTestCase):
+    """
+    压测用的合成数据：可复现，只清理自己生成的行，统计流程可以直接跑
+    """
+
+    def _synthetic_rows(self):
+        teams = list(Team.objects.filter(team_code__startswith=synthetic.SYNTHETIC_PREFIX)
+                     .order_by('team_code').values_list('team_code', 'competition_zone', 'create_year'))
+        members = list(TeamMember.objects.filter(member_code__startswith=synthetic.SYNTHETIC_PREFIX)
+                       .order_by('member_code').values_list('member_code', 'school', 'is_current'))
+        return teams, members
+
+    def test_reproducible_and_clear_keeps_real_rows(self):
+        summary = synthetic.generate([2022, 2023], ['上海赛区', '西北赛区'], teams_per_area=10, school_count=20, seed=3)
+        teams, members = self._synthetic_rows()
+        self.assertEqual(len(teams), summary['teams'])
+        self.assertEqual(len(members), summary['members'])
+        self.assertEqual(TeamAchievement.objects.filter(team_code__in=[t[0] for t in teams]).count(), len(teams))
+
+        self.assertEqual(synthetic.clear_synthetic(synthetic.source_alias()), summary['teams'])
+        self.assertEqual(self._synthetic_rows(), ([], []))
+        self.assertEqual(Team.objects.count(), len(FIXTURE_TEAMS))
+
+        synthetic.generate([2022, 2023], ['上海赛区', '西北赛区'], teams_per_area=10, school_count=20, seed=3)
+        self.assertEqual(self._synthetic_rows(), (teams, members))
+
+    def test_statistics_over_synthetic_data(self):
+        summary = synthetic.generate([2023], ['华南赛区'], teams_per_area=40, school_count=30, seed=5)
+        metadata.invalidate_competition_metadata()
+        self.assertTrue(metadata.get_competition_metadata().has_data(2023, '华南赛区'))
+
+        stats = statistics.refresh_yearly_area_cache(2023, '华南赛区')
+        # 每支队伍都有队长，队伍数按队长学校计入
+        self.assertEqual(sum(row['team_count'] for row in stats.values()), summary['teams'])
+        # 旧版本成员行不计入参赛人数
+        current = TeamMember.objects.filter(
+            member_code__startswith=synthetic.SYNTHETIC_PREFIX, is_current=1, school__in=list(stats)
+        ).count()
+        self.assertEqual(sum(row['participant_count'] for row in stats.values()), current)
+
+    @override_settings(MIDDLEWARE=['demo.middleware.QueryCountMiddleware'])
+    def test_query_count_headers(self):
+        search.invalidate_school_index()
+        response = self.client.get('/demo/search/schools/', {'q': '复旦'})
+        self.assertEqual(response['X-DB-Queries'], '1')
+        self.assertGreaterEqual(float(response['X-DB-Time']), 0)
+        # 索引已在内存里
+        self.assertEqual(self.client.get('/demo/search/schools/', {'q': '同济'})['X-DB-Queries'], '0')
+
+
+class CacheWarmupTests(SourceTablesTestCase):
+    """
+    预热工作项：按依赖顺序执行、分片互不重叠、崩溃后从断点继续
+    """
+    UNITS = warmup.plan_units([2022, 2023], ['上海赛区', '西北赛区'], [(2022, 2023)])
+
+    def test_run_refreshes_caches_and_resumes(self):
+        self.assertEqual(warmup.prepare_run('r1', self.UNITS), 6)
+        # 模拟崩溃：一个工作项被认领后进程退出，租期已过
+        crashed = warmup.claim_next('r1', 'dead-worker')
+        self.assertEqual(crashed.kind, CacheWarmupItem.YEARLY)
+        CacheWarmupItem.objects.filter(pk=crashed.pk).update(
+            claimed_at=crashed.claimed_at - timedelta(seconds=warmup.DEFAULT_LEASE_SECONDS + 1)
+        )
+
+        summary = warmup.run_worker('r1', 'w1', poll_seconds=0)
+        self.assertEqual((summary['done'], summary['failed']), (6, 0))
+        self.assertEqual(CacheWarmupItem.objects.get(pk=crashed.pk).attempts, 2)
+        self.assertTrue(SchoolRangeCache.objects.filter(
+            start_year='2022', end_year='2023', area='上海赛区', school='复旦大学'
+        ).exists())
+
+        # 重新运行同一批次时已完成的工作项跳过
+        self.assertEqual(warmup.prepare_run('r1', self.UNITS), 6)
+        self.assertEqual(warmup.run_worker('r1', 'w2')['done'], 0)
+
+        result = warmup.run_summary('r1')
+        self.assertEqual(result['status'], {CacheWarmupItem.DONE: 6})
+        self.assertEqual([(row['worker'], row['done']) for row in result['workers']], [('w1', 6)])
+
+    def test_range_waits_for_yearly_items(self):
+        warmup.prepare_run('r2', self.UNITS)
+        yearly = [warmup.claim_next('r2', 'w1') for _ in range(4)]
+        self.assertTrue(all(item.kind == CacheWarmupItem.YEARLY for item in yearly))
+        self.assertIs(warmup.claim_next('r2', 'w1'), warmup.WAIT)
+
+    def test_shards_partition_items(self):
+        warmup.prepare_run('r3', self.UNITS)
+        claimed = []
+        for index in range(3):
+            while True:
+                item = warmup.claim_next('r3', f'w{index}', shard=(index, 3))
+                if item is None or item is warmup.WAIT:
+                    break
+                claimed.append((index, item.pk))
+                CacheWarmupItem.objects.filter(pk=item.pk).update(status=CacheWarmupItem.DONE)
+        self.assertEqual(len({pk for _, pk in claimed}), len(claimed))
+        self.assertLessEqual(len(claimed), 6)
+
+    def test_range_claims_dependencies_from_other_shards(self):
+        warmup.prepare_run('r4', self.UNITS)
+        shards = 8
+        ranged = CacheWarmupItem.objects.get(run_id='r4', kind=CacheWarmupItem.RANGE, area='上海赛区')
+        index = warmup.shard_of(ranged.kind, ranged.start_year, ranged.end_year, ranged.area, shards)
+        # 只有这一个分片在跑，其他分片的主机都没启动
+        summary = warmup.run_worker('r4', 'w1', shard=(index, shards), poll_seconds=0, max_wait=0)
+        self.assertFalse(summary['timed_out'])
+        ranged.refresh_from_db()
+        self.assertEqual(ranged.status, CacheWarmupItem.DONE)
+        self.assertEqual(set(CacheWarmupItem.objects.filter(
+            run_id='r4', kind=CacheWarmupItem.YEARLY, area='上海赛区'
+        ).values_list('status', flat=True)), {CacheWarmupItem.DONE})
+
+    def test_max_wait_exits_non_zero(self):
+        warmup.prepare_run('r5', self.UNITS)
+        # 依赖的年度工作项被一个仍在租期内的进程占着
+        blocker = warmup.claim_next('r5', 'slow-worker')
+        summary = warmup.run_worker('r5', 'w1', poll_seconds=0, max_wait=0)
+        self.assertTrue(summary['timed_out'])
+        self.assertEqual(summary['done'], 4)
+        self.assertEqual(CacheWarmupItem.objects.get(pk=blocker.pk).status, CacheWarmupItem.CLAIMED)
+
+        with self.assertRaises(CommandError), mock.patch.object(warmup.time, 'sleep'):
+            call_command('update_stats_cache', run='r5', ranges=['2022-2023'], max_wait=0.01,
+                         stdout=StringIO(), stderr=StringIO())
+
+
+class ResponseCompressionTests(SourceTablesTestCase):
+    """
+    报表页按 Accept-Encoding 压缩
+    """
+
+    def test_report_page_is_compressed(self):
+        response = self.client.get('/demo/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(response['Content-Encoding'], ('gzip', 'br'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+        response = self.client.get('/demo/')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+class RequestMemoTests(SourceTablesTestCase):
+    """
+    请求级记忆化：作用域内相同参数只查询一次，作用域外不缓存
+    """
+
+    def setUp(self):
+        super().setUp()
+        statistics.refresh_yearly_area_cache(2023, '上海赛区')
+        memo.reset_memo_counters()
+
+    def test_same_call_is_executed_once_per_scope(self):
+        with memo.request_scope() as scope:
+            with CaptureQueriesContext(connection) as first:
+                stats = statistics.get_yearly_area_stats(2023, '上海赛区')
+            with CaptureQueriesContext(connection) as second:
+                again = statistics.get_yearly_area_stats(2023, '上海赛区', use_cache=True)
+            self.assertIs(again, stats)
+            self.assertGreater(len(first), 0)
+            self.assertEqual(len(second), 0)
+            # get_area_full_stats 复用上面的年度统计，且不会改动它
+            full = statistics.get_area_full_stats(2023, '上海赛区')
+            self.assertEqual(full['同济大学']['team_count'], 2)
+            self.assertIsNot(full['同济大学'], stats['同济大学'])
+
+        self.assertEqual((scope.hits, scope.misses), (2, 3))
+        counters = memo.memo_counters()['demo.services.statistics.get_yearly_area_stats']
+        self.assertEqual(counters, {'hits': 2, 'misses': 1})
+
+        # 作用域外每次都重新执行
+        with CaptureQueriesContext(connection) as outside:
+            statistics.get_yearly_area_stats(2023, '上海赛区')
+        self.assertGreater(len(outside), 0)
+
+    def test_middleware_scopes_each_request(self):
+        with self.settings(DEBUG=True):
+            response = self.client.get('/demo/area/2023/上海赛区/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('misses=', response['X-Stats-Memo'])
+
+
+class CompetitionMetadataTests(SourceTablesTestCase):
+    """
+    年份、赛区从 team 表发现
+    """
+
+    def test_discovers_years_and_areas(self):
+        meta = metadata.get_competition_metadata()
+        self.assertEqual(meta.years, [2022, 2023])
+        self.assertEqual(meta.areas, ['上海赛区', '西北赛区'])
+        self.assertTrue(meta.has_data(2023, '西北赛区'))
+        self.assertFalse(meta.has_data(2022, '西北赛区'))
+
+    def test_cached_until_invalidated(self):
+        metadata.get_competition_metadata()
+        Team.objects.create(team_code='T11', competition_zone='新赛区', create_year='2025', is_current=1)
+        with self.assertNumQueries(0):
+            self.assertNotIn('新赛区', metadata.get_competition_metadata().areas)
+        metadata.invalidate_competition_metadata()
+        meta = metadata.get_competition_metadata()
+        self.assertEqual(meta.areas[-1], '新赛区')
+        self.assertEqual(meta.years[-1], 2025)
+
+    def test_area_page_rejects_unknown_area(self):
+        response = self.client.get('/demo/area/2023/不存在赛区/')
+        self.assertContains(response, '不存在')
+
+
+class SnapshotStoreTests(SimpleTestCase):
+    """
+    快照存储的读写与失效
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = cache.SnapshotStore(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        data = {'复旦大学': {'team_count': 3, 'award_count': 2}}
+        self.store.put('stats/2023/上海赛区', data, watermark='w1')
+        self.assertEqual(self.store.get('stats/2023/上海赛区'), data)
+        self.assertEqual(self.store.get('stats/2023/上海赛区', watermark='w1'), data)
+        self.assertIsNone(self.store.get('stats/2023/上海赛区', watermark='w2'))
+        self.assertEqual(self.store.meta('stats/2023/上海赛区')['watermark'], 'w1')
+
+    def test_large_snapshot_uses_mmap(self):
+        data = list(range(300000))
+        path = self.store.put('large', data)
+        self.assertGreater(os.path.getsize(path), cache.SNAPSHOT_MMAP_THRESHOLD)
+        with mock.patch('demo.services.cache.mmap.mmap', wraps=cache.mmap.mmap) as mmap:
+            self.assertEqual(self.store.get('large'), data)
+        mmap.assert_called_once()
+
+    def test_expired_and_schema_mismatch(self):
+        self.store.put('expired', 1, ttl=-1)
+        self.assertEqual(self.store.get('expired', default='miss'), 'miss')
+        self.store.put('old', 1)
+        self.assertIsNone(cache.SnapshotStore(self.directory.name, schema_version=0).get('old'))
+
+    def test_invalidate(self):
+        self.store.put('a', 1)
+        self.store.put('b', 2)
+        self.store.invalidate('a')
+        self.assertIsNone(self.store.get('a'))
+        self.assertEqual(self.store.get('b'), 2)
+        self.store.invalidate()
+        self.assertIsNone(self.store.get('b'))
+        # 写入用的临时文件都已替换成快照，目录里不留半截文件
+        self.assertEqual(os.listdir(self.directory.name), [])
+
+
+class StatsAggregateTests(SimpleTestCase):
+    """
+    可合并的统计：计数相加与顺序、分组无关，比率由合并后的计数算出
+    """
+
+    def test_merge_is_associative_and_rates_are_weighted(self):
+        from demo.services.aggregate import StatsAggregate
+
+        a = {'team_count': 1, 'award_count': 1, 'first_prize_count': 1, 'award_rate': 1.0}
+        b = {'team_count': 3, 'award_count': 0}
+        c = StatsAggregate({'team_count': 4, 'award_count': 2, 'participant_count': 9})
+
+        left = (StatsAggregate(a) + b) + c
+        right = StatsAggregate(a) + (StatsAggregate(b) + c)
+        self.assertEqual(left, right)
+        self.assertEqual(StatsAggregate.merge_all([c, b, a]), left)
+
+        record = left.to_record()
+        self.assertEqual(record['team_count'], 8)
+        # 加权：3/8，而不是三个比率的平均 (1 + 0 + 0.5) / 3
+        self.assertAlmostEqual(record['award_rate'], 3 / 8)
+        self.assertAlmostEqual(left.rate('first_prize_rate'), 1 / 8)
+        self.assertEqual(StatsAggregate().to_record()['award_rate'], 0.0)
+
+
+class DerivedRateTests(SourceTablesTestCase):
+    """
+    缓存表不存比率：读取和排行榜按计数算出的比率与直接计算一致
+    """
+
+    def test_cached_rates_match_computed(self):
+        computed = statistics.get_yearly_area_stats(2023, '上海赛区', use_cache=False)
+        statistics.refresh_yearly_area_cache(2023, '上海赛区')
+        cached = statistics.get_yearly_area_stats(2023, '上海赛区')
+        for school, data in computed.items():
+            for field in RATE_COUNT_FIELDS:
+                self.assertAlmostEqual(cached[school][field], data[field])
+
+        board = statistics.get_top_schools(2023, '上海赛区', 'award_rate', 1)
+        best = max(cached.values(), key=lambda data: data['award_rate'])['award_rate']
+        self.assertTrue(board['rows'])
+        self.assertTrue(all(row['award_rate'] == best for row in board['rows']))
+        self.assertIsNone(board['others']['award_rate'])
+
+    def test_full_stats_rates_follow_captain_team_count(self):
+        # T04 没有队长，按队长学校统计时同济大学只剩 T03
+        TeamMember.objects.filter(member_code='M041').update(member_type='队员')
+        stats = statistics.get_area_full_stats(2023, '上海赛区', use_cache=False)
+        self.assertEqual(stats['同济大学']['team_count'], 1)
+        for school, data in stats.items():
+            for rate_field, count_field in RATE_COUNT_FIELDS.items():
+                self.assertAlmostEqual(data[rate_field], data[count_field] / data['team_count'])
+
+
+class TrendStatsTests(SimpleTestCase):
+    """
+    逐年趋势由各年学校统计算出
+    """
+
+    def test_build_trend_stats(self):
+        data_by_year = {
+            2021: {'复旦大学': {'team_count': 2, 'participant_count': 6, 'award_count': 1},
+                   '同济大学': {'team_count': 4, 'participant_count': 10, 'award_count': 4}},
+            2022: {'复旦大学': {'team_count': 5, 'participant_count': 12, 'award_count': 5},
+                   '同济大学': {'team_count': 3, 'participant_count': 9, 'award_count': 0}},
+            2023: {'同济大学': {'team_count': 3, 'participant_count': 9, 'award_count': 3}},
+        }
+        trends = statistics._build_trend_stats(data_by_year)
+
+        fudan = trends['复旦大学']
+        self.assertEqual([rec['year'] for rec in fudan], [2021, 2022, 2023])
+        self.assertIsNone(fudan[0]['team_count_growth'])
+        self.assertEqual(fudan[1]['team_count_growth'], 1.5)
+        self.assertEqual((fudan[1]['rank'], fudan[1]['rank_change']), (1, 1))
+        self.assertEqual(fudan[1]['award_rate_change'], 0.5)
+        # 2023 年没有参赛：队伍数为 0，没有排名，获奖率变化无法计算
+        self.assertEqual((fudan[2]['team_count'], fudan[2]['rank']), (0, None))
+        self.assertIsNone(fudan[2]['award_rate_change'])
+        self.assertAlmostEqual(fudan[2]['team_count_avg'], 7 / 3)
+
+        tongji = trends['同济大学']
+        self.assertEqual([rec['rank_change'] for rec in tongji], [None, -1, 1])
+
+        area = trends[statistics.AREA_TOTAL_SCHOOL]
+        self.assertEqual([rec['team_count'] for rec in area], [6, 8, 3])
+        self.assertEqual(area[1]['participant_count_growth'], 0.3125)
+        self.assertIsNone(area[1]['rank'])
+
+
+class BackgroundTaskTests(SimpleTestCase):
+    """
+    后台任务按 key 去重
+    """
+
+    def test_enqueue_deduplicates_pending_jobs(self):
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def job(value):
+            calls.append(value)
+            started.set()
+            release.wait(5)
+            return value
+
+        first = tasks.enqueue(('yearly', 2023, '上海赛区'), job, 1)
+        started.wait(5)
+        second = tasks.enqueue(('yearly', 2023, '上海赛区'), job, 2)
+        self.assertIs(first, second)
+        self.assertIn(('yearly', 2023, '上海赛区'), tasks.pending_keys())
+        release.set()
+        self.assertTrue(tasks.wait_for_pending(5))
+        self.assertEqual(calls, [1])
+        self.assertEqual(first.result(), 1)
+        self.assertNotIn(('yearly', 2023, '上海赛区'), tasks.pending_keys())
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """压测客户端的测试服务：定长、分块和出错三种响应"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path == '/fixed/':
+            self.send_response(200)
+            self.send_header('Content-Length', '100')
+            self.send_header('X-DB-Queries', '2')
+            self.send_header('X-DB-Time', '1.5')
+            self.end_headers()
+            self.wfile.write(b'x' * 100)
+        elif self.path == '/chunked/':
+            self.send_response(200)
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for chunk in (b'a' * 30, b'b' * 20):
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            self.wfile.write(b'0\r\n\r\n')
+        else:
+            self.send_response(500)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LoadTestTests(SimpleTestCase):
+    """
+    asyncio 压测客户端：长连接、定长/分块响应、错误和查询次数的统计
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def test_journey_report(self):
+        targets = {'navigation': ['/fixed/'], 'area_detail': ['/chunked/'], 'range_report': ['/missing/']}
+        report = loadtest.run_load_test(self.base_url, 'journey', targets, users=3, duration=0.3, label='stub')
+        steps = report['steps']
+        self.assertEqual(list(steps), ['navigation', 'area_detail', 'range_report'])
+        self.assertEqual(report['label'], 'stub')
+
+        self.assertGreater(steps['navigation']['requests'], 0)
+        self.assertEqual(steps['navigation']['errors'], 0)
+        self.assertEqual(steps['navigation']['avg_bytes'], 100)
+        self.assertEqual(steps['navigation']['queries'], 2)
+        self.assertEqual(steps['navigation']['db_ms'], 1.5)
+        self.assertEqual(steps['area_detail']['avg_bytes'], 50)
+        self.assertIsNone(steps['area_detail']['queries'])
+        self.assertEqual(steps['range_report']['error_samples'], {'HTTP 500': steps['range_report']['requests']})
+        self.assertEqual(report['total']['requests'], sum(row['requests'] for row in steps.values()))
+        self.assertLessEqual(steps['navigation']['p50_ms'], steps['navigation']['p99_ms'])
+
+    def test_unreachable_server(self):
+        with self.assertRaises(OSError):
+            loadtest.run_load_test('http://127.0.0.1:1', 'navigation', {'navigation': ['/']}, duration=0.1)
+
+    def test_percentile_and_compare(self):
+        values = [float(v) for v in range(1, 101)]
+        self.assertEqual(loadtest.percentile(values, 50), 50)
+        self.assertEqual(loadtest.percentile(values, 99), 99)
+        self.assertIsNone(loadtest.percentile([], 95))
+
+        row = {'rps': 20.0, 'p95_ms': 50.0, 'queries': None}
+        base = {'rps': 10.0, 'p95_ms': 100.0, 'queries': 3.0}
+        rows = loadtest.compare_reports({'steps': {'navigation': row}, 'total': row},
+                                        {'steps': {'navigation': base}, 'total': base})
+        self.assertEqual(rows['navigation']['rps'], (20.0, 10.0, 1.0))
+        self.assertEqual(rows['navigation']['p95_ms'], (50.0, 100.0, -0.5))
+        self.assertEqual(rows['total']['queries'], (None, 3.0, None))
+
+
+class ImportTimeTests(SimpleTestCase):
+    """
+    冷启动时 URLconf、视图和系统检查都不加载 pyecharts / jinja2（图表模块只在视图函数里导入），
+    视图和统计模块的导入耗时在预算内
+    """
+    # -X importtime 给出的累计导入耗时上限（微秒），约为本地实测的 5 倍（demo.views ≈ 6 ms，statistics ≈ 2 ms）
+    IMPORT_TIME_BUDGET_US = {
+        'demo.views': 30000,
+        'demo.services.statistics': 10000,
+    }
+
+    def _run(self, code: str, *options: str) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            [sys.executable, *options, '-c', code], capture_output=True, text=True, env=os.environ.copy(), check=True,
+        )
+
+    def test_views_import_without_rendering_stack(self):
+        result = self._run(
+            "import sys, django; django.setup(); "
+            "import demo.urls, demo.views; "
+            "from django.core.management import call_command; call_command('check', verbosity=0); "
+            "print('loaded:' + ','.join(name for name in ('pyecharts', 'jinja2') if name in sys.modules))"
+        )
+        self.assertEqual(result.stdout.strip().splitlines()[-1], 'loaded:')
+
+    def test_import_time_budget(self):
+        # 只计导入耗时，不含编译：先写好字节码（设置了 PYTHONDONTWRITEBYTECODE 时导入不会更新过时的 .pyc）
+        compileall.compile_dir(os.path.dirname(os.path.abspath(__file__)), quiet=1)
+        result = self._run("import django; django.setup(); import demo.urls, demo.views", '-X', 'importtime')
+        # 每行格式：import time: self [us] | cumulative | imported package
+        cumulative = {}
+        for line in result.stderr.splitlines():
+            if line.startswith('import time:') and '|' in line:
+                _, total, name = line.split('|')
+                if total.strip().isdigit():
+                    cumulative[name.strip()] = int(total)
+        for module, budget in self.IMPORT_TIME_BUDGET_US.items():
+            self.assertIn(module, cumulative)
+            self.assertLess(cumulative[module], budget, module)
+
+
+class ChartTemplateTests(SimpleTestCase):
+    """
+    图表模板：按骨架生成的图和直接用 pyecharts 构造的图输出一致，且不会改动骨架
+    """
+
+    def test_generic_bar_matches_direct_construction(self):
+        from pyecharts import options as opts
+        from pyecharts.charts import Bar, Grid
+        from demo.services.charts import create_generic_bar
+
+        bar = Bar(init_opts=opts.InitOpts(width="100%", height="800px"))
+        bar.add_xaxis(['甲大学', '乙大学'])
+        bar.add_yaxis('队伍数', [3, 1], label_opts=opts.LabelOpts(is_show=True))
+        bar.add_yaxis('人数', [9, 4], label_opts=opts.LabelOpts(is_show=True))
+        bar.set_global_opts(
+            title_opts=opts.TitleOpts(title='标题'),
+            xaxis_opts=opts.AxisOpts(axislabel_opts=opts.LabelOpts(rotate=45)),
+            datazoom_opts=opts.DataZoomOpts(pos_bottom="20"),
+            toolbox_opts=opts.ToolboxOpts(),
+        )
+        direct = Grid(init_opts=opts.InitOpts(width="100%")).add(
+            bar, grid_opts=opts.GridOpts(pos_bottom="25%")
+        )
+
+        templated = create_generic_bar(['甲大学', '乙大学'], [[3, 1], [9, 4]], ['队伍数', '人数'], '标题')
+        self.assertEqual(templated.dump_options(), direct.dump_options())
+
+    def test_range_line_series_are_paired_and_skeleton_untouched(self):
+        from demo.services.chart_templates import get_chart_template
+        from demo.services.charts import build_range_year_area_report_participant_count_bar
+
+        data_by_year = {2022: {'甲大学': {'team_count': 2}}, 2023: {'乙大学': {'team_count': 5}}}
+        skeleton_options = get_chart_template('range_team_count_bar').skeleton.dump_options()
+
+        first = build_range_year_area_report_participant_count_bar(2022, 2023, '上海赛区', data_by_year)
+        second = build_range_year_area_report_participant_count_bar(2022, 2023, '上海赛区', data_by_year)
+
+        self.assertNotEqual(first.chart_id, second.chart_id)
+        self.assertEqual(first.dump_options(), second.dump_options())
+        series = {s['name']: s for s in first.options['series']}
+        self.assertEqual(series['2年汇总']['data'], [['乙大学', 5], ['甲大学', 2]])
+        self.assertEqual(series['2023年参赛队伍数量']['data'], [5, 0])
+        self.assertEqual(first.options['legend'][0]['data'], ['2022年参赛队伍数量', '2023年参赛队伍数量', '2年汇总'])
+        self.assertEqual(first.options['yAxis'][1]['name'], '2年汇总')
+        self.assertEqual(get_chart_template('range_team_count_bar').skeleton.dump_options(), skeleton_options)
+
+
+class PageSizeTests(SimpleTestCase):
+    """
+    大赛区报表页的体积：依赖脚本和表格样式只出现一次，配置 JSON 不缩进
+    """
+    # 400 所学校的赛区详情页片段上限（字节），render_embed() 时约 240 KB
+    PAGE_BYTES_BUDGET = 120 * 1024
+
+    def test_large_zone_page_size(self):
+        from demo.services.chartsPage import get_area_detail_page
+
+        stats = {
+            f'学校{i:03d}': {field: (i * 7 + j) % 50 for j, field in enumerate(STAT_FIELDS)}
+            for i in range(400)
+        }
+        with self.settings(ECHARTS_JS_HOST='/static/echarts/v6/'):
+            html = get_area_detail_page(2023, '测试赛区', stats)
+
+        self.assertEqual(html.count('src="/static/echarts/v6/echarts.min.js"'), 1)
+        self.assertEqual(html.count('<script type="text/javascript" src='), 1)
+        # 不再带 CDN 回退脚本
+        self.assertEqual(html.count('echarts.min.js'), 1)
+        self.assertNotIn('<html', html)
+        self.assertNotIn('.fl-table {', html)
+        self.assertNotIn('\n    ', html)
+        self.assertLess(len(html.encode()), self.PAGE_BYTES_BUDGET)
+
+    def test_echarts_script_check(self):
+        from demo.checks import check_echarts_script
+
+        # 不回退到 CDN：静态文件里没有 echarts 脚本又没有设置 ECHARTS_JS_HOST 时系统检查报错
+        with self.settings(ECHARTS_JS_HOST=''), mock.patch('demo.checks.finders.find', return_value=None):
+            self.assertEqual([error.id for error in check_echarts_script(None)], ['demo.E001'])
+        with self.settings(ECHARTS_JS_HOST=''), mock.patch('demo.checks.finders.find', return_value='/x/echarts.min.js'):
+            self.assertEqual(check_echarts_script(None), [])
+        with self.settings(ECHARTS_JS_HOST='/mirror/echarts/'), mock.patch('demo.checks.finders.find', return_value=None):
+            self.assertEqual(check_echarts_script(None), [])
+
+
+# 查询计划快照目录，按数据库类型分开：demo/query_plans/<vendor>/<用例>.txt
+QUERY_PLAN_DIR = os.path.join(os.path.dirname(__file__), 'query_plans')
+# 设置 UPDATE_QUERY_PLANS=1 运行测试时重写快照
+UPDATE_QUERY_PLANS = os.environ.get('UPDATE_QUERY_PLANS') == '1'
+# SQL 里 Django 生成的表别名，如 FROM "team_member" U0
+_TABLE_ALIAS = re.compile(r'"(\w+)" ([A-Z]\d+)\b')
+
+
+def explain_query(sql: str) -> tuple[list[str], set[str], int]:
+    """
+    取得一条 SELECT 的执行计划
+    :return: (计划文本行, 全表扫描的表, 关联/依赖子查询个数)
+    """
+    aliases = dict((alias, table) for table, alias in _TABLE_ALIAS.findall(sql))
+    scanned, dependent = set(), 0
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            lines = [row[3] for row in cursor.fetchall()]
+            for line in lines:
+                match = re.match(r'SCAN (\w+)', line)
+                if match and not line.startswith('SCAN (') and ' USING ' not in line:
+                    scanned.add(aliases.get(match.group(1), match.group(1)))
+            # 同一个子查询同时出现在 SELECT 和 GROUP BY 里时计划中会列两次（编号相同），按编号去重
+            dependent = len({line for line in lines if line.startswith('CORRELATED')})
+        else:
+            # MySQL：type=ALL 为全表扫描，select_type 以 DEPENDENT 开头为依赖子查询
+            cursor.execute('EXPLAIN ' + sql)
+            columns = [col[0] for col in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            lines = [
+                ' | '.join(f"{key}={row.get(key)}" for key in ('select_type', 'table', 'type', 'key', 'Extra'))
+                for row in rows
+            ]
+            for row in rows:
+                if row.get('type') == 'ALL' and row.get('table'):
+                    scanned.add(aliases.get(row['table'], row['table']))
+                if str(row.get('select_type', '')).startswith('DEPENDENT'):
+                    dependent += 1
+    # CTE / 派生表的名字不是真实的表
+    scanned = {table for table in scanned if table in connection.introspection.table_names()}
+    return lines, scanned, dependent
+
+
+class QueryPlanTests(SourceTablesTestCase):
+    """
+    统计函数和报表页的查询数与执行计划回归测试：
+
+      - 每个用例的查询数不能超过 max_queries，防止 N+1 之类的写法回来
+      - 全表扫描只允许出现在 allow_scans 里的表上；关联（依赖）子查询不能超过 max_dependent
+      - 每个用例的 SQL 和执行计划写在 demo/query_plans/<vendor>/ 下，SQL 变化或快照缺失时测试失败，
+        确认无误后用 UPDATE_QUERY_PLANS=1 重新生成（计划文本随数据库版本变化，只随快照一起提交供审阅）
+
+    源数据表在测试库里没有索引，涉及源数据表的计算路径允许扫描源数据表；
+    页面请求只读缓存表，不允许任何全表扫描和依赖子查询
+    """
+    SOURCE_TABLES = {'team', 'team_member', 'team_achievement'}
+
+    def setUp(self):
+        super().setUp()
+        for year, area in (('2022', '上海赛区'), ('2023', '上海赛区'), ('2023', '西北赛区')):
+            statistics.refresh_yearly_area_cache(int(year), area)
+        statistics.refresh_range_area_cache(2022, 2023, '上海赛区')
+        metadata.get_competition_metadata()
+
+    def cases(self):
+        """
+        (用例名, 调用, 最多查询数, 允许全表扫描的表, 最多依赖子查询数)
+        """
+        def reload_metadata():
+            metadata.invalidate_competition_metadata()
+            return metadata.get_competition_metadata()
+
+        def reload_school_index():
+            search.invalidate_school_index()
+            return search.search_schools('复旦')
+
+        def download(path):
+            # 导出是流式响应，查询在读取内容时才执行
+            response = self.client.get(path)
+            b''.join(response.streaming_content)
+            return response
+
+        source = self.SOURCE_TABLES
+        subproject = next(iter(statistics.get_subproject_stats(2023, '上海赛区')))
+        return [
+            ('competition_metadata', reload_metadata, 1, {'team'}, 0),
+            ('yearly_area_stats_cached', lambda: statistics.get_yearly_area_stats(2023, '上海赛区'), 1, set(), 0),
+            ('yearly_area_stats_computed',
+             lambda: statistics.get_yearly_area_stats(2023, '上海赛区', use_cache=False), 3, source, 1),
+            ('area_detail_stats', lambda: statistics.get_area_detail_stats(2023, '上海赛区'), 1, source, 0),
+            ('area_full_stats', lambda: statistics.get_area_full_stats(2023, '上海赛区'), 2, source, 0),
+            ('subproject_stats', lambda: statistics.get_subproject_stats(2023, '上海赛区'), 1, set(), 0),
+            ('multi_year_stats', lambda: statistics.get_multi_year_stats_data(2022, 2023, '上海赛区'), 4, set(), 0),
+            ('year_set_stats', lambda: statistics.get_year_set_stats_data([2022, 2023], '上海赛区'), 2, set(), 0),
+            ('range_yearly_area_stats',
+             lambda: statistics.get_range_yearly_area_stats(2022, 2023, '上海赛区'), 1, set(), 0),
+            ('school_index', reload_school_index, 1, source, 0),
+            ('leaderboard', lambda: statistics.get_leaderboard('team_count', 5), 1, {'demo_schoolyearlycache'}, 0),
+            ('top_schools', lambda: statistics.get_top_schools(2023, '上海赛区'), 1, set(), 0),
+            ('refresh_yearly_area_cache',
+             lambda: statistics.refresh_yearly_area_cache(2023, '上海赛区'), 11, source, 1),
+            ('refresh_range_area_cache',
+             lambda: statistics.refresh_range_area_cache(2022, 2023, '上海赛区'), 11, set(), 0),
+            ('page_navigation', lambda: self.client.get('/demo/'), 0, set(), 0),
+            ('page_area_detail', lambda: self.client.get('/demo/area/2023/上海赛区/'), 3, set(), 0),
+            ('page_area_subprojects', lambda: self.client.get('/demo/area/2023/上海赛区/subprojects/'), 1, set(), 0),
+            ('page_range', lambda: self.client.get('/demo/range/2022-2023/上海赛区/'), 4, set(), 0),
+            ('page_year_set', lambda: self.client.get('/demo/range/2022,2023/上海赛区/'), 2, set(), 0),
+            ('page_subproject_detail',
+             lambda: self.client.get(f'/demo/area/2023/上海赛区/subprojects/{subproject}/'), 1, set(), 0),
+            ('page_school_search', lambda: self.client.get('/demo/search/schools/', {'q': '复旦'}), 0, set(), 0),
+            ('page_export_yearly',
+             lambda: download('/demo/export/yearly.csv?years=2023&areas=上海赛区'), 1, set(), 0),
+            ('page_export_range',
+             lambda: download('/demo/export/range.csv?range=2022-2023&areas=上海赛区'), 1, set(), 0),
+            ('page_export_national', lambda: download('/demo/export/national.csv'), 1, {'demo_schoolyearlycache'}, 0),
+        ]
+
+    def _check_snapshot(self, name: str, snapshot: str):
+        path = os.path.join(QUERY_PLAN_DIR, connection.vendor, f'{name}.txt')
+        if UPDATE_QUERY_PLANS:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(snapshot)
+            return
+        self.assertTrue(
+            os.path.exists(path), f"{name} 没有查询计划快照 {path}，确认 SQL 无误后用 UPDATE_QUERY_PLANS=1 生成"
+        )
+        with open(path, encoding='utf-8') as f:
+            expected = f.read()
+        # 只比较 SQL，计划文本随数据库版本不同
+        sql_only = lambda text: [line for line in text.splitlines() if not line.startswith('    ')]
+        self.assertEqual(
+            sql_only(snapshot), sql_only(expected),
+            f"{name} 的 SQL 与快照 {path} 不一致，确认无误后用 UPDATE_QUERY_PLANS=1 重新生成"
+        )
+
+    def test_query_counts_and_plans(self):
+        for name, call, max_queries, allow_scans, max_dependent in self.cases():
+            with self.subTest(name):
+                with CaptureQueriesContext(connection) as ctx:
+                    result = call()
+                if hasattr(result, 'status_code'):
+                    self.assertEqual(result.status_code, 200)
+                self.assertLessEqual(len(ctx), max_queries, f"{name} 查询数超出预算")
+
+                snapshot = []
+                for query in ctx.captured_queries:
+                    sql = query['sql']
+                    if not sql.startswith('SELECT'):
+                        continue
+                    lines, scanned, dependent = explain_query(sql)
+                    snapshot.append(sql)
+                    snapshot.extend(f'    {line}' for line in lines)
+                    self.assertLessEqual(
+                        scanned, allow_scans, f"{name} 出现了全表扫描：{sorted(scanned - allow_scans)}\n{sql}"
+                    )
+                    self.assertLessEqual(dependent, max_dependent, f"{name} 出现了依赖子查询\n{sql}")
+                self._check_snapshot(name, '\n'.join(snapshot) + '\n')
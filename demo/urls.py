@@ -15,8 +15,11 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 # from django.contrib import admin
-from django.urls import path,re_path
+from django.urls import path,re_path,register_converter
 from demo import views
+from demo.converters import YearListConverter
+
+register_converter(YearListConverter, 'years')
 
 app_name = 'demo'
 
@@ -36,6 +39,12 @@ urlpatterns = [
         views.range_year_area_report_view,
         name='range_year_area_report'
     ),
+    # 任意年份组合的赛区汇总分析，如 range/2019,2021,2023/上海赛区/
+    path(
+        'range/<years:years>/<str:area>/',
+        views.year_set_area_report_view,
+        name='year_set_area_report'
+    ),
     # 显示指定xx年份的所有赛区的分析
     path(
         'report/<int:year>/all/',
@@ -48,11 +57,35 @@ urlpatterns = [
         views.area_detail_view,
         name='area_detail'
     ),
+    # 赛区各子项目汇总页
+    path(
+        'area/<int:year>/<str:area>/subprojects/',
+        views.area_subprojects_view,
+        name='area_subprojects'
+    ),
+    # 赛区子项目详情页，子项目名称里可能有 /
+    path(
+        'area/<int:year>/<str:area>/subprojects/<path:subproject>/',
+        views.area_subproject_detail_view,
+        name='area_subproject_detail'
+    ),
     # 学校详情页
     path(
         'school/<int:year>/<str:school>/',
         views.school_detail_view,
         name='school_detail'
     ),
+    # 学校搜索，如 search/schools/?q=复旦
+    path(
+        'search/schools/',
+        views.school_search_view,
+        name='school_search'
+    ),
+    # 统计数据导出，如 export/yearly.csv?years=2023&areas=上海赛区
+    path(
+        'export/<slug:dataset>.<slug:fmt>',
+        views.export_stats_view,
+        name='export_stats'
+    ),
     # path('update-json-data/', views.update_all_json_data, name='update_json_data'),
 ]
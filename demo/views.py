@@ -1,30 +1,34 @@
 # @file_name: demo/models.py
 
 
+import tempfile
+
 from django.shortcuts import render
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
 
-from demo.services.chartsPage import get_area_detail_page , get_range_year_area_report_page
+from demo.middleware import compress_page
+from demo.services.export import EXPORT_FORMATS , get_dataset , iter_csv , write_dataset
+from demo.services.metadata import get_competition_metadata
+from demo.services.search import DEFAULT_SEARCH_LIMIT, search_schools
 from demo.services.statistics import (
-    get_yearly_area_stats, get_range_yearly_area_stats
+    get_yearly_area_stats, get_multi_year_stats_data, get_year_set_stats_data, get_top_schools,
+    get_subproject_stats, subproject_participant_counts, summarize_subprojects
 )
 
-# 要不要改为数据库查询？
-AREAS = [
-      '东北赛区','上海赛区','西南赛区','华东赛区',
-      '西北赛区','华中赛区','华北赛区','华南赛区',
-      '海外及港澳台赛区'
-    ]
-YEARS = [2019, 2020, 2021, 2022, 2023, 2024]
+# 赛区详情页柱状图只画前多少名学校
+AREA_TOP_N = 30
+
+@compress_page
 def navigation_view(request):
     """
     显示导航页，包含年份和赛区选择
     :param request:
     :return:
     """
+    metadata = get_competition_metadata()
     return render(request, 'demo/navigation.html', {
-        'years': YEARS,
-        'areas': AREAS
+        'years': metadata.years,
+        'areas': metadata.areas,
     })
 
 def range_year_report_all_area_view(request):
@@ -37,6 +41,7 @@ def range_year_report_all_area_view(request):
 
 
 
+@compress_page
 def range_year_area_report_view(request, start_year: int, end_year: int, area: str):
     """
     显示指定年份范围、地区的统计数据
@@ -46,32 +51,76 @@ def range_year_area_report_view(request, start_year: int, end_year: int, area: s
     :param area:
     :return:
     """
-    # 获取了一个总的统计数据
-    range_year_stats = get_range_yearly_area_stats( start_year , end_year , area )
+    metadata = get_competition_metadata()
+    if not metadata.has_area(area) or start_year > end_year:
+        return HttpResponse(f"<h1>{start_year}-{end_year}年{area}不存在</h1>")
+    # 获取了一个总的统计数据，学校排序与合计取自预先汇总的多年度缓存
+    range_year_stats = get_multi_year_stats_data( start_year , end_year , area )
     # 都是放在同一个页面里面的
+    # 图表模块（chartsPage、charts）依赖 pyecharts 和 jinja2，各视图都在函数里导入，
+    # worker 启动、系统检查和管理命令不加载整套渲染库
+    from demo.services.chartsPage import get_range_year_area_report_page
     page_html = get_range_year_area_report_page(start_year, end_year, area, range_year_stats)
     return render( request , 'demo/range_year_area_report.html' ,{
         'start_year': start_year,
         'end_year' : end_year,
+        'years_label': range_year_stats['label'],
         'area' : area,
         'page_html': page_html
     })
 
 
+@compress_page
+def year_set_area_report_view(request, years: list, area: str):
+    """
+    显示任意年份组合（如 2019,2021,2023）、地区的统计数据，由各年的年度缓存在内存中合并，
+    页面结构与连续区间的多年度页相同
+    :param request:
+    :param years: 年份列表
+    :param area:
+    :return:
+    """
+    metadata = get_competition_metadata()
+    years = sorted(set(years))
+    if not metadata.has_area(area) or any(year not in metadata.years for year in years):
+        return HttpResponse(f"<h1>{','.join(map(str, years))}年{area}不存在</h1>")
+    stats = get_year_set_stats_data(years, area)
+    from demo.services.chartsPage import get_range_year_area_report_page
+    page_html = get_range_year_area_report_page(years[0], years[-1], area, stats)
+    return render(request, 'demo/range_year_area_report.html', {
+        'start_year': years[0],
+        'end_year': years[-1],
+        'years_label': stats['label'],
+        'area': area,
+        'page_html': page_html
+    })
+
+
+@compress_page
 def area_detail_view(request, year: int, area: str):
     """
     显示指定年份、地区的统计数据
     year: 年份
     area: 地区
     """
-    if area not in AREAS:
+    if not get_competition_metadata().has_data(year, area):
         return HttpResponse(f"<h1>{year}年{area}不存在</h1>")
-    stats = get_yearly_area_stats( year , area , False )
+    # 缓存过期时先返回旧数据，后台重新计算
+    stats = get_yearly_area_stats( year , area )
     if not stats:
         return HttpResponse(f"<h1>{year}年{area}暂无数据</h1>")
 
+    # 柱状图只取前 AREA_TOP_N 名，由数据库排名；缓存未预热时退回画全部学校
+    leaderboards = {
+        metric: get_top_schools(year, area, metric, AREA_TOP_N)
+        for metric in ('team_count', 'participant_count')
+    }
+    if not all(leaderboard['rows'] for leaderboard in leaderboards.values()):
+        leaderboards = None
+
     # 只需一行调用，就能得到完整的 chart HTML
-    page_html = get_area_detail_page(year, area, stats)
+    from demo.services.chartsPage import get_area_detail_page
+    page_html = get_area_detail_page(year, area, stats, leaderboards=leaderboards)
     return render(request, 'demo/area_detail.html', {
         'year': year,
         'area': area,
@@ -79,6 +128,55 @@ def area_detail_view(request, year: int, area: str):
         'page_html': page_html,
     })
 
+@compress_page
+def area_subprojects_view(request, year: int, area: str):
+    """
+    显示指定年份、赛区各子项目（企业命题/赛题）的汇总，可进入各子项目的学校统计
+    year: 年份
+    area: 地区
+    """
+    if not get_competition_metadata().has_data(year, area):
+        return HttpResponse(f"<h1>{year}年{area}不存在</h1>")
+    subproject_stats = get_subproject_stats(year, area)
+    summary = summarize_subprojects(
+        subproject_stats, subproject_participant_counts(year, area, subproject_stats)
+    )
+    if not summary:
+        return HttpResponse(f"<h1>{year}年{area}暂无数据</h1>")
+
+    from demo.services.chartsPage import get_area_subprojects_page
+    page_html = get_area_subprojects_page(year, area, summary)
+    return render(request, 'demo/area_subprojects.html', {
+        'year': year,
+        'area': area,
+        'subprojects': [subproject for subproject, _ in summary],
+        'page_html': page_html,
+    })
+
+@compress_page
+def area_subproject_detail_view(request, year: int, area: str, subproject: str):
+    """
+    显示指定年份、赛区、子项目下各学校的统计数据
+    year: 年份
+    area: 地区
+    subproject: 子项目
+    """
+    if not get_competition_metadata().has_data(year, area):
+        return HttpResponse(f"<h1>{year}年{area}不存在</h1>")
+    stats = get_subproject_stats(year, area).get(subproject)
+    if not stats:
+        return HttpResponse(f"<h1>{year}年{area}{subproject}暂无数据</h1>")
+
+    from demo.services.chartsPage import get_area_detail_page
+    page_html = get_area_detail_page(year, f"{area}·{subproject}", stats)
+    return render(request, 'demo/area_detail.html', {
+        'year': year,
+        'area': area,
+        'subproject': subproject,
+        'stats': stats,
+        'page_html': page_html,
+    })
+
 def yearly_report_view(request, year: int):
     """
     显示指定xx年份的所有赛区的分析
@@ -88,7 +186,69 @@ def yearly_report_view(request, year: int):
     """
     return HttpResponse(f"<h1>{year}年xx赛区分析暂未开发</h1>")
     
+def school_search_view(request):
+    """
+    学校搜索接口：search/schools/?q=复旦&limit=10，按名称子串、前缀或拼音（需安装 pypinyin）匹配
+    :param request:
+    :return: {"query": ..., "results": [{"school": ..., "years": [...], "areas": [...], "member_count": ...}, …]}
+    """
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = min(max(int(request.GET.get('limit', DEFAULT_SEARCH_LIMIT)), 1), 100)
+    except ValueError:
+        limit = DEFAULT_SEARCH_LIMIT
+    return JsonResponse(
+        {'query': query, 'results': search_schools(query, limit)},
+        json_dumps_params={'ensure_ascii': False}
+    )
+
+
 def school_detail_view(request, year: int, school: str):
     return HttpResponse(f"<h1>{year}年{school}统计数据暂未开发</h1>")
 
 
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+def export_stats_view(request, dataset: str, fmt: str):
+    """
+    导出统计数据，CSV 边查边返回；XLSX / Parquet 先流式写到临时文件再返回
+    GET 参数：years=2019,2020  areas=上海赛区,西北赛区  range=2019-2024
+    :param request:
+    :param dataset: yearly / range / national
+    :param fmt: csv / xlsx / parquet
+    :return:
+    """
+    if fmt not in EXPORT_FORMATS:
+        return HttpResponse(f"<h1>不支持的导出格式：{fmt}</h1>", status=404)
+    try:
+        years = [int(y) for y in request.GET.get('years', '').split(',') if y] or None
+        areas = [a for a in request.GET.get('areas', '').split(',') if a] or None
+        start_year = end_year = None
+        if request.GET.get('range'):
+            start_year, end_year = (int(part) for part in request.GET['range'].split('-'))
+        fields, headers, rows = get_dataset(
+            dataset, years=years, areas=areas, start_year=start_year, end_year=end_year
+        )
+    except ValueError as e:
+        return HttpResponse(f"<h1>导出参数错误：{e}</h1>", status=400)
+
+    filename = f"{dataset}.{fmt}"
+    if fmt == 'csv':
+        response = StreamingHttpResponse(iter_csv(headers, rows), content_type=EXPORT_CONTENT_TYPES[fmt])
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    output = tempfile.TemporaryFile()
+    try:
+        write_dataset(output, fmt, fields, headers, rows)
+    except ImportError as e:
+        output.close()
+        return HttpResponse(f"<h1>{e}</h1>", status=501)
+    output.seek(0)
+    return FileResponse(
+        output, as_attachment=True, filename=filename, content_type=EXPORT_CONTENT_TYPES[fmt]
+    )
@@ -60,6 +60,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # 同一请求内相同参数的统计函数调用只执行一次
+    'demo.middleware.StatsMemoMiddleware',
 ]
 
 ROOT_URLCONF = 'pyecharts_django_demo.urls'
@@ -89,6 +91,37 @@ DATABASES = {
     )
 }
 
+# 源数据表（team / team_member / team_achievement）的只读副本，
+# 报表查询走副本，避免和导入数据争用主库；未配置时全部走 default
+if env("REPLICA_DATABASE_URL", default=None):
+    DATABASES["yyds_mysql"] = env.db("REPLICA_DATABASE_URL")
+    # 测试时副本直接指向 default 的测试库
+    DATABASES["yyds_mysql"]["TEST"] = {"MIRROR": "default"}
+
+# 持久连接：连接在 DB_CONN_MAX_AGE 秒内复用，复用前先做健康检查
+for _db in DATABASES.values():
+    _db["CONN_MAX_AGE"] = env.int("DB_CONN_MAX_AGE", default=60)
+    _db["CONN_HEALTH_CHECKS"] = env.bool("DB_CONN_HEALTH_CHECKS", default=True)
+
+DATABASE_ROUTERS = ["demo.routers.YYDSRouter"]
+
+# 统计后端：默认用 ORM 在数据库里聚合；离线分析时可改为
+# demo.services.backends.MemoryStatsBackend，从 STATS_EXPORT_DIR 下的 CSV/Parquet 导出文件加载源数据
+STATS_BACKEND = env("STATS_BACKEND", default="demo.services.backends.OrmStatsBackend")
+STATS_EXPORT_DIR = env("STATS_EXPORT_DIR", default=str(BASE_DIR / "demo" / "data" / "exports"))
+
+# 年度缓存超过 STATS_CACHE_MAX_AGE 秒视为过期；开启 STATS_STALE_WHILE_REVALIDATE 时
+# 请求直接返回旧缓存，由进程内 STATS_REFRESH_WORKERS 个后台线程重新计算
+STATS_CACHE_MAX_AGE = env.int("STATS_CACHE_MAX_AGE", default=3600)
+STATS_STALE_WHILE_REVALIDATE = env.bool("STATS_STALE_WHILE_REVALIDATE", default=True)
+STATS_REFRESH_WORKERS = env.int("STATS_REFRESH_WORKERS", default=2)
+# 压测时开启：每个响应带上 X-DB-Queries / X-DB-Time 头（本请求的查询次数和耗时），见 loadtest 命令
+QUERY_COUNT_HEADERS = env.bool("QUERY_COUNT_HEADERS", default=False)
+if QUERY_COUNT_HEADERS:
+    MIDDLEWARE.insert(0, 'demo.middleware.QueryCountMiddleware')
+# 参赛人数是否按人去重：同一学号/邮箱参加多支队伍只算一次；默认按成员行（当前版本）计数
+STATS_DISTINCT_PARTICIPANTS = env.bool("STATS_DISTINCT_PARTICIPANTS", default=False)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -125,6 +158,10 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 STATIC_ROOT = Path(BASE_DIR, "static_collected")
+# echarts 脚本目录，默认为本站静态文件 static/echarts/v6/，需要时可改成内网镜像地址（以 / 结尾）
+ECHARTS_JS_HOST = env("ECHARTS_JS_HOST", default="")
+# build_static_site 生成的静态报表站点目录，由 nginx 直接提供
+STATIC_SITE_ROOT = Path(env("STATIC_SITE_ROOT", default=str(BASE_DIR / "static_site")))
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field